@@ -0,0 +1,278 @@
+"""Benchmarks for the bot: command handlers end to end against simulated devices, plus micro-benchmarks.
+
+    python bench.py --users 20 --devices 20 --rounds 5 --latency 0.05 --output bench.json
+
+Handlers from main.py are called with a fake Discord context, so no token or
+network access is needed. Discord rate limits are not simulated unless
+``--discord-limits`` is given, so the numbers show the bot and device side.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+# main.py reads these at import time.
+BENCH_DIR = tempfile.mkdtemp(prefix='bot-bench-')
+os.environ.setdefault('CONNECTIONS_DB', os.path.join(BENCH_DIR, 'connections.db'))
+os.environ.setdefault('DISCORD_TOKEN', 'bench')
+
+import main
+import net_cal
+from bgp import bgp as create_bgp
+from connection_store import ConnectionStore
+from fanout import percentile
+from ios_sim import IOSSimulator
+from metrics import Metrics
+from ospf import ospf as create_ospf
+from outbox import Outbox
+from prefixes import collapse, parse_prefixes
+
+# command name -> extra arguments after the device index
+COMMANDS = {
+    'show_int': (),
+    'show_vlan': (),
+    'show_run': (),
+    'show_route': (),
+    'show_hostname': (),
+    'ospf': ('10.0.0.0/24/0',),
+    'ping': ('10.0.0.2',),
+}
+
+
+class FakeMessage:
+    _ids = itertools.count(1)
+
+    def __init__(self, content=None, embed=None):
+        self.id = next(self._ids)
+        self.content = content
+        self.embed = embed
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        self.content = content if content is not None else self.content
+        self.embed = embed if embed is not None else self.embed
+
+    async def add_reaction(self, emoji):
+        pass
+
+
+class FakeChannel:
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.id = next(self._ids)
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        message = FakeMessage(content, kwargs.get('embed'))
+        self.messages.append(message)
+        return message
+
+
+class FakeAuthor(FakeChannel):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.mention = f'@{name}'
+
+    def __str__(self):
+        return self.name
+
+    async def create_dm(self):
+        return self
+
+
+class FakeContext:
+    def __init__(self, user):
+        self.author = FakeAuthor(user)
+        self.channel = FakeChannel()
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+class LoopLag:
+    """Measures how late the event loop wakes a task that sleeps ``interval`` seconds."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(time.perf_counter() - started - self.interval)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+    def summary(self):
+        return summarize(self.samples)
+
+
+def summarize(seconds):
+    if not seconds:
+        return {'count': 0}
+    seconds = sorted(seconds)
+    return {
+        'count': len(seconds),
+        'p50_ms': percentile(seconds, 50) * 1000,
+        'p95_ms': percentile(seconds, 95) * 1000,
+        'p99_ms': percentile(seconds, 99) * 1000,
+        'max_ms': max(seconds) * 1000,
+    }
+
+
+async def run_user(ctx, index, commands, rounds, timings, errors):
+    for _ in range(rounds):
+        for name in commands:
+            started = time.perf_counter()
+            try:
+                await getattr(main, name).callback(ctx, str(index), *COMMANDS[name])
+            except Exception as error:
+                errors[type(error).__name__] = errors.get(type(error).__name__, 0) + 1
+            timings.setdefault(name, []).append(time.perf_counter() - started)
+
+
+async def end_to_end(args):
+    if not args.discord_limits:
+        main.outbox = Outbox(global_rate=10 ** 6, channel_rate=10 ** 6, channel_per=1.0, metrics=main.metrics)
+    if args.no_cache:
+        main.output_cache.ttls = {}
+    simulator = IOSSimulator()
+    ports = [simulator.add_device(hostname=f'R{number + 1}', latency=args.latency, jitter=args.jitter,
+                                  routes=args.routes)[0] for number in range(args.devices)]
+    contexts = []
+    for number in range(args.users):
+        ctx = FakeContext(f'bench-user-{number}')
+        port = ports[number % len(ports)]
+        index = main.connection_store.add(str(ctx.author), f'127.0.0.1:{port}', 'admin', 'admin')
+        contexts.append((ctx, index))
+
+    timings = {}
+    errors = {}
+    lag = LoopLag()
+    with simulator:
+        lag.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(run_user(ctx, index, args.commands, args.rounds, timings, errors)
+                               for ctx, index in contexts))
+        elapsed = time.perf_counter() - started
+        lag.stop()
+        await asyncio.get_running_loop().run_in_executor(None, main.session_pool.close_all)
+    main.outbox.close()
+
+    total = sum(len(samples) for samples in timings.values())
+    logins = sum(device.logins for device in simulator.devices.values())
+    device_commands = sum(device.commands for device in simulator.devices.values())
+    return {
+        'commands': {name: summarize(samples) for name, samples in timings.items()},
+        'total_commands': total,
+        'elapsed_s': elapsed,
+        'commands_per_s': total / elapsed if elapsed else 0.0,
+        'ssh_handshakes': logins,
+        'handshakes_per_command': logins / total if total else 0.0,
+        'device_commands_per_command': device_commands / total if total else 0.0,
+        'errors': errors,
+        'loop_lag': lag.summary(),
+        'session_pool': main.session_pool.stats(),
+        'output_cache': main.output_cache.stats(),
+        'executor': main.device_executor.stats(),
+        'single_flight': main.single_flight.stats(),
+    }
+
+
+def micro(number, func):
+    # Best of three runs, in microseconds per call.
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+
+def micro_benchmarks():
+    lengths = [str(length % 33) for length in range(10000)]
+    networks = ','.join(f'10.{n // 256 % 256}.{n % 256}.0/24/0' for n in range(1000))
+    bgp_networks = ','.join(f'10.{n // 256 % 256}.{n % 256}.0/24' for n in range(1000))
+    prefixes = [f'10.{n // 256 % 256}.{n % 256}.0/{24 + n % 3}' for n in range(100000)]
+    registry = Metrics()
+    results = {
+        'net_cal.subnet_mask_us': micro(100000, lambda: net_cal.subnet_mask(24)),
+        'net_cal.wildcard_mask_us': micro(100000, lambda: net_cal.wildcard_mask('24')),
+        'net_cal.wildcard_masks_10k_us': micro(20, lambda: net_cal.wildcard_masks(lengths)),
+        'ospf_1k_networks_us': micro(20, lambda: create_ospf(networks)),
+        'bgp_1k_networks_us': micro(20, lambda: create_bgp(bgp_networks, '1.1.1.1:65001', '65000')),
+        'prefixes.collapse_100k_us': micro(3, lambda: collapse(parse_prefixes(prefixes), aggregate=True)),
+        'metrics.observe_us': micro(100000, lambda: registry.observe('bench_seconds', 0.02, device='10.0.0.1')),
+        'metrics.inc_us': micro(100000, lambda: registry.inc('bench_total', type='TimeoutError')),
+    }
+
+    store = ConnectionStore(os.path.join(BENCH_DIR, 'micro.db'))
+    users = [f'user-{number}' for number in range(100)]
+    started = time.perf_counter()
+    for user in users:
+        for number in range(10):
+            store.add(user, f'10.0.{number}.1', 'admin', 'admin')
+    results['connection_store.add_us'] = (time.perf_counter() - started) / 1000 * 1e6
+    results['connection_store.get_us'] = micro(10000, lambda: store.get('user-7', 3))
+    results['connection_store.list_user_us'] = micro(10000, lambda: store.list_user('user-7'))
+    store.close()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark the bot against simulated IOS devices.')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--devices', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.02, help='simulated device latency per command (s)')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--routes', type=int, default=50)
+    parser.add_argument('--commands', nargs='+', default=list(COMMANDS), choices=list(COMMANDS))
+    parser.add_argument('--no-cache', action='store_true', help='disable the show command cache')
+    parser.add_argument('--discord-limits', action='store_true', help='pace messages like Discord would')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--output', default='bench.json')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'git': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'end_to_end': asyncio.run(end_to_end(args)),
+    }
+    if not args.skip_micro:
+        report['micro'] = micro_benchmarks()
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    e2e = report['end_to_end']
+    for name, summary in e2e['commands'].items():
+        print(f"{name:<15} p50 {summary['p50_ms']:8.1f} ms  p95 {summary['p95_ms']:8.1f} ms  p99 {summary['p99_ms']:8.1f} ms")
+    print(f"{e2e['commands_per_s']:.1f} commands/s, {e2e['handshakes_per_command']:.3f} handshakes/command, "
+          f"loop lag p99 {e2e['loop_lag'].get('p99_ms', 0):.1f} ms")
+    print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main_cli()
@@ -2,40 +2,43 @@ from discord.ext import commands
 import discord
 from netmiko import ConnectHandler
 from net_cal import subnet_mask
+from prefixes import parse_address, parse_prefixes, format_address, dedupe
+
+# BGP announces each network statement as an exact prefix, so networks are only
+# normalized and deduplicated here, never merged or dropped for being covered.
+
+def parse_neighbors(neighbors):
+    parsed = {}
+    for neighbor in neighbors.split(','):
+        address, colon, remote_as = neighbor.strip().partition(':')
+        if not colon or not remote_as:
+            raise ValueError(f'Invalid BGP neighbor {neighbor!r}, expected neighbor_ip:neighbor_as.')
+        parsed.setdefault(format_address(parse_address(address)), remote_as)
+    return parsed.items()
 
 def bgp(networks, neighbors, asn):
     
-    networks = networks.split(',')
-    networks = [network.split('/') for network in networks]
     commands = []
     commands.append('router bgp ' + asn)
     
-    for network in networks:
-        network[1] = subnet_mask(int(network[1]))
-        commands.append(f'network {network[0]} mask {network[1]}')
-    neighbors = neighbors.split(',')
-    neighbors = [neighbor.split(':') for neighbor in neighbors]
-    for neighbor in neighbors:
-        commands.append(f'neighbor {neighbor[0]} remote-as {neighbor[1]}')
+    for network, length in dedupe(parse_prefixes(networks.split(','))):
+        commands.append(f'network {format_address(network)} mask {subnet_mask(length)}')
+    for neighbor, remote_as in parse_neighbors(neighbors):
+        commands.append(f'neighbor {neighbor} remote-as {remote_as}')
     return commands
 
 def remove_bgp_nw(networks, asn):
-    networks = networks.split(',')
-    networks = [network.split('/') for network in networks]
     commands = []
     commands.append('router bgp ' + asn)
-    for network in networks:
-        network[1] = subnet_mask(int(network[1]))
-        commands.append(f'no network {network[0]} mask {network[1]}')
+    for network, length in dedupe(parse_prefixes(networks.split(','))):
+        commands.append(f'no network {format_address(network)} mask {subnet_mask(length)}')
     return commands
 
 def remove_bgp_neighbor(neighbors, asn):
-    neighbors = neighbors.split(',')
     commands = []
     commands.append('router bgp ' + asn)
-    neighbors = [neighbor.split(':') for neighbor in neighbors]
-    for neighbor in neighbors:
-        commands.append(f'no neighbor {neighbor[0]} remote-as {neighbor[1]}')
+    for neighbor, remote_as in parse_neighbors(neighbors):
+        commands.append(f'no neighbor {neighbor} remote-as {remote_as}')
     return commands
 
 def disable_bgp(asn):
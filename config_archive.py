@@ -0,0 +1,217 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+ConfigVersion = namedtuple('ConfigVersion', 'version digest taken_at seen_at')
+
+# Lines IOS rewrites without any configuration change; kept out of the archive so they do not create versions.
+VOLATILE = re.compile(r'^(Building configuration\.\.\.|Current configuration :|! Last configuration change at|'
+                      r'! NVRAM config last updated at|! No configuration change since|ntp clock-period )')
+
+
+def normalize(config):
+    lines = config.replace('\r', '').split('\n')
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    return '\n'.join(line.rstrip() for line in lines if not VOLATILE.match(line)).strip('\n')
+
+
+class ConfigArchive:
+    """Content-addressed archive of running-configs with a version chain per device login.
+
+    A config is stored once as a zlib-compressed blob under its SHA-256 and every
+    version points at a blob, so fetching an unchanged config only updates the
+    newest version's ``seen_at`` and identical configs on several devices share
+    storage. Chains are keyed by (host, login) like the show cache, since accounts
+    with different privileges see different running-configs. Each chain keeps at
+    most ``max_versions`` versions; blobs no version points at any more are
+    deleted, which keeps storage bounded by the number of chains times
+    ``max_versions``, however often they are polled.
+    """
+
+    def __init__(self, path, max_versions=100):
+        self.path = path
+        self.max_versions = max_versions
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('''CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                refs INTEGER NOT NULL
+            ) WITHOUT ROWID''')
+            self._db.execute('''CREATE TABLE IF NOT EXISTS versions (
+                host TEXT NOT NULL,
+                login TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                taken_at REAL NOT NULL,
+                seen_at REAL NOT NULL,
+                PRIMARY KEY (host, login, version)
+            ) WITHOUT ROWID''')
+            # Totals for stats(), kept in memory so a metrics scrape never waits for a query.
+            self._blobs, self._bytes, self._raw_bytes = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(size), 0) FROM blobs').fetchone()
+            self._chains = dict(((host, login), count) for host, login, count in self._db.execute(
+                'SELECT host, login, COUNT(*) FROM versions GROUP BY host, login'))
+            self._hosts = {}
+            for host, _ in self._chains:
+                self._hosts[host] = self._hosts.get(host, 0) + 1
+            self._versions = sum(self._chains.values())
+
+    def add(self, host, login, config, taken_at=None):
+        # Returns (version, whether it is new).
+        config = normalize(config)
+        digest = hashlib.sha256(config.encode()).hexdigest()
+        now = time.time() if taken_at is None else taken_at
+        with self._lock:
+            with self._db:
+                self._db.execute('BEGIN IMMEDIATE')
+                latest = self._db.execute(
+                    'SELECT version, digest FROM versions WHERE host = ? AND login = ? ORDER BY version DESC LIMIT 1',
+                    (host, login)).fetchone()
+                if latest is not None and latest[1] == digest:
+                    self._db.execute('UPDATE versions SET seen_at = ? WHERE host = ? AND login = ? AND version = ?',
+                                     (now, host, login, latest[0]))
+                    return latest[0], False
+                version = latest[0] + 1 if latest else 1
+                added = (0, 0, 0)
+                updated = self._db.execute('UPDATE blobs SET refs = refs + 1 WHERE digest = ?', (digest,)).rowcount
+                if not updated:
+                    data = config.encode()
+                    compressed = zlib.compress(data, 9)
+                    self._db.execute('INSERT INTO blobs (digest, data, size, refs) VALUES (?, ?, ?, 1)',
+                                     (digest, compressed, len(data)))
+                    added = (1, len(compressed), len(data))
+                self._db.execute(
+                    'INSERT INTO versions (host, login, version, digest, taken_at, seen_at) VALUES (?, ?, ?, ?, ?, ?)',
+                    (host, login, version, digest, now, now))
+                expired, freed = self._expire(host, login, version)
+            # Committed; now the totals can follow.
+            if (host, login) not in self._chains:
+                self._chains[host, login] = 0
+                self._hosts[host] = self._hosts.get(host, 0) + 1
+            self._chains[host, login] += 1 - expired
+            self._versions += 1 - expired
+            self._blobs += added[0] - freed[0]
+            self._bytes += added[1] - freed[1]
+            self._raw_bytes += added[2] - freed[2]
+        return version, True
+
+    def versions(self, host, login):
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT version, digest, taken_at, seen_at FROM versions WHERE host = ? AND login = ? ORDER BY version',
+                (host, login))
+            return [ConfigVersion(*row) for row in rows]
+
+    def get(self, host, login, version):
+        # The normalized config text, or None for an unknown version.
+        with self._lock:
+            row = self._db.execute(
+                'SELECT blobs.data FROM versions JOIN blobs ON blobs.digest = versions.digest '
+                'WHERE versions.host = ? AND versions.login = ? AND versions.version = ?',
+                (host, login, version)).fetchone()
+        return zlib.decompress(row[0]).decode() if row else None
+
+    def stats(self):
+        # No query and no lock: this runs on the event loop for every metrics scrape.
+        return {'devices': len(self._hosts), 'logins': len(self._chains), 'versions': self._versions,
+                'blobs': self._blobs, 'bytes': self._bytes, 'raw_bytes': self._raw_bytes}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _expire(self, host, login, latest):
+        # Caller holds self._lock inside a transaction.
+        # Returns (versions deleted, (blobs, bytes, raw bytes) deleted).
+        expired = self._db.execute('SELECT version, digest FROM versions WHERE host = ? AND login = ? AND version <= ?',
+                                   (host, login, latest - self.max_versions)).fetchall()
+        for version, digest in expired:
+            self._db.execute('DELETE FROM versions WHERE host = ? AND login = ? AND version = ?', (host, login, version))
+            self._db.execute('UPDATE blobs SET refs = refs - 1 WHERE digest = ?', (digest,))
+        freed = (0, 0, 0)
+        if expired:
+            freed = self._db.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(size), 0) '
+                                     'FROM blobs WHERE refs <= 0').fetchone()
+            self._db.execute('DELETE FROM blobs WHERE refs <= 0')
+        return len(expired), freed
+
+
+def unified_diff(old, new, old_name='old', new_name='new', context=3):
+    """Unified diff of two configs, computed on line ids instead of line text.
+
+    Each distinct line is mapped to a small int once, the common head and tail
+    (most of a config between two versions) are cut off by comparing ints, and
+    only the changed middle goes through SequenceMatcher.
+    """
+    old_lines = old.splitlines()
+    new_lines = new.splitlines()
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in old_lines]
+    b = [ids.setdefault(line, len(ids)) for line in new_lines]
+    if a == b:
+        return ''
+    head = 0
+    while head < len(a) and head < len(b) and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < len(a) - head and tail < len(b) - head and a[-1 - tail] == b[-1 - tail]:
+        tail += 1
+    opcodes = [('equal', 0, head, 0, head)] if head else []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a[head:len(a) - tail], b[head:len(b) - tail],
+                                               autojunk=False).get_opcodes():
+        opcodes.append((tag, i1 + head, i2 + head, j1 + head, j2 + head))
+    if tail:
+        opcodes.append(('equal', len(a) - tail, len(a), len(b) - tail, len(b)))
+
+    lines = [f'--- {old_name}', f'+++ {new_name}']
+    for group in _grouped(opcodes, context):
+        first, last = group[0], group[-1]
+        lines.append(f'@@ -{_range(first[1], last[2])} +{_range(first[3], last[4])} @@')
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                lines.extend(' ' + line for line in old_lines[i1:i2])
+                continue
+            lines.extend('-' + line for line in old_lines[i1:i2])
+            lines.extend('+' + line for line in new_lines[j1:j2])
+    return '\n'.join(lines)
+
+
+def _grouped(opcodes, context):
+    # Hunks of changes with up to ``context`` equal lines around them, like SequenceMatcher.get_grouped_opcodes.
+    if opcodes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = opcodes[0]
+        opcodes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if opcodes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = opcodes[-1]
+        opcodes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+    group = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal' and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _range(start, stop):
+    # Unified diff ranges are 1-based "start,length"; an empty range points at the line before it.
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    if not length:
+        start -= 1
+    return f'{start + 1},{length}'
@@ -0,0 +1,186 @@
+import re
+from collections import namedtuple
+from net_cal import mask_to_prefix, wildcard_to_prefix
+from parsers import ConfigError, parse_network_statements
+from prefixes import classful_network, parse_address
+
+TransactionResult = namedtuple('TransactionResult', 'output errors readback missing applied')
+
+INTERFACE_MODE = re.compile(r'^int(?:erface)?\s+([A-Za-z]+)\s*(\S+)$')
+REGEX_SPECIAL = re.compile(r'([.^$*+?()\[\]{}|\\])')
+
+
+def escape(text):
+    # Like re.escape, but leaves spaces alone so the pattern also reads well in IOS's "| section".
+    return REGEX_SPECIAL.sub(r'\\\1', text)
+
+
+def mode_pattern(line):
+    # Returns (regex matching the running-config line the mode line creates, whether it should exist).
+    present = not line.startswith('no ')
+    if not present:
+        line = line[3:]
+    match = INTERFACE_MODE.match(line)
+    if match:
+        letters, number = match.groups()
+        # "int g0/1" shows up as "interface GigabitEthernet0/1"
+        return f'^interface [{letters[0].upper()}{letters[0].lower()}][A-Za-z-]*{escape(number)}$', present
+    return '^' + escape(line) + '$', present
+
+
+def parse_sections(readback):
+    # "| section" output -> {top-level line: [stripped lines below it]}
+    sections = {}
+    body = None
+    for line in readback.splitlines():
+        if not line.strip() or line.strip() == '!':
+            continue
+        if line[0].isspace():
+            if body is not None:
+                body.append(line.strip())
+        else:
+            body = sections[line.rstrip()] = []
+    return sections
+
+
+def render_sections(sections):
+    return '\n'.join(header + ''.join('\n ' + line for line in body) for header, body in sections.items())
+
+
+def statement_kind(line):
+    if line.startswith('network '):
+        return 'network'
+    if line.startswith('neighbor ') and ' remote-as ' in line:
+        return 'neighbor'
+    return None
+
+
+def statement_key(line):
+    # IOS shows "network 10.0.0.0 mask 255.0.0.0" and "network 10.0.0.0 0.255.255.255" as "network 10.0.0.0",
+    # so network statements compare as (network, prefix length, area); anything else as its text.
+    statements = parse_network_statements(line)
+    if not statements:
+        return line
+    network, mask, wildcard, area = statements[0]
+    try:
+        if mask:
+            length = mask_to_prefix(mask)
+        elif wildcard:
+            length = wildcard_to_prefix(wildcard)
+        else:
+            length = classful_network(network)[1]
+        return 'network', parse_address(network), length, area
+    except ValueError:
+        return line
+
+
+def section_delta(section, sections):
+    """Lines of ``section`` the device still needs, given its current ``sections``.
+
+    ``sections`` is updated to what the device will have once the delta is applied.
+    """
+    pattern, present = mode_pattern(section[0])
+    header = next((header for header in sections if re.match(pattern, header)), None)
+    if not present:
+        if header is None:
+            return []
+        del sections[header]
+        return [section[0]]
+    if header is None:
+        # A section the device lacks has no statements to remove; with nothing else
+        # to add it is not created at all.
+        added = [line for line in section[1:] if not line.startswith('no ')]
+        if not added:
+            return []
+        sections[section[0]] = added
+        return [section[0]] + [line for line in section[1:]
+                               if not (line.startswith('no ') and statement_kind(line[3:]))]
+
+    body = sections[header]
+    present_keys = {statement_key(line): line for line in body}
+    delta = []
+    for line in section[1:]:
+        if line in body:
+            continue
+        if line.startswith('no '):
+            existing = present_keys.pop(statement_key(line[3:]), None)
+            if existing is not None:
+                body.remove(existing)
+                delta.append(line)
+        elif statement_key(line) not in present_keys:
+            present_keys[statement_key(line)] = line
+            body.append(line)
+            delta.append(line)
+    return [section[0]] + delta if delta else []
+
+
+def config_output(commands, outputs):
+    # (transcript, errors) for config lines sent in a batch; "%" lines are the device's complaints.
+    errors = tuple(ConfigError(command, line[1:].strip()) for command, output in zip(commands, outputs)
+                   for line in output.splitlines() if line.startswith('%'))
+    return '\n'.join(filter(None, (line for pair in zip(commands, outputs) for line in pair))), errors
+
+
+class ConfigTransaction:
+    """Collects command lists from the config generators and applies them in one config-mode session.
+
+    Each list starts with its mode line ("router ospf 1", "int g0/1", "no router rip"),
+    which is what the generators already produce, so lists can be concatenated as is.
+    """
+
+    def __init__(self):
+        self.sections = []
+
+    def add(self, commands):
+        if commands:
+            self.sections.append(list(commands))
+        return self
+
+    def commands(self):
+        return [command for section in self.sections for command in section]
+
+    def readback_command(self):
+        patterns = dict.fromkeys(mode_pattern(section[0])[0] for section in self.sections)
+        return 'show running-config | section ' + '|'.join(patterns)
+
+    async def apply(self, net_connect, verify=False):
+        # With verify, one combined read-back checks every mode line ended up present (or gone).
+        # It goes in the same batch as the config lines, so verifying adds no round trip.
+        commands = self.commands()
+        batch = ['configure terminal'] + commands + ['end']
+        if verify and self.sections:
+            batch.append(self.readback_command())
+        outputs = await net_connect.send_batch(batch)
+        output, errors = config_output(commands, outputs[1:len(commands) + 1])
+        readback = None
+        missing = ()
+        if verify and self.sections:
+            readback = outputs[-1]
+            headers = [line.rstrip() for line in readback.splitlines() if line and not line[0].isspace()]
+            missing = []
+            for section in self.sections:
+                pattern, present = mode_pattern(section[0])
+                if present != any(re.match(pattern, header) for header in headers):
+                    missing.append(section[0])
+            missing = tuple(missing)
+        return TransactionResult(output, errors, readback, missing, self.commands())
+
+    async def reconcile(self, net_connect):
+        """Push only what the device's running-config is missing.
+
+        The relevant sections are read once (possibly from the show cache), lines
+        already present are skipped and "no" lines for statements the device does not
+        have are dropped; network statements match however IOS shows their mask.
+        Unchanged config costs that one read and no config session; ``readback`` holds the sections as they are after the delta.
+        """
+        sections = parse_sections(await net_connect.send_command(self.readback_command()))
+        delta = ConfigTransaction()
+        for section in self.sections:
+            delta.add(section_delta(section, sections))
+        output = ''
+        errors = ()
+        if delta.sections:
+            commands = delta.commands()
+            outputs = await net_connect.send_batch(['configure terminal'] + commands + ['end'])
+            output, errors = config_output(commands, outputs[1:-1])
+        return TransactionResult(output, errors, render_sections(sections), (), delta.commands())
@@ -0,0 +1,207 @@
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class UserDevices:
+    __slots__ = ('devices', 'next_index')
+
+    def __init__(self, devices, next_index):
+        self.devices = devices
+        self.next_index = next_index
+
+
+class ConnectionStore:
+    """SQLite-backed device inventory indexed by (discord user, device index).
+
+    Every add/update/delete writes a single row, lookups use the primary key and
+    nothing is loaded into memory up front, so startup cost does not grow with
+    the inventory. The devices of recently active users are kept in memory
+    (user -> ordered index map) and written through on every change, so lookups
+    and listings never touch other users' devices.
+    """
+
+    def __init__(self, path, cached_users=4096):
+        self.path = path
+        self.cached_users = cached_users
+        self._users = OrderedDict()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('''CREATE TABLE IF NOT EXISTS connections (
+                user TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                ip TEXT NOT NULL,
+                username TEXT NOT NULL,
+                password TEXT NOT NULL,
+                liveness TEXT NOT NULL DEFAULT 'prompt',
+                PRIMARY KEY (user, idx)
+            ) WITHOUT ROWID''')
+            columns = [row[1] for row in self._db.execute('PRAGMA table_info(connections)')]
+            if 'liveness' not in columns:
+                self._db.execute("ALTER TABLE connections ADD COLUMN liveness TEXT NOT NULL DEFAULT 'prompt'")
+            self._db.execute('''CREATE TABLE IF NOT EXISTS device_groups (
+                user TEXT NOT NULL,
+                name TEXT NOT NULL,
+                indexes TEXT NOT NULL,
+                PRIMARY KEY (user, name)
+            ) WITHOUT ROWID''')
+            self._db.execute('''CREATE TABLE IF NOT EXISTS users (
+                user TEXT PRIMARY KEY,
+                next_index INTEGER NOT NULL
+            ) WITHOUT ROWID''')
+            self._db.execute('''CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )''')
+
+    def get(self, user, index):
+        index = self._index(index)
+        if index is None:
+            return None
+        with self._lock:
+            return self._load(user).devices.get(index)
+
+    def list_user(self, user):
+        # [(index, (ip, username, password, liveness)), ...] ordered by index
+        with self._lock:
+            return list(self._load(user).devices.items())
+
+    def devices(self):
+        # {(ip, username): (ip, username, password, liveness)} across all users; every login to a
+        # device appears once, since what a device shows depends on who is logged in.
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT ip, username, password, liveness FROM connections ORDER BY user, idx').fetchall()
+        devices = {}
+        for row in rows:
+            devices.setdefault(row[:2], row)
+        return devices
+
+    def add(self, user, ip, username, password, liveness='prompt'):
+        # Indexes are never reused, even after the device holding one is deleted.
+        record = (ip, username, password, liveness)
+        with self._lock:
+            entry = self._load(user)
+            index = entry.next_index
+            with self._db:
+                self._db.execute('BEGIN IMMEDIATE')
+                self._db.execute(
+                    'INSERT INTO connections (user, idx, ip, username, password, liveness) VALUES (?, ?, ?, ?, ?, ?)',
+                    (user, index) + record)
+                self._db.execute(
+                    'INSERT OR REPLACE INTO users (user, next_index) VALUES (?, ?)', (user, index + 1))
+            entry.devices[index] = record
+            entry.next_index = index + 1
+        return index
+
+    def update(self, user, index, ip, username, password):
+        index = self._index(index)
+        if index is None:
+            return False
+        with self._lock:
+            entry = self._load(user)
+            if index not in entry.devices:
+                return False
+            self._db.execute(
+                'UPDATE connections SET ip = ?, username = ?, password = ? WHERE user = ? AND idx = ?',
+                (ip, username, password, user, index))
+            entry.devices[index] = (ip, username, password, entry.devices[index][3])
+        return True
+
+    def set_liveness(self, user, index, liveness):
+        index = self._index(index)
+        if index is None:
+            return False
+        with self._lock:
+            entry = self._load(user)
+            if index not in entry.devices:
+                return False
+            self._db.execute(
+                'UPDATE connections SET liveness = ? WHERE user = ? AND idx = ?', (liveness, user, index))
+            entry.devices[index] = entry.devices[index][:3] + (liveness,)
+        return True
+
+    def delete(self, user, index):
+        index = self._index(index)
+        if index is None:
+            return False
+        with self._lock:
+            entry = self._load(user)
+            if index not in entry.devices:
+                return False
+            self._db.execute('DELETE FROM connections WHERE user = ? AND idx = ?', (user, index))
+            del entry.devices[index]
+        return True
+
+    def get_groups(self, user):
+        with self._lock:
+            rows = self._db.execute('SELECT name, indexes FROM device_groups WHERE user = ?', (user,)).fetchall()
+        return {name: [int(index) for index in indexes.split(',')] for name, indexes in rows}
+
+    def save_group(self, user, name, indexes):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO device_groups (user, name, indexes) VALUES (?, ?, ?)',
+                (user, name, ','.join(str(index) for index in indexes)))
+
+    def migrate_pickle(self, connections_path, groups_path=None):
+        # One-time import of the old user-connections.pkl / user-groups.pkl files.
+        with self._lock:
+            done = self._db.execute("SELECT value FROM meta WHERE name = 'pickle_migrated'").fetchone()
+        if done:
+            return 0
+        rows = []
+        if os.path.exists(connections_path):
+            with open(connections_path, 'rb') as f:
+                connections = pickle.load(f)
+            for key, (ip, username, password) in connections.items():
+                user, index = key.rsplit(':', 1)
+                rows.append((user, int(index), ip, username, password))
+        groups = []
+        if groups_path and os.path.exists(groups_path):
+            with open(groups_path, 'rb') as f:
+                device_groups = pickle.load(f)
+            for key, indexes in device_groups.items():
+                user, name = key.rsplit(':', 1)
+                groups.append((user, name, ','.join(str(index) for index in indexes)))
+        with self._lock, self._db:
+            self._db.execute('BEGIN IMMEDIATE')
+            self._db.executemany(
+                'INSERT OR IGNORE INTO connections (user, idx, ip, username, password) VALUES (?, ?, ?, ?, ?)', rows)
+            self._db.executemany(
+                'INSERT OR IGNORE INTO device_groups (user, name, indexes) VALUES (?, ?, ?)', groups)
+            self._db.execute("INSERT INTO meta (name, value) VALUES ('pickle_migrated', '1')")
+        return len(rows)
+
+    def _load(self, user):
+        # Caller holds self._lock.
+        entry = self._users.get(user)
+        if entry is not None:
+            self._users.move_to_end(user)
+            return entry
+        rows = self._db.execute(
+            'SELECT idx, ip, username, password, liveness FROM connections WHERE user = ? ORDER BY idx',
+            (user,)).fetchall()
+        devices = {row[0]: tuple(row[1:]) for row in rows}
+        row = self._db.execute('SELECT next_index FROM users WHERE user = ?', (user,)).fetchone()
+        next_index = row[0] if row else max(devices, default=0) + 1
+        entry = self._users[user] = UserDevices(devices, next_index)
+        if len(self._users) > self.cached_users:
+            self._users.popitem(last=False)
+        return entry
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _index(index):
+        try:
+            return int(index)
+        except (TypeError, ValueError):
+            return None
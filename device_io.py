@@ -0,0 +1,232 @@
+import asyncio
+import functools
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from expect import prompt_pattern, read_batch, read_until_prompt
+
+
+class DeviceTimeoutError(TimeoutError):
+    pass
+
+
+class DeviceExecutor:
+    """Runs blocking netmiko calls on a bounded thread pool so the event loop stays free.
+
+    ``per_device`` caps how many calls may run against the same device at once and
+    ``call_timeout`` is the default number of seconds a single call may take.
+    """
+
+    def __init__(self, max_workers=32, per_device=1, call_timeout=120):
+        self.max_workers = max_workers
+        self.per_device = per_device
+        self.call_timeout = call_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='device-io')
+        self._limits = {}
+        self._holders = {}
+        self.in_flight = 0
+        self.timeouts = 0
+
+    async def run(self, key, func, *args, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.call_timeout
+        if key is None:
+            return await self._submit(key, func, args, kwargs, timeout)
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = self._limits[key] = asyncio.Semaphore(self.per_device)
+        self._holders[key] = self._holders.get(key, 0) + 1
+        try:
+            async with limit:
+                return await self._submit(key, func, args, kwargs, timeout)
+        finally:
+            self._holders[key] -= 1
+            if not self._holders[key]:
+                del self._holders[key]
+                del self._limits[key]
+
+    async def _submit(self, key, func, args, kwargs, timeout):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+        self.in_flight += 1
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise DeviceTimeoutError(f'{key or "device"} did not answer within {timeout} seconds.') from None
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {
+            'workers': self.max_workers,
+            'per_device': self.per_device,
+            'in_flight': self.in_flight,
+            'timeouts': self.timeouts,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class DeviceHandle:
+    """Awaitable wrapper around a pooled netmiko session; every call goes through the executor.
+
+    With a ``cache``, show commands are answered from it when fresh, and any
+    configuration change or other non-show command invalidates the host's entries.
+    With ``metrics``, every call is timed per device and failures are counted by type.
+    """
+
+    def __init__(self, executor, pool, key, connection, cache=None, host=None, login=None, metrics=None):
+        self.executor = executor
+        self.pool = pool
+        self.key = key
+        self.connection = connection
+        self.cache = cache
+        self.host = host
+        self.login = login
+        self.metrics = metrics
+
+    async def send_command(self, command, *args, **kwargs):
+        if self.cache is None:
+            return await self._call(self.connection.send_command, command, *args, **kwargs)
+        if not command.startswith('show'):
+            try:
+                return await self._call(self.connection.send_command, command, *args, **kwargs)
+            finally:
+                self.cache.invalidate(self.host)
+        output = self.cache.get(self.host, self.login, command)
+        if output is None:
+            output = await self._call(self.connection.send_command, command, *args, **kwargs)
+            self.cache.put(self.host, self.login, command, output)
+        return output
+
+    async def send_config_set(self, config_commands, *args, **kwargs):
+        try:
+            output = await self._call(self.connection.send_config_set, config_commands, *args, **kwargs)
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(self.host)
+        await self._follow_hostname([config_commands] if isinstance(config_commands, str) else config_commands)
+        return output
+
+    async def send_batch(self, commands, read_timeout=60):
+        """Run ``commands`` back to back in one exchange; returns one output per command.
+
+        A batch of show commands only sends those without fresh cached output. A batch
+        with any other command invalidates the host's entries, and then caches only
+        show output printed after its last change.
+        """
+        commands = list(commands)
+        if self.cache is None:
+            outputs = await self._call(read_batch, self.connection, commands, read_timeout, timeout=read_timeout + 5)
+            await self._follow_hostname(commands)
+            return outputs
+        changes = [index for index, command in enumerate(commands) if not command.startswith('show')]
+        outputs = [None] * len(commands)
+        if not changes:
+            outputs = [self.cache.get(self.host, self.login, command) for command in commands]
+        missing = [index for index, output in enumerate(outputs) if output is None]
+        if missing:
+            try:
+                fetched = await self._call(read_batch, self.connection, [commands[index] for index in missing],
+                                           read_timeout, timeout=read_timeout + 5)
+            finally:
+                if changes:
+                    self.cache.invalidate(self.host)
+            for index, output in zip(missing, fetched):
+                outputs[index] = output
+                if not changes or index > changes[-1]:
+                    self.cache.put(self.host, self.login, commands[index], output)
+            await self._follow_hostname(commands)
+        return outputs
+
+    async def stream_command(self, command, read_timeout=60):
+        """Yield output lines of ``command`` as the device prints them, without the echo and final prompt.
+
+        Complete show output is stored in the cache like send_command would.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        prompt = prompt_pattern(self.connection.base_prompt)
+        output = []
+        echoed = False
+
+        def on_chunk(chunk):
+            loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+
+        task = asyncio.ensure_future(self._call(
+            read_until_prompt, self.connection, command, on_chunk, read_timeout, timeout=read_timeout + 5))
+        task.add_done_callback(lambda _: chunks.put_nowait(None))
+        pending = ''
+        while True:
+            chunk = await chunks.get()
+            if chunk is None:
+                break
+            pending += chunk.replace('\r', '')
+            *lines, pending = pending.split('\n')
+            for line in lines:
+                if not echoed and not output:
+                    if not line.strip():
+                        continue  # left over from before the command was sent
+                    if line.rstrip().endswith(command):
+                        echoed = True
+                        continue
+                output.append(line)
+                yield line
+        await task
+        if pending and not prompt.search(pending):
+            output.append(pending)
+            yield pending
+        if self.cache is not None and command.startswith('show'):
+            self.cache.put(self.host, self.login, command, '\n'.join(output))
+
+    async def _follow_hostname(self, commands):
+        # A new hostname changes the prompt; netmiko and read_until_prompt would wait for the old one.
+        if any(command.lstrip().startswith('hostname ') for command in commands):
+            await self._call(self.connection.set_base_prompt)
+
+    def release(self):
+        self.pool.release(self.key, self.connection)
+
+    async def discard(self):
+        await self.executor.run(None, self.pool.discard, self.key, self.connection)
+
+    async def _call(self, func, *args, timeout=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await self.executor.run(self.key, func, *args, timeout=timeout, **kwargs)
+        except Exception as error:
+            if self.metrics is not None:
+                self.metrics.inc('device_errors_total', device=self.host, type=type(error).__name__)
+            if isinstance(error, DeviceTimeoutError):
+                # The session is stuck mid-command and cannot be trusted for the next caller.
+                await self.discard()
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe('device_call_seconds', time.perf_counter() - started,
+                                     device=self.host, call=func.__name__)
+
+
+class DeviceLocks:
+    """Per-device FIFO locks: commands to one device run in order, different devices run in parallel."""
+
+    def __init__(self):
+        self._locks = {}
+        self._holders = {}
+
+    @asynccontextmanager
+    async def hold(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._holders[key] = self._holders.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._holders[key] -= 1
+            if not self._holders[key]:
+                del self._holders[key]
+                del self._locks[key]
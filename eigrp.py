@@ -2,26 +2,23 @@ from discord.ext import commands
 import discord
 from netmiko import ConnectHandler
 from net_cal import wildcard_mask
+from prefixes import parse_prefixes, format_address, collapse, dedupe
 # import asyncio
 
-async def eigrp(networks, asn): 
-    networks = networks.split(',')
-    networks = [network.split('/') for network in networks]
+async def eigrp(networks, asn, summarize=False): 
+    # Duplicates and covered networks are dropped; summarize also merges contiguous networks,
+    # which remove_eigrp_nw of one of the original networks will then not match.
     commands = []
     commands.append('router eigrp ' + asn)
-    for network in networks:
-        network[1] = wildcard_mask(int(network[1]))
-        commands.append (f'network {network[0]} {network[1]}')
+    for network, length in collapse(parse_prefixes(networks.split(',')), aggregate=summarize):
+        commands.append(f'network {format_address(network)} {wildcard_mask(length)}')
     return commands
 
 def remove_eigrp_nw(networks, asn):
-    networks = networks.split(',')
-    networks = [network.split('/') for network in networks]
     commands = []
     commands.append('router eigrp ' + asn)
-    for network in networks:
-        network[1] = wildcard_mask(int(network[1]))
-        commands.append(f'no network {network[0]} {network[1]}')
+    for network, length in dedupe(parse_prefixes(networks.split(','))):
+        commands.append(f'no network {format_address(network)} {wildcard_mask(length)}')
     return commands
 
 def disable_eigrp(asn):
@@ -0,0 +1,85 @@
+import re
+import time
+
+
+def prompt_pattern(base_prompt):
+    return re.compile(re.escape(base_prompt) + r'[^\n]{0,32}[>#]\s*$')
+
+
+def read_until_prompt(connection, command, on_chunk=None, read_timeout=60, poll_interval=0.05):
+    """Send ``command`` and read its output until the device prompt comes back.
+
+    Unlike send_multiline_timing there is no fixed delay: the call returns as
+    soon as the prompt is seen, and every chunk read is handed to ``on_chunk``
+    so callers can show progress while the command is still running.
+    """
+    prompt = prompt_pattern(connection.base_prompt)
+    connection.write_channel(command + connection.RETURN)
+    output = ''
+    # The echoed command line ends with the command text rather than [>#], so it
+    # never matches; only a prompt at the very end of the output does. A prompt
+    # left unread from before the command is ignored by only looking past the echo.
+    echo_end = -1
+    deadline = time.monotonic() + read_timeout
+    while time.monotonic() < deadline:
+        chunk = connection.read_channel()
+        if not chunk:
+            time.sleep(poll_interval)
+            continue
+        output += chunk
+        if on_chunk is not None:
+            on_chunk(chunk)
+        if echo_end < 0:
+            echoed = output.find(command)
+            if echoed >= 0:
+                echo_end = output.find('\n', echoed)
+        if echo_end >= 0 and prompt.search(output[max(echo_end, len(output) - 256):]):
+            return output
+    raise TimeoutError(f'No prompt after {read_timeout} seconds running "{command}".')
+
+
+def read_batch(connection, commands, read_timeout=60, poll_interval=0.05):
+    """Send ``commands`` back to back and return one output per command.
+
+    The device works through the typed-ahead lines in order and echoes each one
+    after the prompt that ends the previous command's output, so the batch costs
+    one wait for the final prompt instead of a round trip per command. Outputs
+    are split at those "<prompt><next command>" lines.
+    """
+    prompt = prompt_pattern(connection.base_prompt)
+    boundaries = [re.compile(re.escape(connection.base_prompt) + r'[^\n]{0,32}?[>#]' + re.escape(command) + r'\s*$')
+                  for command in commands[1:]]
+    connection.write_channel(''.join(command + connection.RETURN for command in commands))
+    output = ''
+    deadline = time.monotonic() + read_timeout
+    while time.monotonic() < deadline:
+        chunk = connection.read_channel()
+        if not chunk:
+            time.sleep(poll_interval)
+            continue
+        output += chunk
+        if '\n' in output and prompt.search(output[-256:]):
+            outputs = split_batch(output, commands[0], boundaries)
+            if outputs is not None:
+                return outputs
+    raise TimeoutError(f'No prompt after {read_timeout} seconds running {len(commands)} commands.')
+
+
+def split_batch(output, first_command, boundaries):
+    # None until every boundary has been seen, i.e. the last command has not finished yet.
+    lines = output.replace('\r', '').split('\n')[:-1]  # the last line is the final prompt
+    # Anything before the echo of the first command was left unread from earlier.
+    for echo, line in enumerate(lines):
+        if line.rstrip().endswith(first_command):
+            break
+    else:
+        return None
+    outputs = [[]]
+    for line in lines[echo + 1:]:
+        if len(outputs) <= len(boundaries) and boundaries[len(outputs) - 1].match(line):
+            outputs.append([])
+        else:
+            outputs[-1].append(line)
+    if len(outputs) <= len(boundaries):
+        return None
+    return ['\n'.join(block) for block in outputs]
@@ -0,0 +1,90 @@
+import asyncio
+import math
+import time
+
+# More indexes than any inventory holds; a range like "1-1000000000" is rejected before it is expanded.
+MAX_TARGETS = 1000
+
+
+def parse_targets(spec, groups=None, max_targets=MAX_TARGETS):
+    # "3", "1-40", "1,4,7-9" or the name of a device group -> ordered list of device indexes
+    if groups and spec in groups:
+        return list(groups[spec])
+    indexes = []
+    seen = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            start, end = int(start), int(end)
+            if start > end:
+                start, end = end, start
+            if end - start + 1 > max_targets:
+                raise ValueError(f'At most {max_targets} devices can be targeted at once, "{part}" has {end - start + 1}.')
+            values = range(start, end + 1)
+        else:
+            values = [int(part)]
+        for value in values:
+            if value < 1:
+                raise ValueError(f'Device index must be 1 or greater, got {value}.')
+            if value not in seen:
+                seen.add(value)
+                indexes.append(value)
+        if len(indexes) > max_targets:
+            raise ValueError(f'At most {max_targets} devices can be targeted at once.')
+    if not indexes:
+        raise ValueError(f'No device indexes found in "{spec}".')
+    return indexes
+
+
+def percentile(values, pct):
+    # nearest-rank percentile, values must be sorted
+    if not values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+async def fan_out(indexes, run_one, concurrency=8):
+    """Run ``run_one(index)`` for every index with at most ``concurrency`` in flight.
+
+    Yields ``(index, ok, result, seconds)`` in completion order; ``result`` is the
+    return value on success or the raised exception on failure.
+    """
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run(index):
+        async with limit:
+            started = time.perf_counter()
+            try:
+                result = await run_one(index)
+                return index, True, result, time.perf_counter() - started
+            except Exception as error:
+                return index, False, error, time.perf_counter() - started
+
+    tasks = [asyncio.ensure_future(run(index)) for index in indexes]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class FanoutSummary:
+    def __init__(self):
+        self.succeeded = 0
+        self.failed = 0
+        self.latencies = []
+
+    def add(self, ok, seconds):
+        if ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self.latencies.append(seconds)
+
+    def latency_ms(self, pct):
+        return percentile(sorted(self.latencies), pct) * 1000
@@ -0,0 +1,130 @@
+import asyncio
+import random
+import time
+
+
+class PollTarget:
+    __slots__ = ('host', 'login', 'device', 'next_due', 'failures', 'retry_at', 'busy')
+
+    def __init__(self, host, login, device, next_due):
+        self.host = host
+        self.login = login
+        self.device = device
+        self.next_due = next_due
+        self.failures = 0
+        self.retry_at = 0.0
+        self.busy = False
+
+
+class FleetPoller:
+    """Polls show commands on every device login in the inventory and keeps the latest output in ``store``.
+
+    ``commands`` maps each show command to its interval in seconds. Every login runs
+    its own schedule per command, spread by ``jitter`` (a fraction of the interval)
+    so devices added together do not poll in lockstep; commands that are due at the
+    same time are sent together with one ``poll(host, login, device, commands)``
+    call. At most ``concurrency`` logins are polled at once and a login is never
+    polled twice at the same time. A login that fails is left alone for ``backoff``
+    seconds, doubling with each further failure up to ``max_backoff``.
+    ``devices()`` returns {(host, login): device} and is re-read every ``refresh``
+    seconds. It and the store are blocking, so they run on ``executor``.
+    """
+
+    def __init__(self, devices, poll, store, commands, executor, concurrency=4, jitter=0.1,
+                 backoff=30, max_backoff=1800, refresh=60, tick=1.0):
+        self._devices = devices
+        self._poll = poll
+        self.store = store
+        self.commands = commands
+        self.executor = executor
+        self.jitter = jitter
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.refresh = refresh
+        self.tick = tick
+        self._limit = asyncio.Semaphore(concurrency)
+        self._targets = {}
+        self._refreshed_at = None
+        self._task = None
+        self.polls = 0
+        self.failures = 0
+        self.in_flight = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            'devices': len(self._targets),
+            'backing_off': sum(1 for target in self._targets.values() if target.retry_at > now),
+            'in_flight': self.in_flight,
+            'polls': self.polls,
+            'failures': self.failures,
+        }
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            if self._refreshed_at is None or now - self._refreshed_at >= self.refresh:
+                await self._refresh(now)
+            for target in self._targets.values():
+                if target.busy or target.retry_at > now:
+                    continue
+                due = [command for command, at in target.next_due.items() if at <= now]
+                if due:
+                    target.busy = True
+                    asyncio.ensure_future(self._poll_target(target, due))
+            await asyncio.sleep(self.tick)
+
+    async def _refresh(self, now):
+        devices = await self.executor.run(None, self._devices)
+        for key in list(self._targets):
+            if key not in devices:
+                del self._targets[key]
+        for (host, login), device in devices.items():
+            target = self._targets.get((host, login))
+            if target is None:
+                # First polls are spread over one interval so a restart does not poll everything at once.
+                self._targets[host, login] = PollTarget(host, login, device, {
+                    command: now + random.uniform(0, interval) for command, interval in self.commands.items()})
+            elif target.device != device:
+                target.device = device
+                target.retry_at = 0.0
+        await self.executor.run(None, self.store.prune, devices)
+        self._refreshed_at = now
+
+    async def _poll_target(self, target, commands):
+        try:
+            async with self._limit:
+                self.in_flight += 1
+                # Outputs count as taken when the poll starts, so a change made while it runs makes them stale.
+                taken_at = time.time()
+                try:
+                    outputs = await self._poll(target.host, target.login, target.device, commands)
+                finally:
+                    self.in_flight -= 1
+            await self.executor.run(None, self._save, target, commands, outputs, taken_at)
+        except Exception:
+            self.failures += 1
+            target.failures += 1
+            target.retry_at = time.monotonic() + min(self.backoff * 2 ** (target.failures - 1), self.max_backoff)
+        else:
+            self.polls += 1
+            target.failures = 0
+            now = time.monotonic()
+            for command in commands:
+                interval = self.commands[command]
+                target.next_due[command] = now + interval * (1 + random.uniform(-self.jitter, self.jitter))
+        finally:
+            target.busy = False
+
+    def _save(self, target, commands, outputs, taken_at):
+        for command, output in zip(commands, outputs):
+            self.store.put(target.host, target.login, command, output, taken_at)
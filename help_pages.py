@@ -1,16 +1,21 @@
+import time
+from collections import OrderedDict
 import discord
 
 embed1 = discord.Embed(title="Help (1/5)", description="List of available commands:", color=0x00ff00)
-embed1.add_field(name="!create_connection <device_index> <ip> <username> <password>", value="Add a device to connection list", inline=False)
+embed1.add_field(name="!create_connection <device_index> <ip[:port]> <username> <password>", value="Add a device to connection list", inline=False)
 embed1.add_field(name="!show_connection <device_index>", value="Show all connected devices", inline=False)
-embed1.add_field(name="!ping <device_index> <ip_dest>", value="Ping an IP address", inline=False)
-embed1.add_field(name="!traceroute <device_index> <ip_dest> <source_ip (Optional)>", value="Trace route to an IP address", inline=False)
+embed1.add_field(name="!update_connection <device_index> <ip> <username> <password>", value="Change the details of a device", inline=False)
+embed1.add_field(name="!delete_connection <device_index>", value="Remove a device from connection list", inline=False)
+embed1.add_field(name="!set_liveness <device_index> <prompt|always|none>", value="Choose how the bot checks a device session before use", inline=False)
+embed1.add_field(name="!ping <device_index> <ip_dest> <repeat (Optional)> <size (Optional)> <timeout (Optional)>", value="Ping an IP address", inline=False)
+embed1.add_field(name="!traceroute <device_index> <ip_dest> <source_ip (Optional)> <probe (Optional)> <timeout (Optional)>", value="Trace route to an IP address", inline=False)
 embed1.add_field(name="!show_hostname <device_index>", value="Show hostname of a device", inline=False)
-embed1.add_field(name="!show_int <device_index>", value="Show interface status", inline=False)
-embed1.add_field(name="!show_vlan <device_index>", value="Show VLAN information", inline=False)
+embed1.add_field(name="!show_int <device_index> <--live (Optional)>", value="Show interface status (from the latest poll unless --live)", inline=False)
+embed1.add_field(name="!show_vlan <device_index> <--live (Optional)>", value="Show VLAN information (from the latest poll unless --live)", inline=False)
 embed1.add_field(name="!show_run <device_index>", value="Show running configuration", inline=False)
 embed1.add_field(name="!show_run_int <device_index> <interface>", value="Show interface configuration", inline=False)
-embed1.add_field(name="!save_config <device_index>", value="Save running configuration", inline=False)
+embed1.add_field(name="!save_config <device_index>", value="Save running configuration (requests in quick succession are saved once)", inline=False)
 
 embed2 = discord.Embed(title="Help (2/5)", description="List of available commands:", color=0x00ff00)
 embed2.add_field(name="!hostname <device_index> <hostname>", value="Set device hostname", inline=False)
@@ -36,14 +41,14 @@ embed3.add_field(name="!remove_rip_nw <device_index> <network_ip>", value="Remov
 embed3.add_field(name="!disable_rip <device_index>", value="Disable RIP Routing Protocol", inline=False)
 embed3.add_field(name="!show_rip <device_index>", value="show ip rip neighbor", inline=False)
 embed3.add_field(name="", value="", inline=False)
-embed3.add_field(name="!ospf <device_index> <network_ip/netmask(1-32)/area,network_ip2/netmask2(1-32)/area2,...>", value="Create/Add OSPF network", inline=False)
+embed3.add_field(name="!ospf <device_index> <network_ip/netmask(1-32)/area,network_ip2/netmask2(1-32)/area2,...> <summarize (Optional)>", value="Create/Add OSPF network; summarize merges contiguous networks", inline=False)
 embed3.add_field(name="!remove_ospf_nw <device_index> <network_ip/netmask(1-32)/area>", value="Remove OSPF network", inline=False)
 embed3.add_field(name="!disable_ospf <device_index>", value="Disable OSPF Routing Protocol", inline=False)
 
 embed4 = discord.Embed(title="Help (4/5)", description="List of available commands:", color=0x00ff00)
 embed4.add_field(name="!show_ospf <device_index>", value="show ip ospf neighbor", inline=False)
 embed4.add_field(name="", value="", inline=False)
-embed4.add_field(name="!eigrp <device_index> <network_ip/netmask(1-32),network_ip2/netmask2(1-32),...> <as>", value="Create/Add EIGRP network", inline=False)
+embed4.add_field(name="!eigrp <device_index> <network_ip/netmask(1-32),network_ip2/netmask2(1-32),...> <as> <summarize (Optional)>", value="Create/Add EIGRP network; summarize merges contiguous networks", inline=False)
 embed4.add_field(name="!remove_eigrp_nw <device_index> <network_ip/netmask(1-32)> <as>", value="Remove EIGRP network", inline=False)
 embed4.add_field(name="!disable_eigrp <device_index> <as>", value="Disable EIGRP Routing Protocol", inline=False)
 embed4.add_field(name="!show_eigrp <device_index>", value="show ip eigrp neighbor", inline=False)
@@ -63,9 +68,55 @@ embed5.add_field(name="!int_access_vlan <device_index> <interface> <vlan_id>", v
 embed5.add_field(name="!show_mac_table <device_index>", value="Show MAC Address table", inline=False)
 embed5.add_field(name="!vlan_shut <device_index> <vlan_id>", value="Shutdown VLAN", inline=False)
 embed5.add_field(name="!router_on_a_stick <device_index> <interface> <vlan_id> <ip_addr> <mask>", value="Create sub-interface on a router", inline=False)
+embed5.add_field(name="", value="", inline=False)
+embed5.add_field(name="!create_group <name> <device_index,device_index2,first-last>", value="Save a named group of devices", inline=False)
+embed5.add_field(name="!fanout <device_indexes|group> <operation>", value="Run a show operation (e.g. show_int) on many devices at once", inline=False)
+embed5.add_field(name="!fanout <device_indexes|group> config <line;line2>", value="Push configuration lines to many devices at once", inline=False)
+embed5.add_field(name="!batch <device_index> <operation> <arguments>; <operation2> <arguments2>", value="Apply several routing/interface changes (ospf, bgp, int_ip, ...) in one config session", inline=False)
+embed5.add_field(name="!cache_stats", value="Show hit/miss counters of the show command cache", inline=False)
+embed5.add_field(name="!diff_run <device_index> <version (Optional)> <version (Optional)>", value="Show changes between archived running-configs (the latest two by default)", inline=False)
+embed5.add_field(name="!stats", value="Show command latencies, session, cache and queue counters and errors", inline=False)
 
 
 pages = [embed1, embed2, embed3, embed4, embed5]
+PAGE_STEPS = {'⬅️': -1, '➡️': 1}
 
 def get_help_page(num):
-    return pages[num-1]
\ No newline at end of file
+    return pages[num-1]
+
+class HelpPageRegistry:
+    """Help messages the bot has sent and the page each one currently shows.
+
+    Lets reaction events be answered without fetching the message. Entries are
+    forgotten ``ttl`` seconds after their last page change, and the oldest go
+    first once more than ``max_messages`` are tracked.
+    """
+
+    def __init__(self, ttl=3600, max_messages=1024):
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self._pages = OrderedDict()
+
+    def add(self, message_id, page=1):
+        self._pages[message_id] = (page, time.monotonic() + self.ttl)
+        self._pages.move_to_end(message_id)
+        while len(self._pages) > self.max_messages:
+            self._pages.popitem(last=False)
+
+    def turn(self, message_id, emoji):
+        # Returns the page to show after the reaction, or None if the reaction is not for a tracked help message.
+        step = PAGE_STEPS.get(emoji)
+        if step is None:
+            return None
+        entry = self._pages.get(message_id)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._pages[message_id]
+            return None
+        page = (entry[0] - 1 + step) % len(pages) + 1
+        self.add(message_id, page)
+        return page
+
+    def forget(self, message_id):
+        self._pages.pop(message_id, None)
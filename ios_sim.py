@@ -0,0 +1,522 @@
+import argparse
+import logging
+import random
+import re
+import selectors
+import socket
+import threading
+import time
+import paramiko
+
+INVALID = "% Invalid input detected at '^' marker."
+INTERFACE_TYPES = {
+    'e': 'Ethernet',
+    'f': 'FastEthernet',
+    'g': 'GigabitEthernet',
+    'l': 'Loopback',
+    's': 'Serial',
+    't': 'TenGigabitEthernet',
+    'v': 'Vlan',
+}
+INTERFACE_NAME = re.compile(r'^([A-Za-z]+)\s*(\d[\d/.:]*)$')
+OCTETS = re.compile(r'\b(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})\b')
+# Abbreviations the bot sends, expanded to what the running-config shows.
+ABBREVIATIONS = (
+    (re.compile(r'^ip add(?:r(?:e(?:s(?:s)?)?)?)? '), 'ip address '),
+    (re.compile(r'^no ip add(?:r(?:e(?:s(?:s)?)?)?)?$'), 'no ip address'),
+    (re.compile(r'^shut(?:d(?:o(?:w(?:n)?)?)?)?$'), 'shutdown'),
+    (re.compile(r'^no shut(?:d(?:o(?:w(?:n)?)?)?)?$'), 'no shutdown'),
+)
+MASKED_NETWORK = re.compile(r'^network (\S+) (mask )?(\S+)$')
+logging.getLogger('ios_sim.transport').setLevel(logging.CRITICAL)
+
+SUBMODES = (
+    ('router ', 'config-router'),
+    ('line ', 'config-line'),
+)
+
+
+def interface_name(text):
+    # "g0/1" / "int GigabitEthernet0/1" -> "GigabitEthernet0/1"
+    match = INTERFACE_NAME.match(text.strip())
+    if match is None:
+        return None
+    kind, number = match.groups()
+    return INTERFACE_TYPES.get(kind[0].lower(), kind.capitalize()) + number
+
+
+def shown_statement(section, statement):
+    # IOS drops the mask of an EIGRP or BGP network that uses its classful default.
+    match = MASKED_NETWORK.match(statement)
+    if match is None or not section.startswith(('router eigrp ', 'router bgp ')):
+        return statement
+    network, keyword, mask = match.groups()
+    first = int(network.split('.')[0])
+    length = 8 if first < 128 else 16 if first < 192 else 24
+    default = (0xffffffff << (32 - length)) & 0xffffffff
+    if not keyword:
+        default ^= 0xffffffff
+    if mask == '.'.join(str(default >> shift & 255) for shift in (24, 16, 8, 0)):
+        return 'network ' + network
+    return statement
+
+
+class SimulatedDevice:
+    """State and CLI behaviour of one simulated Cisco IOS device.
+
+    ``latency`` (+ up to ``jitter``) seconds are spent before every command answers,
+    ``interfaces``/``routes``/``mac_entries`` set how much output the show commands
+    produce, ``error_rate`` answers a command with "% Invalid input" and
+    ``drop_rate`` closes the session instead of answering.
+    """
+
+    def __init__(self, hostname='R1', username='admin', password='admin', latency=0.0, jitter=0.0,
+                 interfaces=4, routes=8, mac_entries=8, error_rate=0.0, drop_rate=0.0, seed=None):
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.routes = routes
+        self.mac_entries = mac_entries
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.config = {}
+        self.vlans = {1: 'default'}
+        self.saves = 0
+        self.logins = 0
+        self.commands = 0
+        for number in range(interfaces):
+            self.config[f'interface GigabitEthernet0/{number}'] = [f'ip address 10.{number}.0.1 255.255.255.0']
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self.random.random() * self.jitter)
+
+    def fails(self, rate):
+        return rate and self.random.random() < rate
+
+    def interfaces(self):
+        for header, body in self.config.items():
+            if header.startswith('interface '):
+                yield header[len('interface '):], body
+
+    def running_config(self):
+        lines = ['Building configuration...', '', 'Current configuration : 0 bytes', '!', 'version 15.2',
+                 f'hostname {self.hostname}', '!']
+        for header, body in self.config.items():
+            lines.append(header)
+            lines.extend(' ' + line for line in body)
+            lines.append('!')
+        lines.append('end')
+        lines[2] = f'Current configuration : {sum(len(line) + 1 for line in lines)} bytes'
+        return '\n'.join(lines)
+
+
+class CLISession:
+    """One SSH shell on a SimulatedDevice; ``run`` yields output chunks for a command line."""
+
+    def __init__(self, device):
+        self.device = device
+        self.mode = 'exec'
+        self.section = None
+
+    def prompt(self):
+        if self.mode == 'exec':
+            return self.device.hostname + '#'
+        return f'{self.device.hostname}({self.mode})#'
+
+    def run(self, line):
+        line = line.strip()
+        if not line:
+            return
+        device = self.device
+        device.delay()
+        with device.lock:
+            device.commands += 1
+        if device.fails(device.error_rate):
+            yield INVALID
+            return
+        if self.mode != 'exec':
+            yield from self._configure(line)
+            return
+        words = line.split()
+        if words[0] in ('terminal', 'term'):
+            return
+        if line in ('configure terminal', 'conf t', 'config t'):
+            self.mode = 'config'
+            yield 'Enter configuration commands, one per line.  End with CNTL/Z.'
+        elif line in ('wr', 'write', 'write mem', 'write memory', 'copy running-config startup-config'):
+            with device.lock:
+                device.saves += 1
+            yield 'Building configuration...\n[OK]'
+        elif words[0] in ('show', 'sh'):
+            yield self._show(line)
+        elif words[0] == 'ping' and len(words) > 1:
+            yield from self._ping(words)
+        elif words[0] in ('traceroute', 'trace') and len(words) > 1:
+            yield from self._traceroute(words)
+        else:
+            yield INVALID
+
+    def _configure(self, line):
+        if line == 'end':
+            self.mode, self.section = 'exec', None
+        elif line == 'exit':
+            self.mode, self.section = ('config', None) if self.mode != 'config' else ('exec', None)
+        else:
+            for pattern, replacement in ABBREVIATIONS:
+                line = pattern.sub(replacement, line)
+            invalid = any(int(octet) > 255 for match in OCTETS.finditer(line) for octet in match.groups())
+            if invalid or not self._apply(line):
+                yield INVALID
+
+    def _apply(self, line):
+        # Applies one config line; returns False if it is rejected.
+        device = self.device
+        negate = line.startswith('no ')
+        statement = line[3:] if negate else line
+        words = statement.split()
+        if not words:
+            return False
+        with device.lock:
+            if words[0] in ('int', 'interface'):
+                name = interface_name(' '.join(words[1:]))
+                if name is None:
+                    return False
+                header = 'interface ' + name
+                if negate:
+                    device.config.pop(header, None)
+                else:
+                    device.config.setdefault(header, [])
+                    self.mode, self.section = 'config-subif' if '.' in name else 'config-if', header
+            elif words[0] == 'hostname' and len(words) == 2 and not negate:
+                device.hostname = words[1]
+            elif words[0] == 'vlan' and len(words) == 2 and words[1].isdigit():
+                if negate:
+                    device.vlans.pop(int(words[1]), None)
+                else:
+                    device.vlans.setdefault(int(words[1]), f'VLAN{int(words[1]):04d}')
+                    self.mode, self.section = 'config-vlan', int(words[1])
+            elif self.mode == 'config-vlan':
+                if words[0] != 'name' or len(words) != 2 or negate:
+                    return False
+                device.vlans[self.section] = words[1]
+            elif self.section is None or statement.startswith(tuple(prefix for prefix, _ in SUBMODES)):
+                submode = next((mode for prefix, mode in SUBMODES if statement.startswith(prefix)), None)
+                if negate:
+                    device.config.pop(statement, None)
+                else:
+                    device.config.setdefault(statement, [])
+                    if submode is not None:
+                        self.mode, self.section = submode, statement
+            else:
+                body = device.config.setdefault(self.section, [])
+                statement = shown_statement(self.section, statement)
+                if negate:
+                    # "no ip address" drops the address whatever it was
+                    body[:] = [existing for existing in body if existing != statement and not (
+                        statement in ('ip address', 'shutdown') and existing.startswith(statement))]
+                elif statement not in body:
+                    if statement.startswith('ip address '):
+                        body[:] = [existing for existing in body if not existing.startswith('ip address ')]
+                    body.append(statement)
+        return True
+
+    def _show(self, line):
+        # Like IOS, one filter per command and the rest of the line is its regex ("a|b" included).
+        command, pipe, expression = line.partition('|')
+        output = self._show_output(' '.join(command.split()[1:]))
+        if output is None or not pipe:
+            return INVALID if output is None else output
+        kind, _, pattern = expression.strip().partition(' ')
+        output = self._filter(output, kind, pattern.strip())
+        return INVALID if output is None else output
+
+    def _show_output(self, command):
+        device = self.device
+        with device.lock:
+            if command.startswith(('run', 'running-config')):
+                rest = command.split(None, 1)[1] if ' ' in command else ''
+                if rest.startswith('int'):
+                    name = interface_name(rest.split(None, 1)[1]) if ' ' in rest else None
+                    body = device.config.get(f'interface {name}')
+                    if body is None:
+                        return None
+                    return '\n'.join(['Building configuration...', '', f'interface {name}'] +
+                                     [' ' + line for line in body] + ['end'])
+                return device.running_config()
+            if command in ('ip int brief', 'ip interface brief'):
+                lines = ['Interface              IP-Address      OK? Method Status                Protocol']
+                for name, body in device.interfaces():
+                    address = next((line.split()[2] for line in body if line.startswith('ip address ')), 'unassigned')
+                    status = 'administratively down' if 'shutdown' in body else 'up'
+                    protocol = 'down' if 'shutdown' in body else 'up'
+                    lines.append(f'{name:<23}{address:<16}YES {"manual" if address != "unassigned" else "unset":<7}'
+                                 f'{status:<22}{protocol}')
+                return '\n'.join(lines)
+            if command == 'vlan brief':
+                lines = ['', 'VLAN Name                             Status    Ports',
+                         '---- -------------------------------- --------- -------------------------------']
+                for vlan, name in sorted(device.vlans.items()):
+                    lines.append(f'{vlan:<5}{name:<33}active    ')
+                return '\n'.join(lines)
+            if command == 'ip route':
+                lines = ['Codes: L - local, C - connected, S - static, R - RIP, M - mobile, B - BGP',
+                         '       D - EIGRP, EX - EIGRP external, O - OSPF, IA - OSPF inter area', '',
+                         'Gateway of last resort is not set', '']
+                for name, body in device.interfaces():
+                    for line in body:
+                        if line.startswith('ip address '):
+                            network = '.'.join(line.split()[2].split('.')[:3]) + '.0'
+                            lines.append(f'C        {network}/24 is directly connected, {name}')
+                for number in range(device.routes):
+                    lines.append(f'S        172.{16 + number // 256 % 16}.{number % 256}.0/24 [1/0] via 10.0.0.2')
+                return '\n'.join(lines)
+            if command in ('mac address-table', 'mac-address-table'):
+                lines = ['          Mac Address Table', '-------------------------------------------', '',
+                         'Vlan    Mac Address       Type        Ports', '----    -----------       --------    -----']
+                names = [name for name, _ in device.interfaces()] or ['GigabitEthernet0/0']
+                for number in range(device.mac_entries):
+                    mac = f'{number >> 16 & 0xffff:04x}.{number & 0xffff:04x}.00aa'
+                    lines.append(f'   1    {mac}    DYNAMIC     {names[number % len(names)]}')
+                lines.append(f'Total Mac Addresses for this criterion: {device.mac_entries}')
+                return '\n'.join(lines)
+            if command == 'spanning-tree':
+                return 'VLAN0001\n  Spanning tree enabled protocol ieee'
+            protocols = {
+                'ip ospf database': 'router ospf',
+                'ip rip database': 'router rip',
+                'ip eigrp topology': 'router eigrp',
+                'ip eigrp neighbors': 'router eigrp',
+                'ip bgp': 'router bgp',
+                'ip bgp summary': 'router bgp',
+            }
+            if command in protocols:
+                sections = [(header, body) for header, body in device.config.items()
+                            if header.startswith(protocols[command])]
+                if not sections:
+                    return ''
+                return '\n'.join(f'{header}: {line}' for header, body in sections for line in body
+                                 if line.startswith(('network', 'neighbor')))
+        return None
+
+    def _filter(self, output, kind, pattern):
+        try:
+            expression = re.compile(pattern)
+        except re.error:
+            return None
+        lines = output.split('\n')
+        if kind in ('include', 'i', 'inc'):
+            return '\n'.join(line for line in lines if expression.search(line))
+        if kind in ('exclude', 'e', 'exc'):
+            return '\n'.join(line for line in lines if not expression.search(line))
+        if kind in ('begin', 'b'):
+            for number, line in enumerate(lines):
+                if expression.search(line):
+                    return '\n'.join(lines[number:])
+            return ''
+        if kind in ('section', 's', 'sec'):
+            kept = []
+            keep = False
+            for line in lines:
+                if line and not line[0].isspace():
+                    keep = bool(expression.search(line))
+                if keep:
+                    kept.append(line)
+            return '\n'.join(kept)
+        return None
+
+    def _ping(self, words):
+        target = words[1]
+        options = dict(zip(words[2::2], words[3::2]))
+        repeat = int(options.get('repeat', 5))
+        size = int(options.get('size', 100))
+        timeout = int(options.get('timeout', 2))
+        if not OCTETS.fullmatch(target):
+            yield INVALID
+            return
+        yield ('Type escape sequence to abort.\n'
+               f'Sending {repeat}, {size}-byte ICMP Echos to {target}, timeout is {timeout} seconds:\n')
+        for _ in range(repeat):
+            self.device.delay()
+            yield '!'
+        yield f'\nSuccess rate is 100 percent ({repeat}/{repeat}), round-trip min/avg/max = 1/1/2 ms'
+
+    def _traceroute(self, words):
+        target = words[1]
+        if not OCTETS.fullmatch(target):
+            yield INVALID
+            return
+        yield f'Type escape sequence to abort.\nTracing the route to {target}\nVRF info: (vrf in name/id, vrf out name/id)\n'
+        hops = ['10.0.0.2', target]
+        for number, hop in enumerate(hops, 1):
+            self.device.delay()
+            yield f'  {number} {hop} 1 msec 1 msec 1 msec\n'
+
+
+class SSHServer(paramiko.ServerInterface):
+    def __init__(self, device):
+        self.device = device
+        self.shell = threading.Event()
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        if username == self.device.username and password == self.device.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell.set()
+        return True
+
+
+class IOSSimulator:
+    """Runs many SimulatedDevices in one process, each listening on its own local port.
+
+    Usage::
+
+        with IOSSimulator() as simulator:
+            port, device = simulator.add_device(hostname='R1', latency=0.05)
+            ConnectHandler(device_type='cisco_ios', host='127.0.0.1', port=port,
+                           username='admin', password='admin')
+    """
+
+    def __init__(self, host='127.0.0.1', host_key=None):
+        self.host = host
+        self.host_key = host_key or paramiko.RSAKey.generate(2048)
+        self.devices = {}
+        self._selector = selectors.DefaultSelector()
+        self._thread = None
+        self._running = False
+
+    def add_device(self, port=0, **options):
+        device = SimulatedDevice(**options)
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, port))
+        listener.listen(64)
+        listener.setblocking(False)
+        port = listener.getsockname()[1]
+        self.devices[port] = device
+        self._selector.register(listener, selectors.EVENT_READ, device)
+        return port, device
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._accept_loop, name='ios-sim', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        for key in list(self._selector.get_map().values()):
+            self._selector.unregister(key.fileobj)
+            key.fileobj.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _accept_loop(self):
+        while self._running:
+            for key, _ in self._selector.select(timeout=0.2):
+                try:
+                    client, _ = key.fileobj.accept()
+                except BlockingIOError:
+                    continue
+                client.setblocking(True)
+                threading.Thread(target=self._serve, args=(client, key.data), daemon=True).start()
+
+    def _serve(self, client, device):
+        transport = paramiko.Transport(client)
+        # Clients hanging up mid-read is normal here; keep it out of the log.
+        transport.set_log_channel('ios_sim.transport')
+        transport.add_server_key(self.host_key)
+        server = SSHServer(device)
+        try:
+            transport.start_server(server=server)
+            channel = transport.accept(20)
+            if channel is None or not server.shell.wait(10):
+                return
+            with device.lock:
+                device.logins += 1
+            self._shell(channel, CLISession(device))
+        except (paramiko.SSHException, EOFError, OSError):
+            pass
+        finally:
+            transport.close()
+
+    def _shell(self, channel, session):
+        channel.sendall(('\r\n' + session.prompt()).encode())
+        line = ''
+        previous = ''
+        while True:
+            data = channel.recv(4096)
+            if not data:
+                return
+            for char in data.decode(errors='ignore'):
+                if char == '\n' and previous == '\r':
+                    previous = char
+                    continue
+                previous = char
+                if char not in '\r\n':
+                    line += char
+                    channel.sendall(char.encode())
+                    continue
+                if session.device.fails(session.device.drop_rate):
+                    channel.close()
+                    return
+                channel.sendall(b'\r\n')
+                for chunk in session.run(line):
+                    text = chunk.replace('\r\n', '\n').replace('\n', '\r\n')
+                    channel.sendall(text.encode())
+                    if not chunk.endswith('\n') and len(chunk) > 1:
+                        channel.sendall(b'\r\n')
+                channel.sendall(session.prompt().encode())
+                line = ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulated Cisco IOS devices over SSH.')
+    parser.add_argument('--devices', type=int, default=1)
+    parser.add_argument('--base-port', type=int, default=0, help='first port, 0 picks free ports')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--routes', type=int, default=8)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    simulator = IOSSimulator()
+    for number in range(args.devices):
+        port, _ = simulator.add_device(
+            port=args.base_port + number if args.base_port else 0, hostname=f'R{number + 1}',
+            latency=args.latency, jitter=args.jitter, routes=args.routes,
+            error_rate=args.error_rate, drop_rate=args.drop_rate)
+        print(f'R{number + 1} listening on {simulator.host}:{port} (admin/admin)')
+    with simulator:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,37 +1,104 @@
 from typing import Final
+import asyncio
 import os
+import time
 from dotenv import load_dotenv
-from discord.ext import commands
+from discord.ext import commands, tasks
 import discord
-from netmiko import ConnectHandler
 from ospf import ospf as create_ospf, remove_ospf_nw as rm_ospf_nw, disable_ospf as dis_ospf
 from rip import rip as create_rip, remove_rip_nw as rm_rip_nw, disable_rip as dis_rip
 from bgp import bgp as create_bgp, remove_bgp_nw as rm_bgp_nw, remove_bgp_neighbor as rm_bgp_neighbor, disable_bgp as dis_bgp
 from eigrp import eigrp as create_eigrp, remove_eigrp_nw as rm_eigrp_nw, disable_eigrp as dis_eigrp
-from help_pages import get_help_page
-import pickle
+from help_pages import get_help_page, HelpPageRegistry, PAGE_STEPS
+from session_pool import SessionPool, SessionCheckError
+from connection_store import ConnectionStore
+from output_cache import OutputCache
+from parsers import PING_PROGRESS, parse, parse_hostname, parse_network_statements, parse_ping, parse_traceroute_hop
+from device_io import DeviceExecutor, DeviceHandle, DeviceLocks
+from contextlib import asynccontextmanager
+from fanout import parse_targets, fan_out, FanoutSummary
+from paging import OutputPager, send_output
+from outbox import Outbox, HIGH, LOW
+from config_txn import ConfigTransaction
+from metrics import Metrics, start_http_server
+from single_flight import SingleFlight
+from save_scheduler import SaveScheduler
+from snapshot_store import SnapshotStore
+from fleet_poller import FleetPoller
+from config_archive import ConfigArchive, unified_diff
+import inspect
 
 load_dotenv()
 TOKEN: Final[str] = os.getenv("DISCORD_TOKEN")
-CHANNEL_ID: Final[int] = int(os.getenv("CHANNEL_ID"))
+CHANNEL_ID: Final[int] = int(os.getenv("CHANNEL_ID", "0"))
+SESSION_POOL_SIZE: Final[int] = int(os.getenv("SESSION_POOL_SIZE", "64"))
+SESSION_IDLE_TTL: Final[int] = int(os.getenv("SESSION_IDLE_TTL", "300"))
+SESSION_RECHECK_AFTER: Final[int] = int(os.getenv("SESSION_RECHECK_AFTER", "10"))
+DEVICE_IO_WORKERS: Final[int] = int(os.getenv("DEVICE_IO_WORKERS", "32"))
+DEVICE_IO_PER_DEVICE: Final[int] = int(os.getenv("DEVICE_IO_PER_DEVICE", "1"))
+DEVICE_CALL_TIMEOUT: Final[int] = int(os.getenv("DEVICE_CALL_TIMEOUT", "120"))
+FANOUT_CONCURRENCY: Final[int] = int(os.getenv("FANOUT_CONCURRENCY", "8"))
+SHOW_CACHE_MAX_BYTES: Final[int] = int(os.getenv("SHOW_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# "write memory" runs once a device has had no save request for SAVE_QUIET seconds, or SAVE_MAX_DELAY after the first.
+SAVE_QUIET: Final[int] = int(os.getenv("SAVE_QUIET", "5"))
+SAVE_MAX_DELAY: Final[int] = int(os.getenv("SAVE_MAX_DELAY", "30"))
+# Devices the background poller queries at once; 0 turns polling off.
+POLL_CONCURRENCY: Final[int] = int(os.getenv("POLL_CONCURRENCY", "0"))
+# Archived running-config versions kept per device; unchanged configs add none.
+CONFIG_ARCHIVE_VERSIONS: Final[int] = int(os.getenv("CONFIG_ARCHIVE_VERSIONS", "100"))
+# Prometheus text endpoint on 127.0.0.1; 0 turns it off.
+METRICS_PORT: Final[int] = int(os.getenv("METRICS_PORT", "9464"))
+
+# Seconds a show command's output may be served from cache, matched by command prefix.
+SHOW_CACHE_TTLS = {
+    'show run': 30,
+    'show ip int brief': 10,
+    'show vlan brief': 30,
+    'show ip route': 10,
+    'show spanning-tree': 15,
+    'show mac address-table': 10,
+    'show ip ospf': 10,
+    'show ip rip': 10,
+    'show ip eigrp': 10,
+    'show ip bgp': 10,
+}
+
+# Show commands the background poller keeps snapshots of, with their poll interval in seconds.
+# A snapshot older than three intervals is not served; the device is asked instead.
+POLL_COMMANDS = {
+    'show ip int brief': 300,
+    'show vlan brief': 600,
+    'show run': 3600,
+}
 
 bot = commands.Bot(command_prefix='!', intents=discord.Intents.all())
-net_connect = None
-
-connections = {}
-
-try:
-    print("Loading user connections data...")
-    file_path = os.path.join(os.path.dirname(__file__), 'user-connections.pkl')
-    with open(file_path, 'rb') as f:
-        connections = pickle.load(f)
-    print("User connections data loaded successfully.")
-except (OSError, FileNotFoundError):
-    print("Failed to load user connections data. No data file found. Creating a new file...")
-    file_path = os.path.join(os.path.dirname(__file__), 'user-connections.pkl')
-    with open(file_path, 'wb') as f:
-        pickle.dump(connections, f)
-    print("New user connections data file created.")
+session_pool = SessionPool(max_sessions=SESSION_POOL_SIZE, idle_ttl=SESSION_IDLE_TTL, recheck_after=SESSION_RECHECK_AFTER)
+device_executor = DeviceExecutor(max_workers=DEVICE_IO_WORKERS, per_device=DEVICE_IO_PER_DEVICE, call_timeout=DEVICE_CALL_TIMEOUT)
+# The poller has its own sessions so polling never evicts the warm sessions of users.
+poll_sessions = SessionPool(max_sessions=max(POLL_CONCURRENCY, 1) * 2, idle_ttl=SESSION_IDLE_TTL, recheck_after=SESSION_RECHECK_AFTER)
+device_locks = DeviceLocks()
+output_cache = OutputCache(SHOW_CACHE_TTLS, max_bytes=SHOW_CACHE_MAX_BYTES)
+metrics = Metrics()
+outbox = Outbox(metrics=metrics)
+single_flight = SingleFlight()
+help_registry = HelpPageRegistry()
+metrics.collect('session_pool', session_pool.stats)
+metrics.collect('executor', device_executor.stats)
+metrics.collect('show_cache', output_cache.stats)
+metrics.collect('outbox', outbox.stats)
+metrics.collect('single_flight', single_flight.stats)
+metrics_server = None
+
+print("Loading user connections data...")
+connections_db = os.getenv("CONNECTIONS_DB", os.path.join(os.path.dirname(__file__), 'user-connections.db'))
+data_dir = os.path.dirname(connections_db)
+connection_store = ConnectionStore(connections_db)
+snapshot_store = SnapshotStore(os.getenv("SNAPSHOTS_DB", os.path.join(data_dir, 'snapshots.db')))
+config_archive = ConfigArchive(os.getenv("CONFIG_ARCHIVE_DB", os.path.join(data_dir, 'config-archive.db')), max_versions=CONFIG_ARCHIVE_VERSIONS)
+migrated = connection_store.migrate_pickle(os.path.join(data_dir, 'user-connections.pkl'), os.path.join(data_dir, 'user-groups.pkl'))
+if migrated:
+    print(f"Migrated {migrated} connections from user-connections.pkl.")
+print("User connections data loaded successfully.")
 
 def no_index_exists():
     embed = discord.Embed(title="Error", color=0xff0000)
@@ -40,23 +107,59 @@ def no_index_exists():
     embed.add_field(name="", value="Use !create_connection <ip_addr> <username> <password> to connect to a device.", inline=False)
     return embed
 
+def invalid_input_embed(error, usage):
+    embed = discord.Embed(title="Error", color=0xff0000)
+    embed.add_field(name="", value=str(error), inline=False)
+    embed.add_field(name="", value=usage, inline=False)
+    return embed
+
+def config_error_embed(errors, usage):
+    embed = discord.Embed(title="Error", color=0xff0000)
+    embed.add_field(name="", value="Invalid input!", inline=False)
+    for error in errors[:10]:
+        embed.add_field(name=error.command, value=error.message, inline=False)
+    embed.add_field(name="", value=usage, inline=False)
+    return embed
+
+@tasks.loop(seconds=30)
+async def sweep_sessions():
+    await device_executor.run(None, session_pool.sweep)
+    await device_executor.run(None, poll_sessions.sweep)
+
 @bot.event
 async def on_ready():
     print('Bot is ready!')
+    global metrics_server
+    if not sweep_sessions.is_running():
+        sweep_sessions.start()
+    if POLL_CONCURRENCY:
+        fleet_poller.start()
+    if METRICS_PORT and metrics_server is None:
+        metrics_server = await start_http_server(metrics, '127.0.0.1', METRICS_PORT)
     channel = bot.get_channel(CHANNEL_ID)
-    embed = discord.Embed(title="Bot is ready!", color=0x00ff00)
-    await channel.send(embed=embed)
+    if channel is not None:
+        embed = discord.Embed(title="Bot is ready!", color=0x00ff00)
+        await outbox.send(channel, embed=embed)
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.started = time.perf_counter()
+
+@bot.after_invoke
+async def stop_command_timer(ctx):
+    metrics.observe('command_seconds', time.perf_counter() - ctx.started, command=ctx.command.name)
 
 @bot.event
 async def on_command_error(ctx, error):
+    metrics.inc('errors_total', type=type(getattr(error, 'original', error)).__name__)
     if isinstance(error, commands.CommandNotFound):
         embed = discord.Embed(title="Error", color=0xff0000)
         embed.add_field(name="", value="Invalid command. Type **!command_list** to see the list of available commands.", inline=False)
-        await ctx.send(embed=embed)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
     elif isinstance(error, commands.MissingRequiredArgument):
         embed = discord.Embed(title="Error", color=0xff0000)
         embed.add_field(name="", value="Missing required arguments. Type **!command_list** to see the list of available commands.", inline=False)
-        await ctx.send(embed=embed)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
     elif isinstance(error, commands.CommandInvokeError):
         if "NetmikoTimeoutException" in str(error):
             embed = discord.Embed(title="Error", color=0xff0000)
@@ -68,868 +171,692 @@ async def on_command_error(ctx, error):
             embed.add_field(name="", value="3. Wrong TCP port.", inline=False)
             embed.add_field(name="", value="4. Device is not reachable.", inline=False)
             embed.add_field(name="", value="5. Intermediate firewall blocking access.", inline=False)
-            await ctx.send(embed=embed)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
         else:
             embed = discord.Embed(title="Error", color=0xff0000)
             embed.add_field(name="", value="An error occurred while executing the command.", inline=False)
             embed.add_field(name="", value=(str(error)), inline=False)
-            await ctx.send(embed=embed)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def create_connection(ctx, ip, username, password):
     discord_username = str(ctx.author)
+    device_index = connection_store.add(discord_username, ip, username, password)
+    await outbox.send(ctx, f"```Connection created for {discord_username} with device #{device_index}.```")
 
-    user_connections = [key for key in connections if key.startswith(f"{discord_username}:")]
-    device_index = len(user_connections) + 1
+@bot.command()
+async def update_connection(ctx, device_index, ip, username, password):
+    discord_username = str(ctx.author)
+    if not connection_store.update(discord_username, device_index, ip, username, password):
+        await outbox.send(ctx, embed=no_index_exists(), priority=HIGH)
+        return
+    await outbox.send(ctx, f"```Device #{device_index} has been updated.```")
 
-    key = f"{discord_username}:{device_index}"
-    if key in connections:
-        await ctx.send(f"```Device {device_index} is already connected for {discord_username}.```")
+@bot.command()
+async def set_liveness(ctx, device_index, mode):
+    discord_username = str(ctx.author)
+    mode = mode.lower()
+    if mode not in ('prompt', 'always', 'none'):
+        embed = discord.Embed(title="Error", color=0xff0000)
+        embed.add_field(name="", value="Invalid mode!", inline=False)
+        embed.add_field(name="", value="Usage: **!set_liveness <device_index> <prompt|always|none>**.", inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
         return
+    if not connection_store.set_liveness(discord_username, device_index, mode):
+        await outbox.send(ctx, embed=no_index_exists(), priority=HIGH)
+        return
+    await outbox.send(ctx, f"```Liveness check for device #{device_index} set to {mode}.```")
+
+@bot.command()
+async def delete_connection(ctx, device_index):
+    discord_username = str(ctx.author)
+    key = f"{discord_username}:{device_index}"
+    async with device_locks.hold(key):
+        if not connection_store.delete(discord_username, device_index):
+            await outbox.send(ctx, embed=no_index_exists(), priority=HIGH)
+            return
+        await device_executor.run(None, session_pool.discard, key)
+    await outbox.send(ctx, f"```Device #{device_index} has been deleted.```")
+
+def device_params(record):
+    # The address may carry a port ("10.0.0.1:2222"), e.g. for simulated devices.
+    ip, username, password, _ = record
+    host, _, port = ip.partition(':')
+    return {
+        'device_type': 'cisco_ios',
+        'host': host,
+        'username': username,
+        'password': password,
+        'port': int(port) if port.isdigit() else 22,
+    }
 
-    connections[key] = [ip, username, password]
+async def open_session(ctx, device_index, notify=True):
+    discord_username = str(ctx.author)
+    key = f"{discord_username}:{device_index}"
+    record = connection_store.get(discord_username, device_index)
+    if record is None:
+        if notify:
+            await outbox.send(ctx, embed=no_index_exists(), priority=HIGH)
+        return None
 
+    ip = record[0]
+    if notify and not session_pool.is_warm(key):
+        await outbox.send(ctx, f'```Connecting to {ip}...```', priority=LOW)
+    started = time.perf_counter()
     try:
-        file_path = os.path.join(os.path.dirname(__file__), 'user-connections.pkl')
-        with open(file_path, 'wb') as f:
-            pickle.dump(connections, f)
-    except:
-        print("Failed to save connections credentials. Please report the issue to the developer.")
-    
-    await ctx.send(f"```Connection created for {discord_username} with device #{device_index}.```")
-    print(connections)
+        connection, reused = await device_executor.run(key, session_pool.acquire, key, device_params(record), record[3])
+    except SessionCheckError:
+        metrics.observe('phase_seconds', time.perf_counter() - started, phase='handshake')
+        if notify:
+            embed = discord.Embed(title="Error", color=0xff0000)
+            embed.add_field(name="", value="Failed to connect to device.", inline=False)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
+        return None
+    metrics.observe('phase_seconds', time.perf_counter() - started, phase='session_reuse' if reused else 'handshake')
+    net_connect = DeviceHandle(device_executor, session_pool, key, connection, output_cache, ip, record[1], metrics)
+    if notify and not reused:
+        embed = discord.Embed(title="Success", color=0x00ff00)
+        embed.add_field(name="", value=f"Connected to {ip} successfully!", inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
+    return net_connect
+
+@asynccontextmanager
+async def device_session(ctx, device_index, notify=True):
+    # Holds the device lock for the whole command so commands to one device never interleave.
+    key = f"{ctx.author}:{device_index}"
+    started = time.perf_counter()
+    async with device_locks.hold(key):
+        metrics.observe('phase_seconds', time.perf_counter() - started, phase='lock_wait')
+        net_connect = await open_session(ctx, device_index, notify)
+        if net_connect is None:
+            yield None
+            return
+        try:
+            yield net_connect
+        except Exception:
+            await net_connect.discard()
+            raise
+        finally:
+            net_connect.release()
+
+async def fetch_command(ctx, device_index, command):
+    async with device_session(ctx, device_index) as net_connect:
+        if net_connect is None:
+            return None
+        return await net_connect.send_command(command)
+
+async def read_command(ctx, device_index, command):
+    # Fresh cached output is returned without taking the device lock or a session,
+    # and identical reads of one device that overlap share a single execution.
+    record = connection_store.get(str(ctx.author), device_index)
+    if record is None:
+        return await fetch_command(ctx, device_index, command)
+    output = output_cache.get(record[0], record[1], command, count_miss=False)  # send_command counts the miss
+    if output is not None:
+        return output
+    output, shared = await single_flight.run((record[0], record[1], command), fetch_command, ctx, device_index, command)
+    if output is None and shared:
+        # The leading caller got no session; try again so this caller sees its own error.
+        output = await fetch_command(ctx, device_index, command)
+    return output
+
+async def stream_paged(ctx, device_index, command, pager):
+    async with device_session(ctx, device_index) as net_connect:
+        if net_connect is None:
+            return None
+        async for line in net_connect.stream_command(command, read_timeout=DEVICE_CALL_TIMEOUT):
+            await pager.feed(line)
+    return pager.text()
+
+async def read_paged(ctx, device_index, command, filename):
+    # Like read_command, but long output is paged to the channel while the device is still printing.
+    # Returns (output, delivered); short output is left for the caller to send.
+    pager = OutputPager(outbox.to(ctx), filename)
+    record = connection_store.get(str(ctx.author), device_index)
+    if record is None:
+        return await stream_paged(ctx, device_index, command, pager), False
+    output = output_cache.get(record[0], record[1], command)
+    replay = True  # cached or shared output still has to be paged; streamed output already was
+    if output is None:
+        output, replay = await single_flight.run((record[0], record[1], command), stream_paged, ctx, device_index, command, pager)
+        if output is None and replay:
+            output, replay = await stream_paged(ctx, device_index, command, pager), False
+        if output is None:
+            return None, False
+    if replay:
+        for line in output.split('\n'):
+            await pager.feed(line)
+    return output, await pager.finish()
 
 @bot.command()
 async def connect(ctx, device_index: int = None):
-    global net_connect
     discord_username = str(ctx.author)
 
     if device_index is None:
-        user_connections = [key for key in connections if key.startswith(f"{discord_username}:")]
+        user_connections = connection_store.list_user(discord_username)
         if not user_connections:
             embed = discord.Embed(title="Error", color=0xff0000)
             embed.add_field(name="", value="You don't have any devices connected.", inline=False)
             embed.add_field(name="", value="Use !create_connection first.", inline=False)
-            await ctx.send(embed=embed)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return None
-        device_index = 1
-
-    key = f"{discord_username}:{device_index}"
-    if key not in connections:
-        embed = discord.Embed(title="Error", description="Device not found", color=0xff0000)
-        embed.add_field(name="", value=f"No device information found for the device at index {device_index}.", inline=False)
-        embed.add_field(name="", value="Use !create_connection first.", inline=False)
-        await ctx.send(embed=embed)
-        #await ctx.send(f"```No device information found for the device at index {device_index}.\n\nUse !create_connection first.```")
-        return None
-
-    ip, username, password = connections[key]
+        device_index = user_connections[0][0]
 
-    device = {
-        'device_type': 'cisco_ios',
-        'host': ip,
-        'username': username,
-        'password': password,
-        'port': 22,
-    }
-
-    await ctx.send(f'```Connecting to {ip}...```')
-    net_connect = ConnectHandler(**device)
-    output = net_connect.send_command('show ip int brief')
-    if output == '':
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to device.", inline=False)
-        await ctx.send(embed=embed)
-        return None
-    else:
-        embed = discord.Embed(title="Success", color=0x00ff00)
-        embed.add_field(name="", value=f"Connected to {ip} successfully!", inline=False)
-        await ctx.send(embed=embed)
+    async with device_session(ctx, device_index) as net_connect:
         return net_connect
 
 @bot.command()
 async def command_list(ctx):
     mention = ctx.author.mention
     channel = await ctx.author.create_dm()
-    message = await channel.send(embed=get_help_page(1))
-    await message.add_reaction('⬅️')
-    await message.add_reaction('➡️')
-    await ctx.send(f'{mention}'+'``` Command lists sent to your DM!```')
+    message = await outbox.send(channel, embed=get_help_page(1), priority=HIGH)
+    help_registry.add(message.id)
+    for emoji in PAGE_STEPS:
+        await message.add_reaction(emoji)
+    await outbox.send(ctx, f'{mention}'+'``` Command lists sent to your DM!```')
 
 @bot.event
 async def on_raw_reaction_add(payload):
-    message_id = payload.message_id
-    message = await bot.get_channel(payload.channel_id).fetch_message(message_id)
-    page = 1
-    if "Help (1/5)" in message.embeds[0].title:
-        page = 1
-    elif "Help (2/5)" in message.embeds[0].title:
-        page = 2
-    elif "Help (3/5)" in message.embeds[0].title:
-        page = 3
-    elif "Help (4/5)" in message.embeds[0].title:
-        page = 4
-    elif "Help (5/5)" in message.embeds[0].title:
-        page = 5
-    if str(payload.emoji) == '⬅️':
-        # await message.remove_reaction('⬅️', payload.member)
-        if page == 1:
-            await message.edit(embed=get_help_page(5))
-        else:
-            await message.edit(embed=get_help_page(page-1))
-    elif str(payload.emoji) == '➡️':
-        # await message._remove_reaction('➡️', payload.member)
-        if page == 5:
-            await message.edit(embed=get_help_page(1))
-        else:
-            await message.edit(embed=get_help_page(page+1))
+    # Only reactions on help messages this bot sent do any work, and none of them fetch the message.
+    if payload.user_id == bot.user.id:
+        return
+    page = help_registry.turn(payload.message_id, str(payload.emoji))
+    if page is None:
+        return
+    message = bot.get_partial_messageable(payload.channel_id).get_partial_message(payload.message_id)
+    try:
+        await message.edit(embed=get_help_page(page))
+    except discord.NotFound:
+        help_registry.forget(payload.message_id)
 
 @bot.command()
 async def show_connection(ctx):
     discord_username = str(ctx.author)
-    user_connections = [key for key in connections if key.startswith(f"{discord_username}:")]
+    user_connections = connection_store.list_user(discord_username)
     if not user_connections:
         embed = discord.Embed(title="Error", color=0xff0000)
         embed.add_field(name="", value="You don't have any devices connected.", inline=False)
         embed.add_field(name="", value="Use **!create_connection** first.", inline=False)
-        await ctx.send(embed=embed)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
         return
 
     embed = discord.Embed(title="Connected Devices", color=0x00ff00)
-    for key in user_connections:
-        device_index = key.split(":")[1]
-        ip, _, _ = connections[key]
+    for device_index, (ip, _, _, _) in user_connections:
         embed.add_field(name=f"Device #{device_index}", value=f"IP: {ip}", inline=False)
     mention = ctx.author.mention
-    await ctx.send(mention + '```List of connected devices has been sent to your DM!```')
-    await ctx.author.send(embed=embed)
+    await outbox.send(ctx, mention + '```List of connected devices has been sent to your DM!```')
+    await outbox.send(ctx.author, embed=embed, priority=HIGH)
+
+async def stream_lines(ctx, header, lines, keep):
+    # Shows matching lines in one message that is edited at most once a second while the command runs.
+    message = await outbox.send(ctx, '```' + header + '```', merge=False)
+    shown = []
+    output = []
+    last_edit = time.monotonic()
+    async for line in lines:
+        output.append(line)
+        if not keep(line):
+            continue
+        shown.append(line)
+        if time.monotonic() - last_edit >= 1:
+            await message.edit(content='```' + '\n'.join([header] + shown)[-1990:] + '```')
+            last_edit = time.monotonic()
+    if shown:
+        await message.edit(content='```' + '\n'.join([header] + shown)[-1990:] + '```')
+    return '\n'.join(output)
 
 @bot.command()
-async def ping(ctx, index, ip):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    net_connect = await connect(ctx, index)
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        await ctx.send(embed=embed)
-    else:
-        cmd_list = ['ping ' + ip,
-                     '\n']
-        await ctx.send(f'```Pinging to {ip}...```')
-        output = net_connect.send_multiline_timing(cmd_list)
-        count = output.count('!')
-        embed = discord.Embed(title="Ping Result", color=0x00ff00)
-        embed.add_field(name="Packets sent", value="5", inline=False)
-        embed.add_field(name="Packets received", value=str(count), inline=False)
+async def ping(ctx, index, ip, repeat: int = 5, size: int = None, timeout: int = None):
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        command = f'ping {ip} repeat {repeat}'
+        if size:
+            command += f' size {size}'
+        if timeout:
+            command += f' timeout {timeout}'
+        read_timeout = repeat * (timeout or 2) + 10
+        lines = net_connect.stream_command(command, read_timeout=read_timeout)
+        output = await stream_lines(ctx, f'Pinging to {ip}...', lines, PING_PROGRESS.match)
+        with metrics.span('parse', kind='ping'):
+            result = parse_ping(output)
+        if 'Invalid' in output or result is None:
+            embed = discord.Embed(title="Error", color=0xff0000)
+            embed.add_field(name="", value="Invalid input!", inline=False)
+            embed.add_field(name="", value="Usage: **!ping <device_index> <ip_dest> <repeat (Optional)> <size (Optional)> <timeout (Optional)>**.", inline=False)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
+            return
+        percent, received, sent = result.percent, result.received, result.sent
+        embed = discord.Embed(title="Ping Result", color=0x00ff00 if received else 0xff0000)
+        embed.add_field(name="Packets sent", value=str(sent), inline=False)
+        embed.add_field(name="Packets received", value=str(received), inline=False)
         embed.add_field(name="", value="----------------------", inline=False)
-        embed.add_field(name="Packet received", value=f"{count} ({count * 20}% received)", inline=False)
-        embed.add_field(name="Packet loss", value=f"{5 - count} ({(5 - count) * 20}% loss)", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
-        
-@bot.command()
-async def show_int(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    net_connect = await connect(ctx, index)
+        embed.add_field(name="Packet received", value=f"{received} ({percent}% received)", inline=False)
+        embed.add_field(name="Packet loss", value=f"{sent - received} ({100 - percent}% loss)", inline=False)
+        if result.round_trip:
+            embed.add_field(name="Round-trip min/avg/max", value=result.round_trip + " ms", inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
+
+async def poll_device(host, login, record, commands):
+    key = f"poller:{login}@{host}"
+    async with device_locks.hold(key):
+        connection, _ = await device_executor.run(key, poll_sessions.acquire, key, device_params(record), record[3])
+        net_connect = DeviceHandle(device_executor, poll_sessions, key, connection, None, host, login, metrics)
+        try:
+            outputs = await net_connect.send_batch(commands, read_timeout=DEVICE_CALL_TIMEOUT)
+        except Exception:
+            await net_connect.discard()
+            raise
+        finally:
+            net_connect.release()
+    for command, output in zip(commands, outputs):
+        if command == 'show run':
+            await device_executor.run(None, config_archive.add, host, login, output)
+    return outputs
+
+fleet_poller = FleetPoller(connection_store.devices, poll_device, snapshot_store, POLL_COMMANDS, device_executor,
+                           concurrency=max(POLL_CONCURRENCY, 1))
+metrics.collect('poller', fleet_poller.stats)
+metrics.collect('config_archive', config_archive.stats)
+
+def format_age(seconds):
+    if seconds < 120:
+        return f"{seconds:.0f} s"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+async def read_snapshot(ctx, device_index, command, live=None):
+    # Returns (output, age in seconds); the polled snapshot is used unless "--live" is given or it is too old.
+    record = connection_store.get(str(ctx.author), device_index)
+    if record is not None and live != '--live':
+        snapshot = await device_executor.run(None, snapshot_store.get, record[0], record[1], command)
+        if snapshot is not None:
+            output, taken_at = snapshot
+            age = max(time.time() - taken_at, 0)
+            # A snapshot from before the bot last changed the device shows the old state.
+            if age <= POLL_COMMANDS[command] * 3 and taken_at >= output_cache.changed_at(record[0]):
+                return output, age
+    return await read_command(ctx, device_index, command), None
+
+def count_by(values):
+    counts = {}
+    for value in values:
+        counts[value] = counts.get(value, 0) + 1
+    return ', '.join(f'{value} {count}' for value, count in counts.items())
+
+def interfaces_summary(interfaces):
+    down = [interface.name for interface in interfaces if (interface.status, interface.protocol) != ('up', 'up')]
+    summary = f'{len(interfaces)} interfaces, {len(interfaces) - len(down)} up/up'
+    if down:
+        summary += ', not up: ' + ', '.join(down[:10]) + (', ...' if len(down) > 10 else '')
+    return summary
+
+def vlans_summary(vlans):
+    return f'{len(vlans)} VLANs, {sum(len(vlan.ports) for vlan in vlans)} ports assigned'
+
+def routes_summary(routes):
+    prefixes = len({(route.network, route.prefix_length) for route in routes})
+    return f'{prefixes} prefixes, {len(routes)} paths ({count_by(route.code for route in routes)})'
+
+def mac_table_summary(entries):
+    vlans = len({entry.vlan for entry in entries})
+    return f'{len(entries)} MAC addresses in {vlans} VLANs ({count_by(entry.type for entry in entries)})'
+
+# show command -> (parser kind, summary of its records)
+SUMMARIES = {
+    'show ip int brief': ('interfaces', interfaces_summary),
+    'show vlan brief': ('vlans', vlans_summary),
+    'show ip route': ('routes', routes_summary),
+    'show mac address-table': ('mac_table', mac_table_summary),
+}
+
+def output_summary(command, output):
+    # One line built from the parsed records, or None when the command has no parser or nothing parsed.
+    if command not in SUMMARIES:
+        return None
+    kind, summarize = SUMMARIES[command]
+    with metrics.span('parse', kind=kind):
+        records = parse(kind, output)
+    return summarize(records) if records else None
 
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        await ctx.send(embed=embed)
-        # await ctx.send('```You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.```')
-    else:
-        output = net_connect.send_command('show ip int brief')
-        await ctx.send('```'+output+'```')
-        net_connect.disconnect()
+async def send_summary(ctx, command, output):
+    summary = output_summary(command, output)
+    if summary:
+        await outbox.send(ctx, '```' + summary + '```')
+
+async def send_snapshot_age(ctx, name, index, age):
+    if age is not None:
+        await outbox.send(ctx, f'```As of {format_age(age)} ago. Use !{name} {index} --live for current data.```')
 
 @bot.command()
-async def show_vlan(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
+async def show_int(ctx, index, live=None):
+    output, age = await read_snapshot(ctx, index, 'show ip int brief', live)
+    if output is None:
         return
-    net_connect = await connect(ctx, index)
+    await send_output(outbox.to(ctx), output, 'ip-int-brief')
+    await send_summary(ctx, 'show ip int brief', output)
+    await send_snapshot_age(ctx, 'show_int', index, age)
 
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('```You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.```')
+@bot.command()
+async def show_vlan(ctx, index, live=None):
+    output, age = await read_snapshot(ctx, index, 'show vlan brief', live)
+    if output is None:
+        return
+    if 'Invalid' in output:
+        await outbox.send(ctx, '```This command is not supported on router.```')
     else:
-        output = net_connect.send_command('show vlan brief')
-        if 'Invalid' in output:
-            await ctx.send('```This command is not supported on router.```')
-        else:
-            await ctx.send('```'+output+'```')
-            net_connect.disconnect()
+        await send_output(outbox.to(ctx), output, 'vlan-brief')
+        await send_summary(ctx, 'show vlan brief', output)
+        await send_snapshot_age(ctx, 'show_vlan', index, age)
 
 @bot.command()
 async def show_run(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
+    output, delivered = await read_paged(ctx, index, 'show run', 'running-config')
+    if output is None:
         return
-    net_connect = await connect(ctx, index)
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
-        output = net_connect.send_command('show run')
-        await ctx.send('```'+output+'```')
-        net_connect.disconnect() 
+    record = connection_store.get(str(ctx.author), index)
+    if record is not None:
+        await device_executor.run(None, config_archive.add, record[0], record[1], output)
+    if delivered:
+        return
+    await outbox.send(ctx, '```'+output+'```')
 
 @bot.command()
 async def show_run_int(ctx, index, interface):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
+    output = await read_command(ctx, index, 'show run int ' + interface)
+    if output is None:
         return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
+    if "Invalid" in output:
         embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
+        embed.add_field(name="", value="Invalid Interface.", inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
     else:
-        output = net_connect.send_command('show run int ' + interface)
-        if "Invalid" in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid Interface.", inline=False)
-            net_connect.disconnect()
-            await ctx.send(embed=embed)
-        else:
-            await ctx.send('```'+output+'```')
-        net_connect.disconnect()
+        await send_output(outbox.to(ctx), output, 'running-config-interface')
+
+async def write_memory(record):
+    # Runs on a session of its own, so a merged save does not depend on the device entry
+    # or the session of whichever user happened to ask last.
+    host, login = record[0], record[1]
+    key = f"save:{login}@{host}"
+    async with device_locks.hold(key):
+        connection, _ = await device_executor.run(key, session_pool.acquire, key, device_params(record), record[3])
+        net_connect = DeviceHandle(device_executor, session_pool, key, connection, output_cache, host, login, metrics)
+        try:
+            return await net_connect.send_command('wr')
+        except Exception:
+            await net_connect.discard()
+            raise
+        finally:
+            net_connect.release()
+
+# Saves are keyed by (device address, login), so requests from several users sharing a login share a write.
+save_scheduler = SaveScheduler(write_memory, quiet=SAVE_QUIET, max_delay=SAVE_MAX_DELAY)
+metrics.collect('save_scheduler', save_scheduler.stats)
 
 @bot.command()
 async def save_config(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
+    record = connection_store.get(str(ctx.author), index)
+    if record is None:
+        await outbox.send(ctx, embed=no_index_exists(), priority=HIGH)
         return
+    handle = save_scheduler.request(record[:2], record)
+    if SAVE_QUIET:
+        await outbox.send(ctx, f'```Saving {record[0]} once no further save has been requested for {SAVE_QUIET} seconds...```', priority=LOW)
     try:
-        net_connect = await connect(ctx, index)
-    except:
+        await handle
+    except Exception as error:
         embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
+        embed.add_field(name="", value="Failed to save the configuration.", inline=False)
+        embed.add_field(name="", value=str(error), inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
         return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
-        output = net_connect.send_command('wr')
-        embed = discord.Embed(title="Success", color=0x00ff00)
-        embed.add_field(name="", value="Configuration has been saved!", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+    embed = discord.Embed(title="Success", color=0x00ff00)
+    embed.add_field(name="", value="Configuration has been saved!", inline=False)
+    await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def hostname(ctx, index, hostname):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         command_list = ['hostname ' + hostname]
-        output = net_connect.send_config_set(command_list)
-        await ctx.send('```Hostname has been set to ' + hostname+'```')
-        net_connect.disconnect()
+        output = await net_connect.send_config_set(command_list)
+        await outbox.send(ctx, '```Hostname has been set to ' + hostname+'```')
         
 @bot.command()
 async def show_hostname(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
+    output = await read_command(ctx, index, 'show run | include hostname')
+    if output is None:
         return
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
-        output = net_connect.send_command('show run | include hostname')
-        output = output.split(' ')[1]
-        await ctx.send('```Hostname: '+output+'```')
-        net_connect.disconnect()
+    await outbox.send(ctx, '```Hostname: '+(parse_hostname(output) or output.strip())+'```')
 
 @bot.command()
 async def show_route(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f'{discord_username}:{index}'
-    if key not in connections:
-        no_index_exists()
+    output, delivered = await read_paged(ctx, index, 'show ip route', 'ip-route')
+    if output is None:
         return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
-        output = net_connect.send_command('show ip route')
-        await ctx.send('```'+output+'```')
-        net_connect.disconnect()
+    if not delivered:
+        await outbox.send(ctx, '```'+output+'```')
+    await send_summary(ctx, 'show ip route', output)
         
 @bot.command()
 async def create_route(ctx , index, dest_ip, dest_mark, next_hop):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         command_list = ['ip route ' + dest_ip + ' ' + dest_mark + ' ' + next_hop]
-        output = net_connect.send_config_set(command_list)
-        await ctx.send('```Route has been added!```')
-        net_connect.disconnect()
+        output = await net_connect.send_config_set(command_list)
+        await outbox.send(ctx, '```Route has been added!```')
 
 @bot.command()
 async def delete_route(ctx, index, dest_ip, dest_mark, next_hop):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
-        output = net_connect.send_command(f'no ip route {dest_ip} {dest_mark} {next_hop}')
-        await ctx.send('```Route has been deleted!```')
-        net_connect.disconnect()
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        output = await net_connect.send_command(f'no ip route {dest_ip} {dest_mark} {next_hop}')
+        await outbox.send(ctx, '```Route has been deleted!```')
         
 @bot.command()
 async def show_spanning_tree(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
+    output = await read_command(ctx, index, 'show spanning-tree')
+    if output is None:
         return
-
-    if net_connect == None:
+    if 'No spanning tree' in output:
         embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
-        output = net_connect.send_command('show spanning-tree')
-        if 'No spanning tree' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value=output, inline=False)
-            await ctx.send(embed=embed)
-        await ctx.send('```'+output+'```')
-        net_connect.disconnect()
+        embed.add_field(name="", value=output, inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
+    await send_output(outbox.to(ctx), output, 'spanning-tree')
 
 @bot.command()
 async def banner(ctx, index, text):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         if "#" in text:
             command_list = ['banner motd = ' + text + ' =']
         else:
             command_list = ['banner motd # ' + text + ' #']
-        output = net_connect.send_config_set(command_list)
-        await ctx.send('```Banner has been set!```')
-        net_connect.disconnect()
+        output = await net_connect.send_config_set(command_list)
+        await outbox.send(ctx, '```Banner has been set!```')
 
 @bot.command()
 async def create_vlan(ctx, index, id):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         configs = ['vlan ' + id]
-        net_connect.send_config_set(configs)
-        await ctx.send(f'```VLAN {id} created.```')
-        net_connect.disconnect()
+        await net_connect.send_config_set(configs)
+        await outbox.send(ctx, f'```VLAN {id} created.```')
 
 @bot.command()
 async def vlan_ip_add(ctx, index, vlan, ip_addr, netmask):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         configs = ['int ' + vlan,
                    'ip add ' + ip_addr + ' ' + netmask]
-        net_connect.send_config_set(configs)
-        await ctx.send(f'```IP Address {ip_addr} and Subnet Mask {netmask} has been added to VLAN {vlan}.```')
-        net_connect.disconnect()
+        await net_connect.send_config_set(configs)
+        await outbox.send(ctx, f'```IP Address {ip_addr} and Subnet Mask {netmask} has been added to VLAN {vlan}.```')
 
 @bot.command()
 async def vlan_ip_delete(ctx, index, vlan):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connect <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         configs = ['int ' + vlan,
                    'no ip add']
-        net_connect.send_config_set(configs)
-        await ctx.send(f'```IP Address and Subnet Mask has been deleted from VLAN {vlan}.```')
-        net_connect.disconnect()
+        await net_connect.send_config_set(configs)
+        await outbox.send(ctx, f'```IP Address and Subnet Mask has been deleted from VLAN {vlan}.```')
 
 @bot.command()
 async def vlan_no_shut(ctx, index, id):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         configs = ['vlan ' + id,
                    'no sh']
-        net_connect.send_config_set(configs)
-        await ctx.send(f'```No shutdown VLAN {id} succeed.```')
-        net_connect.disconnect()
+        await net_connect.send_config_set(configs)
+        await outbox.send(ctx, f'```No shutdown VLAN {id} succeed.```')
 
 @bot.command()
 async def delete_vlan(ctx, index, id):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         configs = ['no vlan ' + id]
-        net_connect.send_config_set(configs)
-        await ctx.send(f'```VLAN {id} has been deleted.```')
-        net_connect.disconnect()
+        await net_connect.send_config_set(configs)
+        await outbox.send(ctx, f'```VLAN {id} has been deleted.```')
+
+def interface_ip(interface, ip, mask):
+    return ['int ' + interface,
+            'no ip add',
+            'ip add ' + ip + ' ' + mask]
 
 @bot.command()
 async def int_ip_add(ctx, index, interface, ip, mask):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
-        configs = ['int ' + interface,
-                   'no ip add',
-                   'ip add ' + ip + ' ' + mask]
-        output = net_connect.send_config_set(configs)
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        configs = interface_ip(interface, ip, mask)
+        output = await net_connect.send_config_set(configs)
         if "Invalid" in output:
             embed = discord.Embed(title="Error", color=0xff0000)
             embed.add_field(name="", value="Invalid Interface or IP Address or Subnet Mask.", inline=False)
-            net_connect.disconnect()
-            await ctx.send(embed=embed)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
         else:
-            await ctx.send(f'```IP Address {ip} and Subnet Mask {mask} has been added to Interface {interface}```')
-        net_connect.disconnect()
+            await outbox.send(ctx, f'```IP Address {ip} and Subnet Mask {mask} has been added to Interface {interface}```')
 
 @bot.command()
 async def add_gateway(ctx, index, ip_gateway):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         configs = ['ip default-gateway ' + ip_gateway]
-        net_connect.send_config_set(configs)
-        await ctx.send(f'```IP Default Gateway {ip_gateway} has been set on the device.```')
-        net_connect.disconnect()
+        await net_connect.send_config_set(configs)
+        await outbox.send(ctx, f'```IP Default Gateway {ip_gateway} has been set on the device.```')
 
 @bot.command()
 async def delete_gateway(ctx, index, ip_gateway):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         configs = ['no ip default-gateway ' + ip_gateway]
-        net_connect.send_config_set(configs)
-        await ctx.send(f'```IP Default Gateway {ip_gateway} has been deleted.```')
-        net_connect.disconnect()
+        await net_connect.send_config_set(configs)
+        await outbox.send(ctx, f'```IP Default Gateway {ip_gateway} has been deleted.```')
 
 @bot.command()
 async def int_switch_mode(ctx, index, interface, mode):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         mode = mode.lower()
         configs = ['int ' + interface,
                     'switchport mode ' + mode]
-        output = net_connect.send_config_set(configs)
+        output = await net_connect.send_config_set(configs)
         if 'Invalid' in output:
             embed = discord.Embed(title="Error", color=0xff0000)
             embed.add_field(name="Invalid device or input or interface doesn't exist!", value="", inline=False)
             embed.add_field(name="", value="This command is not supported on router!", inline=False)
             embed.add_field(name="", value="Usage: **!int_switch_mode <device_index> <interface> <mode>**", inline=False)
-            await ctx.send(embed=embed)
-            net_connect.disconnect()
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
         if mode == 'access':
-            await ctx.send(f'```Changed {interface} to switchport mode access successfully!```')
+            await outbox.send(ctx, f'```Changed {interface} to switchport mode access successfully!```')
         elif mode == 'trunk':
-            await ctx.send(f'```Changed {interface} to switchport mode trunk successfully!```')
-        net_connect.disconnect()
+            await outbox.send(ctx, f'```Changed {interface} to switchport mode trunk successfully!```')
 
 @bot.command()
 async def int_access_vlan(ctx, index, interface, vlan_id):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         configs = ['int ' + interface,
                    'switchport access vlan ' + vlan_id]
-        output = net_connect.send_config_set(configs)
+        output = await net_connect.send_config_set(configs)
         if 'Invalid' in output:
             embed = discord.Embed(title="Error", color=0xff0000)
             embed.add_field(name="Invalid input or interface doesn't exist!", value="", inline=False)
             embed.add_field(name="", value="This command is not supported on router!", inline=False)
             embed.add_field(name="", value="Usage: **!int_access_vlan <device_index> <interface> <vlan_id>**", inline=False)
-            await ctx.send(embed=embed)
-            net_connect.disconnect()
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
-        await ctx.send(f'```Interface {interface} is now accessed in VLAN {vlan_id}!```')
-        net_connect.disconnect()
+        await outbox.send(ctx, f'```Interface {interface} is now accessed in VLAN {vlan_id}!```')
 
 @bot.command()
 async def int_no_shut(ctx,index, interface):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         configs = ['int ' + interface,
                    'no shut']
-        output = net_connect.send_config_set(configs)
+        output = await net_connect.send_config_set(configs)
         if 'Invalid' in output:
             embed = discord.Embed(title="Error", color=0xff0000)
             embed.add_field(name="Invalid input or interface doesn't exist!", value="", inline=False)
             embed.add_field(name="", value="Usage: **!int_no_shut <device_index> <interface>**", inline=False)
-            await ctx.send(embed=embed)
-            net_connect.disconnect()
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
-        await ctx.send(f'```Interface {interface} is now no shutdown.```')
-        net_connect.disconnect()
+        await outbox.send(ctx, f'```Interface {interface} is now no shutdown.```')
 
 @bot.command()
 async def int_shut(ctx,index, interface):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-        # await ctx.send('You need to connect to a device first!\n\nUse !connect <ip> <username> <password> to connect to a device.')
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         configs = ['int ' + interface,
                    'shut']
-        output = net_connect.send_config_set(configs)
+        output = await net_connect.send_config_set(configs)
         if 'Invalid' in output:
             embed = discord.Embed(title="Error", color=0xff0000)
             embed.add_field(name="Invalid input or interface doesn't exist!", value="", inline=False)
             embed.add_field(name="", value="Usage: **!int_shut <device_index> <interface>**", inline=False)
-            await ctx.send(embed=embed)
-            net_connect.disconnect()
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
-        await ctx.send(f'```Interface {interface} is now shuted down.```')
-        net_connect.disconnect()
+        await outbox.send(ctx, f'```Interface {interface} is now shuted down.```')
 
 @bot.command()
-async def ospf(ctx, index, networks):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
+async def ospf(ctx, index, networks, summarize=None):
+    usage = "Usage: **!ospf <device_index> <network_ip/netmask(1-32)/area,network_ip2/netmask2(1-32)/area2> <summarize (Optional)>**."
     try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
+        commands = create_ospf(networks, summarize == 'summarize')
+    except ValueError as error:
+        await outbox.send(ctx, embed=invalid_input_embed(error, usage), priority=HIGH)
         return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
-        commands = create_ospf(networks)
-        output = net_connect.send_config_set(commands)
-        if 'Invalid' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid input!", inline=False)
-            embed.add_field(name="", value="Usage: **!ospf <device_index> <network_ip/netmask(1-32)/area,network_ip2/netmask2(1-32)/area2>**.", inline=False)
-            await ctx.send(embed=embed)
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        result = await ConfigTransaction().add(commands).reconcile(net_connect)
+        if result.errors:
+            await outbox.send(ctx, embed=config_error_embed(result.errors, usage), priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="OSPF has been configured with the following configuration", inline=False)
-        network_list = net_connect.send_command('show run | include network | begin router ospf')
-        network_list = network_list.split('\n')
+        if not result.applied:
+            embed.add_field(name="", value="The device already had this configuration, nothing was sent.", inline=False)
+        with metrics.span('parse', kind='network_statements'):
+            network_list = parse_network_statements(result.readback)
         for command in commands:
             if "network" in command:
                 ip = command.split(' ')[1]
@@ -941,284 +868,163 @@ async def ospf(ctx, index, networks):
                 embed.add_field(name="", value="----------------------", inline=False)
         if len(network_list) > 0:
             embed.add_field(name="Existing networks currently within OSPF", value="", inline=False)
-            for network in network_list:
-                network = network.strip()
-                network = network.split(' ')[1]
-                embed.add_field(name="Network", value=network, inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+            for statement in network_list:
+                embed.add_field(name="Network", value=statement.network, inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def remove_ospf_nw(ctx, index, networks):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
+    usage = "Usage: **!remove_ospf_nw <device_index> <network_ip/netmask(1-32)/area,network_ip2/netmask2(1-32)/area2>**."
     try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
         commands = rm_ospf_nw(networks)
-        output = net_connect.send_config_set(commands)
-        if 'Invalid' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid input!", inline=False)
-            embed.add_field(name="", value="Usage: **!remove_ospf_nw <device_index> <network_ip/netmask(1-32)/area,network_ip2/netmask2(1-32)/area2>**.", inline=False)
-            await ctx.send(embed=embed)
+    except ValueError as error:
+        await outbox.send(ctx, embed=invalid_input_embed(error, usage), priority=HIGH)
+        return
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        result = await ConfigTransaction().add(commands).reconcile(net_connect)
+        if result.errors:
+            await outbox.send(ctx, embed=config_error_embed(result.errors, usage), priority=HIGH)
+            return
+        if not any(command.startswith('no ') for command in result.applied):
+            embed = discord.Embed(title="No result", color=0xff0000)
+            embed.add_field(name="", value="None of these networks are configured on the device, nothing was removed.", inline=False)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="The following OSPF networks has been removed.", inline=False)
-        for command in commands:
+        for command in result.applied:
             if "network" in command:
                 ip = command.split(' ')[2]
                 area = command.split(' ')[5]
                 embed.add_field(name="Network", value=ip + " Area: " + area, inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def disable_ospf(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         commands = dis_ospf()
-        output = net_connect.send_config_set(commands)
+        output = await net_connect.send_config_set(commands)
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="OSPF has been disabled.", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def show_ospf(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
+    output = await read_command(ctx, index, 'show ip ospf database')
+    if output is None:
         return
-
-    if net_connect == None:
+    if "" == output:
         embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
+        embed.add_field(name="", value="- OSPF is not setup yet.", inline=False)
+        embed.add_field(name="", value="- OSPF can't communicate with neighbors to complete the protocol setup.", inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
     else:
-        output = net_connect.send_command('show ip ospf database')
-        if "" == output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="- OSPF is not setup yet.", inline=False)
-            embed.add_field(name="", value="- OSPF can't communicate with neighbors to complete the protocol setup.", inline=False)
-            await ctx.send(embed=embed)
-        else:
-            await ctx.send('```'+output+'```')
-        net_connect.disconnect()
+        await send_output(outbox.to(ctx), output, 'ospf')
 
 @bot.command()
 async def rip(ctx, index, networks):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
+    usage = "Usage: **!rip <device_index> <network_ip,network_ip2>**."
     try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
         command_set = create_rip(networks)
-        output = net_connect.send_config_set(command_set)
-        if 'Invalid' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid input!", inline=False)
-            embed.add_field(name="", value="Usage: **!rip <device_index> <network_ip,network_ip2>**.", inline=False)
-            await ctx.send(embed=embed)
+    except ValueError as error:
+        await outbox.send(ctx, embed=invalid_input_embed(error, usage), priority=HIGH)
+        return
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        result = await ConfigTransaction().add(command_set).reconcile(net_connect)
+        if result.errors:
+            await outbox.send(ctx, embed=config_error_embed(result.errors, usage), priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="RIP has been configured with the following configuration", inline=False)
-        network_list = net_connect.send_command('show run | include network | begin router rip')
-        network_list = network_list.strip().split('\n')
-        for command in network_list:
-            if "network" in command:
-                command = command.strip()
-                ip = command.split(' ')[1]
-                embed.add_field(name="Network", value=ip, inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        if not result.applied:
+            embed.add_field(name="", value="The device already had this configuration, nothing was sent.", inline=False)
+        with metrics.span('parse', kind='network_statements'):
+            network_list = parse_network_statements(result.readback)
+        for statement in network_list:
+            embed.add_field(name="Network", value=statement.network, inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def remove_rip_nw(ctx, index, networks):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
+    usage = "Usage: **!remove_rip_nw <device_index> <network_ip,network_ip2>**."
     try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
         command_list = rm_rip_nw(networks)
-        output = net_connect.send_config_set(command_list)
-        if 'Invalid' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid input!", inline=False)
-            embed.add_field(name="", value="Usage: **!remove_rip_nw <device_index> <network_ip,network_ip2>**.", inline=False)
-            await ctx.send(embed=embed)
+    except ValueError as error:
+        await outbox.send(ctx, embed=invalid_input_embed(error, usage), priority=HIGH)
+        return
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        result = await ConfigTransaction().add(command_list).reconcile(net_connect)
+        if result.errors:
+            await outbox.send(ctx, embed=config_error_embed(result.errors, usage), priority=HIGH)
+            return
+        if not any(command.startswith('no ') for command in result.applied):
+            embed = discord.Embed(title="No result", color=0xff0000)
+            embed.add_field(name="", value="None of these networks are configured on the device, nothing was removed.", inline=False)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="The following RIP networks has been removed.", inline=False)
-        for command in command_list:
+        for command in result.applied:
             if "network" in command:
                 ip = command.split(' ')[2]
                 embed.add_field(name="Network", value=ip, inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def disable_rip(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         command_list = dis_rip()
-        output = net_connect.send_config_set(command_list)
+        output = await net_connect.send_config_set(command_list)
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="RIP has been disabled.", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def show_rip(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
+    output = await read_command(ctx, index, 'show ip rip database')
+    if output is None:
+        return
+    if "" == output:
+        embed = discord.Embed(title="No result", color=0xff0000)
+        embed.add_field(name="", value="- RIP is not setup yet.", inline=False)
+        embed.add_field(name="", value="- RIP can't communicate with neighbors to complete the protocol setup.", inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
     else:
-        output = net_connect.send_command('show ip rip database')
-        print(len(output))
-        print(output)
-        if "" == output:
-            embed = discord.Embed(title="No result", color=0xff0000)
-            embed.add_field(name="", value="- RIP is not setup yet.", inline=False)
-            embed.add_field(name="", value="- RIP can't communicate with neighbors to complete the protocol setup.", inline=False)
-            await ctx.send(embed=embed)
-        else:
-            await ctx.send('```'+output+'```')
-        net_connect.disconnect()
+        await send_output(outbox.to(ctx), output, 'rip')
 
 @bot.command()
-async def eigrp(ctx, index, networks, asn):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
+async def eigrp(ctx, index, networks, asn, summarize=None):
+    usage = "Usage: **!eigrp <device_index> <network_ip/netmask(1-32),network_ip2/netmask2(1-32)> <as> <summarize (Optional)>**."
     try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
+        command_list = await create_eigrp(networks, asn, summarize == 'summarize')
+    except ValueError as error:
+        await outbox.send(ctx, embed=invalid_input_embed(error, usage), priority=HIGH)
         return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
-        command_list = await create_eigrp(networks, asn)
-        print(command_list)
-        output = net_connect.send_config_set(command_list)
-        if 'Invalid' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid input!", inline=False)
-            embed.add_field(name="", value="Usage: **!eigrp <device_index> <network_ip/netmask(1-32),network_ip2/netmask2(1-32)> <as>**.", inline=False)
-            await ctx.send(embed=embed)
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        result = await ConfigTransaction().add(command_list).reconcile(net_connect)
+        if result.errors:
+            await outbox.send(ctx, embed=config_error_embed(result.errors, usage), priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="EIGRP has been configured with the following configuration", inline=False)
+        if not result.applied:
+            embed.add_field(name="", value="The device already had this configuration, nothing was sent.", inline=False)
         embed.add_field(name="AS Number", value=asn, inline=False)
         embed.add_field(name="", value="", inline=False)
-        network_list = net_connect.send_command('show run | include network | begin router eigrp')
-        network_list = network_list.strip().split('\n')
+        with metrics.span('parse', kind='network_statements'):
+            network_list = parse_network_statements(result.readback)
         for command in command_list:
             if "network" in command:
                 command = command.strip()
@@ -1229,153 +1035,89 @@ async def eigrp(ctx, index, networks, asn):
                 embed.add_field(name="", value="----------------------", inline=False)
         if len(network_list) > 0:
             embed.add_field(name="Existing networks currently within EIGRP", value="", inline=False)
-            for command in network_list:
-                if "network" in command:
-                    command = command.strip()
-                    ip = command.split(' ')[1]
-                    embed.add_field(name="Network", value=ip, inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+            for statement in network_list:
+                embed.add_field(name="Network", value=statement.network, inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def remove_eigrp_nw(ctx, index, networks, asn):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
+    usage = "Usage: **!remove_eigrp_nw <device_index> <network_ip/netmask(1-32),network_ip2/netmask2(1-32)> <as>**."
     try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
         command_list = rm_eigrp_nw(networks, asn)
-        output = net_connect.send_config_set(command_list)
-        if 'Invalid' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid input!", inline=False)
-            embed.add_field(name="", value="Usage: **!remove_eigrp_nw <device_index> <network_ip/netmask(1-32),network_ip2/netmask2(1-32)> <as>**.", inline=False)
-            await ctx.send(embed=embed)
+    except ValueError as error:
+        await outbox.send(ctx, embed=invalid_input_embed(error, usage), priority=HIGH)
+        return
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        result = await ConfigTransaction().add(command_list).reconcile(net_connect)
+        if result.errors:
+            await outbox.send(ctx, embed=config_error_embed(result.errors, usage), priority=HIGH)
+            return
+        if not any(command.startswith('no ') for command in result.applied):
+            embed = discord.Embed(title="No result", color=0xff0000)
+            embed.add_field(name="", value="None of these networks are configured on the device, nothing was removed.", inline=False)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="The following EIGRP networks has been removed.", inline=False)
-        for command in command_list:
+        for command in result.applied:
             if "network" in command:
                 ip = command.split(' ')[2]
                 mask = command.split(' ')[3]
                 embed.add_field(name="Network", value=ip, inline=False)
                 embed.add_field(name="Subnet Mask", value=mask, inline=False)
                 embed.add_field(name="", value="----------------------", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def disable_eigrp(ctx, index, asn):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         command_list = dis_eigrp(asn)
-        output = net_connect.send_config_set(command_list)
-        if 'Invalid' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid input!", inline=False)
-            embed.add_field(name="", value="Usage: **!disable_eigrp <as>**.", inline=False)
-            await ctx.send(embed=embed)
+        result = await ConfigTransaction().add(command_list).reconcile(net_connect)
+        if result.errors:
+            await outbox.send(ctx, embed=config_error_embed(result.errors, "Usage: **!disable_eigrp <as>**."), priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="EIGRP has been disabled.", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def show_eigrp(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
-        output = net_connect.send_command('show ip eigrp topology')
-        output += "\n\n"
-        output += net_connect.send_command('show ip eigrp neighbors')
-        if "" == output:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        outputs = await net_connect.send_batch(['show ip eigrp topology', 'show ip eigrp neighbors'])
+        output = "\n\n".join(outputs)
+        if not output.strip():
             embed = discord.Embed(title="No result", color=0xff0000)
             embed.add_field(name="", value="- EIGRP is not setup yet.", inline=False)
             embed.add_field(name="", value="- EIGRP can't communicate with neighbors to complete the protocol setup.", inline=False)
-            await ctx.send(embed=embed)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
         else:
-            await ctx.send('```'+output+'```')
-        net_connect.disconnect()
+            await send_output(outbox.to(ctx), output, 'eigrp')
 
 @bot.command()
 async def bgp(ctx, index, networks, neighbors, asn):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
+    usage = "Usage: **!bgp <device_index> <network_ip/netmask(1-32),network_ip2/netmask2(1-32)> <neighbor_ip:neighbor_as> <as>**."
     try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
         command_list = create_bgp(networks, neighbors, asn)
-        output = net_connect.send_config_set(command_list)
-        if 'Invalid' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid input!", inline=False)
-            embed.add_field(name="", value="Usage: **!bgp <device_index> <network_ip/netmask(1-32),network_ip2/netmask2(1-32)> <neighbor_ip:neighbor_as> <as>**.", inline=False)
-            await ctx.send(embed=embed)
+    except ValueError as error:
+        await outbox.send(ctx, embed=invalid_input_embed(error, usage), priority=HIGH)
+        return
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        result = await ConfigTransaction().add(command_list).reconcile(net_connect)
+        if result.errors:
+            await outbox.send(ctx, embed=config_error_embed(result.errors, usage), priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="BGP has been configured with the following configuration", inline=False)
+        if not result.applied:
+            embed.add_field(name="", value="The device already had this configuration, nothing was sent.", inline=False)
         embed.add_field(name="AS Number", value=asn, inline=False)
         embed.add_field(name="", value="", inline=False)
         embed.add_field(name="---Networks---", value="", inline=False)
@@ -1394,352 +1136,471 @@ async def bgp(ctx, index, networks, neighbors, asn):
                 embed.add_field(name="Neighbor", value=neighbor, inline=False)
                 embed.add_field(name="Neighbor ASN", value=neighbor_asn, inline=False)
                 embed.add_field(name="", value="----------------------", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def remove_bgp_nw(ctx, index, networks, asn):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
+    usage = "Usage: **!remove_bgp_nw <index> <network_ip/netmask(1-32),network_ip2/netmask2(1-32)> <as>**."
     try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
         command_list = rm_bgp_nw(networks, asn)
-        output = net_connect.send_config_set(command_list)
-        if 'Invalid' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid input!", inline=False)
-            embed.add_field(name="", value="Usage: **!remove_bgp_nw <index> <network_ip/netmask(1-32),network_ip2/netmask2(1-32)> <as>**.", inline=False)
-            await ctx.send(embed=embed)
+    except ValueError as error:
+        await outbox.send(ctx, embed=invalid_input_embed(error, usage), priority=HIGH)
+        return
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        result = await ConfigTransaction().add(command_list).reconcile(net_connect)
+        if result.errors:
+            await outbox.send(ctx, embed=config_error_embed(result.errors, usage), priority=HIGH)
+            return
+        if not any(command.startswith('no ') for command in result.applied):
+            embed = discord.Embed(title="No result", color=0xff0000)
+            embed.add_field(name="", value="None of these networks are configured on the device, nothing was removed.", inline=False)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="The following BGP networks has been removed.", inline=False)
-        for command in command_list:
+        for command in result.applied:
             if "network" in command:
                 ip = command.split(' ')[2]
                 mask = command.split(' ')[4]
                 embed.add_field(name="Network", value=ip, inline=False)
                 embed.add_field(name="Subnet Mask", value=mask, inline=False)
                 embed.add_field(name="", value="----------------------", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def remove_bgp_neighbor(ctx, index, neighbors, asn):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
+    usage = "Usage: **!remove_bgp_neighbor <index> <neighbor_ip:neighbor_as> <as>**."
     try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
         command_list = rm_bgp_neighbor(neighbors, asn)
-        output = net_connect.send_config_set(command_list)
-        if 'Invalid' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid input!", inline=False)
-            embed.add_field(name="", value="Usage: **!remove_bgp_neighbor <index> <neighbor_ip:neighbor_as> <as>**.", inline=False)
-            await ctx.send(embed=embed)
+    except ValueError as error:
+        await outbox.send(ctx, embed=invalid_input_embed(error, usage), priority=HIGH)
+        return
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        result = await ConfigTransaction().add(command_list).reconcile(net_connect)
+        if result.errors:
+            await outbox.send(ctx, embed=config_error_embed(result.errors, usage), priority=HIGH)
+            return
+        if not any(command.startswith('no ') for command in result.applied):
+            embed = discord.Embed(title="No result", color=0xff0000)
+            embed.add_field(name="", value="None of these neighbors are configured on the device, nothing was removed.", inline=False)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="The following BGP neighbors has been removed.", inline=False)
-        for command in command_list:
+        for command in result.applied:
             if "neighbor" in command:
                 neighbor = command.split(' ')[2]
                 neighbor_asn = command.split(' ')[4]
                 embed.add_field(name="Neighbor", value=neighbor, inline=False)
                 embed.add_field(name="Neighbor ASN", value=neighbor_asn, inline=False)
                 embed.add_field(name="", value="----------------------", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def disable_bgp(ctx, index, asn):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         commands = dis_bgp(asn)
-        output = net_connect.send_config_set(commands)
-        if 'Invalid' in output:
-            embed = discord.Embed(title="Error", color=0xff0000)
-            embed.add_field(name="", value="Invalid input!", inline=False)
-            embed.add_field(name="", value="Usage: **!disable_bgp <as>**.", inline=False)
-            await ctx.send(embed=embed)
+        result = await ConfigTransaction().add(commands).reconcile(net_connect)
+        if result.errors:
+            await outbox.send(ctx, embed=config_error_embed(result.errors, "Usage: **!disable_bgp <as>**."), priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="BGP has been disabled.", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def show_bgp(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
+    output, delivered = await read_paged(ctx, index, 'show ip bgp', 'ip-bgp')
+    if output is None or delivered:
+        return
+    if not output.strip():
+        embed = discord.Embed(title="No result", color=0xff0000)
+        embed.add_field(name="", value="- BGP is not setup yet.", inline=False)
+        embed.add_field(name="", value="- BGP can't communicate with neighbors to complete the protocol setup.", inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
     else:
-        output = net_connect.send_command('show ip bgp')
-        if "" == output:
-            embed = discord.Embed(title="No result", color=0xff0000)
-            embed.add_field(name="", value="- BGP is not setup yet.", inline=False)
-            embed.add_field(name="", value="- BGP can't communicate with neighbors to complete the protocol setup.", inline=False)
-            await ctx.send(embed=embed)
-        else:
-            await ctx.send('```'+output+'```')
-        net_connect.disconnect()
+        await outbox.send(ctx, '```'+output+'```')
 
 
 @bot.command()
 async def show_mac_table(ctx, index):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
+    output, delivered = await read_paged(ctx, index, 'show mac address-table', 'mac-address-table')
+    if output is None:
         return
-
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
+    if not delivered and "Invalid" in output:
+        embed = discord.Embed(title="Not supported", color=0xff0000)
+        embed.add_field(name="", value="- This command is not supported on router.", inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
         return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
-        output = net_connect.send_command('show mac address-table')
-        if "Invalid" in output:
-            embed = discord.Embed(title="Not supported", color=0xff0000)
-            embed.add_field(name="", value="- This command is not supported on router.", inline=False)
-            await ctx.send(embed=embed)
-            net_connect.disconnect()
-            return
-        await ctx.send('```'+output+'```')
-        net_connect.disconnect()
+    if not delivered:
+        await outbox.send(ctx, '```'+output+'```')
+    await send_summary(ctx, 'show mac address-table', output)
         
 
 @bot.command()
 async def int_ip_delete(ctx, index, interface):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         command_list = ['int ' + interface,
                         'no ip address']
-        output = net_connect.send_config_set(command_list)
+        output = await net_connect.send_config_set(command_list)
         if 'Invalid' in output:
             embed = discord.Embed(title="Error", color=0xff0000)
             embed.add_field(name="", value="Invalid input or interface doesn't exist!", inline=False)
             embed.add_field(name="", value="Usage: **!int_ip_delete <device_index> <interface>**.", inline=False)
-            await ctx.send(embed=embed)
-            net_connect.disconnect()
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="The IP Address has been removed from the interface.", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def vlan_shut(ctx, index, vlan):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         command_list = ['int vlan ' + vlan,
                         'shut']
-        output = net_connect.send_config_set(command_list)
+        output = await net_connect.send_config_set(command_list)
         if 'Invalid' in output:
             embed = discord.Embed(title="Error", color=0xff0000)
             embed.add_field(name="", value="Invalid input!", inline=False)
             embed.add_field(name="", value="Usage: **!vlan_shut <device_index> <vlan_id>**.", inline=False)
-            await ctx.send(embed=embed)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="The VLAN " + vlan + " has been shutdown.", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
 async def router_on_a_stick(ctx, index, interface, vlan_id, ip_address, subnet_mask):
-    global net_connect
-    discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
-        return
-    
-    try:
-        net_connect = await connect(ctx, index)
-    except:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
-        return
-    
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
-    else:
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
         command_list = ['int ' + interface,
                         'no shut',
                         'exit',
                         'int ' + interface + '.' + vlan_id,
                         'encapsulation dot1Q ' + vlan_id,
                         'ip address ' + ip_address + ' ' + subnet_mask,]
-        output = net_connect.send_config_set(command_list)
+        output = await net_connect.send_config_set(command_list)
         if 'Invalid' in output:
             embed = discord.Embed(title="Error", color=0xff0000)
             embed.add_field(name="", value="Invalid input or interface doesn't exist!", inline=False)
             embed.add_field(name="", value="Usage: **!router_on_a_stick <device_index> <interface> <vlan_id> <ip_address> <subnet_mask>**.", inline=False)
-            await ctx.send(embed=embed)
-            net_connect.disconnect()
+            await outbox.send(ctx, embed=embed, priority=HIGH)
             return
         embed = discord.Embed(title="Success", color=0x00ff00)
         embed.add_field(name="", value="Router on a stick has been configured.", inline=False)
-        await ctx.send(embed=embed)
-        net_connect.disconnect()
+        await outbox.send(ctx, embed=embed, priority=HIGH)
 
 @bot.command()
-async def traceroute(ctx, index, ip_address, source_ip=None):
-    global net_connect
+async def traceroute(ctx, index, ip_address, source_ip=None, probe: int = None, timeout: int = None):
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        embed = discord.Embed(title="Traceroute", color=0x00ff00)
+        command = 'traceroute ' + ip_address
+        if source_ip:
+            embed.add_field(name="", value="Tracing the route to " + ip_address + " from " + source_ip, inline=False)
+            command += ' source ' + source_ip
+        else:
+            embed.add_field(name="", value="Tracing the route to " + ip_address, inline=False)
+        if timeout:
+            command += f' timeout {timeout}'
+        if probe:
+            command += f' probe {probe}'
+        await outbox.send(ctx, embed=embed, priority=HIGH)
+        read_timeout = 30 * (probe or 3) * (timeout or 3) + 10
+        lines = net_connect.stream_command(command, read_timeout=read_timeout)
+        output = await stream_lines(ctx, 'Traceroute results:', lines, parse_traceroute_hop)
+        if 'Invalid' in output:
+            embed = discord.Embed(title="Error", color=0xff0000)
+            embed.add_field(name="", value="Invalid input!", inline=False)
+            if source_ip:
+                embed.add_field(name="", value="Traceroute command with source IP might not supported on this device. Try using **!traceroute** without providing source IP address.", inline=False)
+            embed.add_field(name="", value="Usage: **!traceroute <device_index> <ip_address> <source_ip (Optional)> <probe (Optional)> <timeout (Optional)>**.", inline=False)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
+
+@bot.command()
+async def cache_stats(ctx):
+    stats = output_cache.stats()
+    embed = discord.Embed(title="Show Cache", color=0x00ff00)
+    embed.add_field(name="Hits", value=str(stats['hits']), inline=True)
+    embed.add_field(name="Misses", value=str(stats['misses']), inline=True)
+    embed.add_field(name="Hit rate", value=f"{stats['hit_rate'] * 100:.1f}%", inline=True)
+    embed.add_field(name="Entries", value=str(stats['entries']), inline=True)
+    embed.add_field(name="Size", value=f"{stats['bytes'] / 1024:.1f} KB", inline=True)
+    embed.add_field(name="Evictions", value=str(stats['evictions']), inline=True)
+    embed.add_field(name="Invalidations", value=str(stats['invalidations']), inline=True)
+    await outbox.send(ctx, embed=embed, priority=HIGH)
+
+def latency_lines(series, limit=10):
+    # "name  n=12  p50 3.1 ms  p95 40.2 ms" for the busiest series of one histogram
+    rows = sorted(series.items(), key=lambda item: item[1].count, reverse=True)[:limit]
+    return '\n'.join(f"{'/'.join(str(value) for _, value in labels)}  n={histogram.count}  "
+                     f"p50 {histogram.quantile(0.5) * 1000:.1f} ms  p95 {histogram.quantile(0.95) * 1000:.1f} ms"
+                     for labels, histogram in rows) or "-"
+
+@bot.command()
+async def stats(ctx):
+    pool = session_pool.stats()
+    executor = device_executor.stats()
+    cache = output_cache.stats()
+    queue = outbox.stats()
+    errors = metrics.totals('errors_total')
+    embed = discord.Embed(title="Bot Stats", color=0x00ff00)
+    embed.add_field(name="Commands", value='```' + latency_lines(metrics.series('command_seconds')) + '```', inline=False)
+    embed.add_field(name="Phases", value='```' + latency_lines(metrics.series('phase_seconds')) + '```', inline=False)
+    embed.add_field(name="Devices", value='```' + latency_lines(
+        {labels[:1]: histogram for labels, histogram in metrics.series('device_call_seconds').items()
+         if dict(labels)['call'] == 'send_command'}, limit=5) + '```', inline=False)
+    embed.add_field(name="Sessions", value=f"{pool['open']} open, {pool['opened']} opened, {pool['reused']} reused", inline=True)
+    embed.add_field(name="Show cache", value=f"{cache['hit_rate'] * 100:.1f}% hit rate", inline=True)
+    embed.add_field(name="Device I/O", value=f"{executor['in_flight']} in flight, {executor['timeouts']} timeouts", inline=True)
+    embed.add_field(name="Coalesced", value=f"{single_flight.saved} device calls saved", inline=True)
+    poller = fleet_poller.stats()
+    embed.add_field(name="Poller", value=f"{poller['devices']} devices, {poller['polls']} polls, {poller['backing_off']} backing off", inline=True)
+    embed.add_field(name="Saves", value=f"{save_scheduler.writes} writes for {save_scheduler.requested} requests", inline=True)
+    embed.add_field(name="Outbox", value=f"{queue['queued']} queued, {queue['sent']} sent, wait {queue['wait_ms_avg']:.0f} ms avg", inline=True)
+    embed.add_field(name="Errors", value='\n'.join(f"{dict(labels)['type']}: {count:g}" for labels, count in errors.items()) or "None", inline=True)
+    await outbox.send(ctx, embed=embed, priority=HIGH)
+
+def version_label(version):
+    return f"v{version.version} ({time.strftime('%Y-%m-%d %H:%M', time.localtime(version.taken_at))})"
+
+@bot.command()
+async def diff_run(ctx, index, old: int = None, new: int = None):
+    record = connection_store.get(str(ctx.author), index)
+    if record is None:
+        await outbox.send(ctx, embed=no_index_exists(), priority=HIGH)
+        return
+    host, login = record[0], record[1]
+    archived = await device_executor.run(None, config_archive.versions, host, login)
+    versions = {version.version: version for version in archived}
+    latest = max(versions, default=None)
+    if old is None:
+        old = latest - 1 if latest else None
+    if new is None:
+        new = latest
+    if old not in versions or new not in versions:
+        embed = discord.Embed(title="Error", color=0xff0000)
+        if len(versions) < 2:
+            embed.add_field(name="", value="Fewer than two running-config versions have been archived for this device.", inline=False)
+            embed.add_field(name="", value="A version is archived each time **!show_run** finds a changed configuration.", inline=False)
+        else:
+            embed.add_field(name="", value="No archived running-config with that version.", inline=False)
+            embed.add_field(name="Archived versions", value='\n'.join(version_label(version) for version in list(versions.values())[-10:]), inline=False)
+        embed.add_field(name="", value="Usage: **!diff_run <device_index> <version (Optional)> <version (Optional)>**.", inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
+        return
+    old_config = await device_executor.run(None, config_archive.get, host, login, old)
+    new_config = await device_executor.run(None, config_archive.get, host, login, new)
+    diff = unified_diff(old_config, new_config, version_label(versions[old]), version_label(versions[new]))
+    if not diff:
+        await outbox.send(ctx, f'```No differences between v{old} and v{new}.```')
+        return
+    await send_output(outbox.to(ctx), diff, f'running-config-v{old}-v{new}-diff')
+
+FANOUT_COMMANDS = {
+    'show_int': 'show ip int brief',
+    'show_vlan': 'show vlan brief',
+    'show_run': 'show run',
+    'show_hostname': 'show run | include hostname',
+    'show_route': 'show ip route',
+    'show_spanning_tree': 'show spanning-tree',
+    'show_mac_table': 'show mac address-table',
+    'show_ospf': 'show ip ospf database',
+    'show_rip': 'show ip rip database',
+    'show_bgp': 'show ip bgp',
+    'save_config': 'wr',
+}
+
+@bot.command()
+async def create_group(ctx, name, targets):
     discord_username = str(ctx.author)
-    key = f"{discord_username}:{index}"
-    if key not in connections:
-        no_index_exists()
+    try:
+        indexes = parse_targets(targets)
+    except ValueError as error:
+        embed = discord.Embed(title="Error", color=0xff0000)
+        embed.add_field(name="", value=str(error), inline=False)
+        embed.add_field(name="", value="Usage: **!create_group <name> <device_index,device_index2,first-last>**.", inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
         return
 
+    connection_store.save_group(discord_username, name, indexes)
+    await outbox.send(ctx, f"```Group {name} created with devices {', '.join(str(index) for index in indexes)}.```")
+
+@bot.command()
+async def fanout(ctx, targets, operation, *, config=None):
+    discord_username = str(ctx.author)
     try:
-        net_connect = await connect(ctx, index)
-    except:
+        indexes = parse_targets(targets, connection_store.get_groups(discord_username))
+    except ValueError as error:
         embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="Failed to connect to the device.", inline=False)
+        embed.add_field(name="", value=str(error), inline=False)
+        embed.add_field(name="", value="Usage: **!fanout <device_indexes|group> <operation>** or **!fanout <device_indexes|group> config <line;line2>**.", inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
+        return
+    # Only indexes the user has a device at are dispatched; the rest are reported once.
+    known = {index for index, _ in connection_store.list_user(discord_username)}
+    unknown = [index for index in indexes if index not in known]
+    indexes = [index for index in indexes if index in known]
+    if not indexes:
+        await outbox.send(ctx, embed=no_index_exists(), priority=HIGH)
         return
 
-    if net_connect == None:
-        embed = discord.Embed(title="Error", color=0xff0000)
-        embed.add_field(name="", value="You need to connect to a device first!", inline=False)
-        embed.add_field(name="", value="Use **!create_connection <ip> <username> <password>** to connect to a device.", inline=False)
+    if operation == 'config':
+        if not config:
+            embed = discord.Embed(title="Error", color=0xff0000)
+            embed.add_field(name="", value="No configuration lines given.", inline=False)
+            embed.add_field(name="", value="Usage: **!fanout <device_indexes|group> config <line;line2>**.", inline=False)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
+            return
+        config_lines = [line.strip() for line in config.split(';') if line.strip()]
+    elif operation in FANOUT_COMMANDS:
+        command = FANOUT_COMMANDS[operation]
     else:
-        embed = discord.Embed(title="Traceroute", color=0x00ff00)
-        if source_ip:
-            embed.add_field(name="", value="Tracing the route to " + ip_address + " from " + source_ip, inline=False)
-            await ctx.send(embed=embed)
-            command_list = ['traceroute ' + ip_address + ' source ' + source_ip,
-                            '\n']
-            output = net_connect.send_multiline_timing(command_list)
-            if 'Invalid' in output:
-                embed = discord.Embed(title="Error", color=0xff0000)
-                embed.add_field(name="", value="Invalid input!", inline=False)
-                embed.add_field(name="", value="Traceroute command with source IP might not supported on this device. Try using **!traceroute** without providing source IP address.", inline=False)
-                embed.add_field(name="", value="Usage: **!traceroute <device_index> <ip_address> <source_ip (Optional)>**.", inline=False)
-                await ctx.send(embed=embed)
-                return
+        embed = discord.Embed(title="Error", color=0xff0000)
+        embed.add_field(name="", value=f"Unknown operation {operation}.", inline=False)
+        embed.add_field(name="Available operations", value=', '.join(list(FANOUT_COMMANDS) + ['config']), inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
+        return
+
+    async def run_one(index):
+        if operation == 'save_config':
+            record = connection_store.get(discord_username, index)
+            if record is None:
+                raise LookupError("No device at this index.")
+            handle = save_scheduler.request(record[:2], record)
+            await save_scheduler.flush(record[:2])
+            return await handle
+        async with device_session(ctx, index, notify=False) as net_connect:
+            if net_connect is None:
+                raise LookupError("No device at this index.")
+            if operation == 'config':
+                output = await net_connect.send_config_set(config_lines)
+            else:
+                output = await net_connect.send_command(command)
+        if 'Invalid' in output:
+            raise ValueError("The device rejected the command.")
+        return output
+
+    skipped = ''
+    if unknown:
+        listed = ', '.join(str(index) for index in unknown[:20]) + (', ...' if len(unknown) > 20 else '')
+        skipped = f'\nSkipped {len(unknown)} indexes without a device: {listed}'
+    await outbox.send(ctx, f'```Running {operation} on {len(indexes)} devices...{skipped}```', priority=LOW)
+    summary = FanoutSummary()
+    async for index, ok, result, seconds in fan_out(indexes, run_one, FANOUT_CONCURRENCY):
+        summary.add(ok, seconds)
+        if ok:
+            # Commands with a parser are reported as one summary line per device instead of the whole table.
+            device_summary = output_summary(command, result) if operation != 'config' else None
+            if device_summary:
+                await outbox.send(ctx, f'```Device #{index} ({seconds * 1000:.0f} ms): {device_summary}```')
+            else:
+                await send_output(outbox.to(ctx), f'Device #{index} ({seconds * 1000:.0f} ms)\n' + result, f'device-{index}')
         else:
-            embed.add_field(name="", value="Tracing the route to " + ip_address, inline=False)
-            await ctx.send(embed=embed)
-            command_list = ['traceroute ' + ip_address,
-                            '\n']
-            output = net_connect.send_multiline_timing(command_list)
-            if 'Invalid' in output:
-                embed = discord.Embed(title="Error", color=0xff0000)
-                embed.add_field(name="", value="Invalid input!", inline=False)
-                embed.add_field(name="", value="Usage: **!traceroute <device_index> <ip_address> <source_ip (Optional)>**.", inline=False)
-                await ctx.send(embed=embed)
-                return
-        output = output.split('\n')
-        filtered = [ x for x in output if 'msec' in x ]
-        new_output = 'Traceroute results:\n'
-        new_output += '\n'.join(filtered)
-        await ctx.send('```'+new_output+'```')
-        net_connect.disconnect()
-
-bot.run(TOKEN)
+            await outbox.send(ctx, f'```Device #{index} failed ({seconds * 1000:.0f} ms): {result}```')
+
+    color = 0x00ff00 if summary.failed == 0 else 0xff0000
+    embed = discord.Embed(title="Fan-out Result", color=color)
+    embed.add_field(name="Operation", value=operation, inline=False)
+    embed.add_field(name="Succeeded", value=str(summary.succeeded), inline=True)
+    embed.add_field(name="Failed", value=str(summary.failed), inline=True)
+    if unknown:
+        embed.add_field(name="Skipped", value=str(len(unknown)), inline=True)
+    embed.add_field(name="", value="----------------------", inline=False)
+    embed.add_field(name="p50", value=f"{summary.latency_ms(50):.0f} ms", inline=True)
+    embed.add_field(name="p95", value=f"{summary.latency_ms(95):.0f} ms", inline=True)
+    embed.add_field(name="p99", value=f"{summary.latency_ms(99):.0f} ms", inline=True)
+    await outbox.send(ctx, embed=embed, priority=HIGH)
+
+# Operations !batch accepts, each mapped to the generator that builds its command list.
+BATCH_GENERATORS = {
+    'ospf': create_ospf,
+    'remove_ospf_nw': rm_ospf_nw,
+    'rip': create_rip,
+    'remove_rip_nw': rm_rip_nw,
+    'eigrp': create_eigrp,
+    'remove_eigrp_nw': rm_eigrp_nw,
+    'bgp': create_bgp,
+    'remove_bgp_nw': rm_bgp_nw,
+    'remove_bgp_neighbor': rm_bgp_neighbor,
+    'int_ip': interface_ip,
+}
+
+@bot.command()
+async def batch(ctx, index, *, changes):
+    usage = "Usage: **!batch <device_index> <operation> <arguments>; <operation2> <arguments2>** (e.g. **!batch 1 ospf 10.0.0.0/24/0; int_ip g0/1 10.0.0.1 255.255.255.0**)."
+    transaction = ConfigTransaction()
+    for change in changes.split(';'):
+        if not change.strip():
+            continue  # trailing or doubled ';'
+        operation, *args = change.split()
+        generator = BATCH_GENERATORS.get(operation)
+        if generator is None:
+            embed = discord.Embed(title="Error", color=0xff0000)
+            embed.add_field(name="", value=f"Unknown operation {operation}.", inline=False)
+            embed.add_field(name="Available operations", value=', '.join(BATCH_GENERATORS), inline=False)
+            embed.add_field(name="", value=usage, inline=False)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
+            return
+        try:
+            commands = generator(*args)
+            if inspect.isawaitable(commands):
+                commands = await commands
+        except (TypeError, ValueError, IndexError):
+            embed = discord.Embed(title="Error", color=0xff0000)
+            embed.add_field(name="", value=f"Invalid arguments for {operation}.", inline=False)
+            embed.add_field(name="", value=usage, inline=False)
+            await outbox.send(ctx, embed=embed, priority=HIGH)
+            return
+        transaction.add(commands)
+    if not transaction.sections:
+        embed = discord.Embed(title="Error", color=0xff0000)
+        embed.add_field(name="", value="No operations given.", inline=False)
+        embed.add_field(name="", value=usage, inline=False)
+        await outbox.send(ctx, embed=embed, priority=HIGH)
+        return
+
+    async with device_session(ctx, index) as net_connect:
+        if net_connect is None:
+            return
+        result = await transaction.apply(net_connect, verify=True)
+    if result.errors:
+        await outbox.send(ctx, embed=config_error_embed(result.errors, usage), priority=HIGH)
+        return
+    color = 0xff0000 if result.missing else 0x00ff00
+    embed = discord.Embed(title="Batch Result", color=color)
+    embed.add_field(name="", value=f"Applied {len(transaction.commands())} lines in one session.", inline=False)
+    for section in transaction.sections[:20]:
+        embed.add_field(name=section[0], value='\n'.join(section[1:])[:1024] or "-", inline=False)
+    if result.missing:
+        embed.add_field(name="Not as expected in running-config", value='\n'.join(result.missing)[:1024], inline=False)
+    await outbox.send(ctx, embed=embed, priority=HIGH)
+
+async def run_bot():
+    async with bot:
+        try:
+            await bot.start(TOKEN)
+        finally:
+            fleet_poller.stop()
+            # Saves still waiting for their quiet period are written before exiting.
+            await save_scheduler.flush()
+            device_executor.shutdown()
+
+if __name__ == '__main__':
+    discord.utils.setup_logging()
+    try:
+        asyncio.run(run_bot())
+    except KeyboardInterrupt:
+        pass
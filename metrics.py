@@ -0,0 +1,142 @@
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from a warm cache hit to a slow WAN handshake.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Estimated by linear interpolation inside the bucket that holds the q-th value.
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Counters and latency histograms for the bot, rendered in Prometheus text format.
+
+    Series are keyed by (name, label values) and updated with a dict lookup and a
+    bisect, cheap enough to leave on for every command. ``collect`` adds sources
+    such as SessionPool.stats whose numbers are read only when rendering.
+    """
+
+    def __init__(self, prefix='bot'):
+        self.prefix = prefix
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = {}
+        self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(labels.items()))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(labels.items()))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, phase, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('phase_seconds', time.perf_counter() - started, phase=phase, **labels)
+
+    def collect(self, name, stats):
+        # ``stats`` returns a dict of numbers, exported as <prefix>_<name>_<key> gauges.
+        self.collectors[name] = stats
+
+    def series(self, name):
+        # {label items: histogram} for one histogram name
+        return {labels: histogram for (series_name, labels), histogram in self.histograms.items()
+                if series_name == name}
+
+    def totals(self, name):
+        # {labels: value} for one counter name
+        return {labels: value for (counter_name, labels), value in self.counters.items() if counter_name == name}
+
+    def render(self):
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(self.counters.items()):
+            metric = f'{self.prefix}_{name}'
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{_labels(labels)} {value}')
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            metric = f'{self.prefix}_{name}'
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f'# TYPE {metric} histogram')
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{metric}_sum{_labels(labels)} {histogram.sum}')
+            lines.append(f'{metric}_count{_labels(labels)} {histogram.count}')
+        for name, stats in self.collectors.items():
+            for key, value in stats().items():
+                if isinstance(value, (int, float)):
+                    metric = f'{self.prefix}_{name}_{key}'
+                    lines.append(f'# TYPE {metric} gauge')
+                    lines.append(f'{metric} {value}')
+        lines.append(f'# TYPE {self.prefix}_uptime_seconds gauge')
+        lines.append(f'{self.prefix}_uptime_seconds {time.time() - self.started:.0f}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+async def start_http_server(metrics, host='127.0.0.1', port=9464):
+    """Serves ``metrics.render()`` to any HTTP GET, for a Prometheus scraper on the same host."""
+
+    async def handle(reader, writer):
+        try:
+            await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5)
+            body = metrics.render().encode()
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                         b'Content-Length: ' + str(len(body)).encode() + b'\r\nConnection: close\r\n\r\n' + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -1,30 +1,65 @@
-import math
+def _dotted(value):
+    return f'{value >> 24 & 0xff}.{value >> 16 & 0xff}.{value >> 8 & 0xff}.{value & 0xff}'
+
+
+# Everything below is indexed by prefix length (0-32) and built once at import.
+MASKS = tuple(0xffffffff ^ (0xffffffff >> length) for length in range(33))
+SUBNET_MASKS = tuple(_dotted(mask) for mask in MASKS)
+WILDCARD_MASKS = tuple(_dotted(mask ^ 0xffffffff) for mask in MASKS)
+# Usable host addresses; /31 point-to-point links use both addresses, /32 is a single host.
+HOST_COUNTS = tuple(2 ** (32 - length) - 2 if length < 31 else 2 ** (32 - length) for length in range(33))
+PREFIX_BY_MASK = {mask: length for length, mask in enumerate(SUBNET_MASKS)}
+PREFIX_BY_WILDCARD = {wildcard: length for length, wildcard in enumerate(WILDCARD_MASKS)}
+
+
+def prefix_length(value):
+    # Accepts 24, "24" or "/24".
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 32:
+        return value
+    if isinstance(value, str):
+        text = value.strip().lstrip('/')
+        # isdigit() alone also accepts characters like '²' that int() rejects.
+        if text.isascii() and text.isdecimal() and 0 <= int(text) <= 32:
+            return int(text)
+    raise ValueError(f'Invalid prefix length {value!r}, expected a number from 0 to 32.')
+
 
 def subnet_mask(subnet_mask):
-    
-    # Calculate the subnet mask in IPv4 format
-    mask = 0xffffffff ^ (0xffffffff >> subnet_mask)
-    subnet_mask_ipv4 = '{}.{}.{}.{}'.format(
-        (mask >> 24) & 0xff,
-        (mask >> 16) & 0xff,
-        (mask >> 8) & 0xff,
-        mask & 0xff
-    )
-    
-    return subnet_mask_ipv4
+    return SUBNET_MASKS[prefix_length(subnet_mask)]
 
 
 def wildcard_mask(subnet_mask):
+    return WILDCARD_MASKS[prefix_length(subnet_mask)]
+
+
+def host_count(subnet_mask):
+    return HOST_COUNTS[prefix_length(subnet_mask)]
+
+
+def mask_to_prefix(mask):
+    # "255.255.255.0" -> 24; only contiguous masks are valid.
+    length = PREFIX_BY_MASK.get(mask.strip() if isinstance(mask, str) else mask)
+    if length is None:
+        raise ValueError(f'Invalid subnet mask {mask!r}.')
+    return length
+
+
+def wildcard_to_prefix(wildcard):
+    # "0.0.0.255" -> 24
+    length = PREFIX_BY_WILDCARD.get(wildcard.strip() if isinstance(wildcard, str) else wildcard)
+    if length is None:
+        raise ValueError(f'Invalid wildcard mask {wildcard!r}.')
+    return length
+
+
+def subnet_masks(lengths):
+    # Bulk form of subnet_mask for long lists: one validation pass, then plain table indexing.
+    return [SUBNET_MASKS[length] for length in map(prefix_length, lengths)]
+
+
+def wildcard_masks(lengths):
+    return [WILDCARD_MASKS[length] for length in map(prefix_length, lengths)]
+
 
-    host_bits = 32 - subnet_mask
-    
-    # Calculate the wildcard mask in IPv4 format
-    wildcard_mask = (0xffffffff >> (32 - host_bits)) & 0xffffffff
-    wildcard_mask_ipv4 = '{}.{}.{}.{}'.format(
-        (wildcard_mask >> 24) & 0xff,
-        (wildcard_mask >> 16) & 0xff,
-        (wildcard_mask >> 8) & 0xff,
-        wildcard_mask & 0xff
-    )
-    
-    return wildcard_mask_ipv4
\ No newline at end of file
+def masks_to_prefixes(masks):
+    return [mask_to_prefix(mask) for mask in masks]
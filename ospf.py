@@ -2,26 +2,35 @@ from discord.ext import commands
 import discord
 from netmiko import ConnectHandler
 from net_cal import wildcard_mask
+from prefixes import parse_prefix, format_address, collapse, dedupe
 
-def ospf(networks):
-        networks = networks.split(',')
-        networks = [network.split('/') for network in networks]
+def networks_by_area(networks):
+    by_area = {}
+    for network in networks.split(','):
+        parts = network.strip().split('/')
+        if len(parts) != 3:
+            raise ValueError(f'Invalid OSPF network {network!r}, expected network_ip/netmask/area.')
+        by_area.setdefault(parts[2], []).append(parse_prefix(parts[0] + '/' + parts[1]))
+    return by_area
+
+def ospf(networks, summarize=False):
+        # Duplicates and networks inside another network of the same area are dropped;
+        # summarize also merges contiguous networks, which matches exactly the same interfaces
+        # but leaves statements that remove_ospf_nw of one of the original networks will not match.
         commands = []
         commands.append('router ospf 1')
-        for network in networks:
-            network[1] = wildcard_mask(int(network[1]))
-            commands.append(f'network {network[0]} {network[1]} area {network[2]}')
+        for area, prefixes in networks_by_area(networks).items():
+            for network, length in collapse(prefixes, aggregate=summarize):
+                commands.append(f'network {format_address(network)} {wildcard_mask(length)} area {area}')
         return commands
  
 def remove_ospf_nw(networks):
-    networks = networks.split(',')
-    networks = [network.split('/') for network in networks]
     commands = []
     commands.append('router ospf 1')
-    for network in networks:
-        network[1] = wildcard_mask(int(network[1]))
-        commands.append(f'no network {network[0]} {network[1]} area {network[2]}')
+    for area, prefixes in networks_by_area(networks).items():
+        for network, length in dedupe(prefixes):
+            commands.append(f'no network {format_address(network)} {wildcard_mask(length)} area {area}')
     return commands
 
 def disable_ospf():
-    return ['no router ospf 1']
+    return ['no router ospf 1']
\ No newline at end of file
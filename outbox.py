@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+MESSAGE_LIMIT = 2000
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'per', 'tokens', 'updated')
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    def wait_time(self):
+        # Seconds until one token is available, 0 if one is available now.
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.per / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class Outgoing:
+    __slots__ = ('content', 'kwargs', 'priority', 'mergeable', 'queued_at', 'futures')
+
+    def __init__(self, content, kwargs, priority, future):
+        self.content = content
+        self.kwargs = kwargs
+        self.priority = priority
+        self.mergeable = False
+        self.queued_at = time.monotonic()
+        self.futures = [future]
+
+
+class Outbox:
+    """Single path for messages the bot sends, paced to stay inside Discord's rate limits.
+
+    Each destination channel has its own token bucket (``channel_rate`` messages per
+    ``channel_per`` seconds) on top of a global bucket (``global_rate`` per second).
+    Messages to one channel keep their order; consecutive plain-text messages to the
+    same channel are merged while they fit in one message. Among channels that may
+    send, the one holding the most urgent message (HIGH < NORMAL < LOW) goes first.
+    ``send`` resolves to the discord.Message that carried the content.
+    With ``metrics``, the queue wait and the Discord API call are timed as phases.
+    """
+
+    def __init__(self, global_rate=50, channel_rate=5, channel_per=5.0, metrics=None):
+        self.global_bucket = TokenBucket(global_rate, 1.0)
+        self.channel_rate = channel_rate
+        self.channel_per = channel_per
+        self.metrics = metrics
+        self._queues = {}
+        self._buckets = {}
+        self._destinations = {}
+        self._sending = set()
+        self._wakeup = None
+        self._worker = None
+        self._order = itertools.count()
+        self.sent = 0
+        self.merged = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def send(self, destination, content=None, *, priority=NORMAL, merge=True, **kwargs):
+        # Pass merge=False for messages that will be edited later.
+        self._start()
+        key = self._key(destination)
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._destinations[key] = destination
+        last = queue[-1] if queue else None
+        if (merge and last is not None and last.mergeable and content is not None and not kwargs
+                and len(last.content) + len(content) + 1 <= MESSAGE_LIMIT):
+            last.content += '\n' + content
+            last.priority = min(last.priority, priority)
+            last.futures.append(future)
+            self.merged += 1
+        else:
+            item = Outgoing(content, kwargs, priority, future)
+            item.mergeable = merge and content is not None and not kwargs
+            queue.append(item)
+        self._wakeup.set()
+        return await future
+
+    def to(self, destination, priority=NORMAL):
+        return OutboxChannel(self, destination, priority)
+
+    def stats(self):
+        depth = sum(len(item.futures) for queue in self._queues.values() for item in queue)
+        return {
+            'queued': depth,
+            'channels': len(self._queues),
+            'sent': self.sent,
+            'merged': self.merged,
+            'failed': self.failed,
+            'wait_ms_avg': self.wait_seconds / self.sent * 1000 if self.sent else 0.0,
+            'wait_ms_max': self.max_wait_seconds * 1000,
+        }
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    def _start(self):
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            delay = self._dispatch()
+            if delay is None:
+                await self._wakeup.wait()
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self):
+        # Starts every send the buckets allow; returns how long to sleep, None to wait for new work.
+        ready = []
+        delay = None
+        for key, queue in self._queues.items():
+            if key in self._sending or not queue:
+                continue
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.channel_rate, self.channel_per)
+            wait = bucket.wait_time()
+            if wait:
+                delay = wait if delay is None else min(delay, wait)
+                continue
+            heapq.heappush(ready, (min(item.priority for item in queue), queue[0].queued_at, next(self._order), key))
+        while ready:
+            wait = self.global_bucket.wait_time()
+            if wait:
+                return wait if delay is None else min(delay, wait)
+            _, _, _, key = heapq.heappop(ready)
+            self.global_bucket.take()
+            self._buckets[key].take()
+            item = self._queues[key].popleft()
+            self._sending.add(key)
+            asyncio.ensure_future(self._deliver(key, item))
+        return delay
+
+    async def _deliver(self, key, item):
+        waited = time.monotonic() - item.queued_at
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        started = time.perf_counter()
+        try:
+            message = await self._destinations[key].send(item.content, **item.kwargs)
+        except Exception as error:
+            self.failed += 1
+            if self.metrics is not None:
+                self.metrics.inc('discord_errors_total', type=type(error).__name__)
+            for future in item.futures:
+                if not future.done():
+                    future.set_exception(error)
+        else:
+            self.sent += 1
+            for future in item.futures:
+                if not future.done():
+                    future.set_result(message)
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe('phase_seconds', waited, phase='outbox_wait')
+                self.metrics.observe('phase_seconds', time.perf_counter() - started, phase='discord_send')
+            self._sending.discard(key)
+            if not self._queues[key]:
+                del self._queues[key]
+                del self._destinations[key]
+            self._wakeup.set()
+
+    @staticmethod
+    def _key(destination):
+        channel = getattr(destination, 'channel', destination)
+        return getattr(channel, 'id', id(channel))
+
+
+class OutboxChannel:
+    """``destination``-like object whose send goes through the outbox, for code that takes a ctx."""
+
+    def __init__(self, outbox, destination, priority=NORMAL):
+        self.outbox = outbox
+        self.destination = destination
+        self.priority = priority
+
+    async def send(self, content=None, **kwargs):
+        kwargs.setdefault('priority', self.priority)
+        return await self.outbox.send(self.destination, content, **kwargs)
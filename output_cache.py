@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class OutputCache:
+    """Per-device cache of show command output.
+
+    ``ttls`` maps a command prefix to how many seconds its output stays fresh
+    ("show run" also covers "show run int g0/0"); commands without a matching
+    prefix are never cached. Entries are keyed by (host, login, command) so
+    accounts with different privileges never share output, but invalidation
+    drops everything cached for a host and records when it happened, so output
+    kept elsewhere (polled snapshots) can be checked with ``changed_at``. The
+    oldest entries are evicted once the cached output exceeds ``max_bytes``.
+    """
+
+    def __init__(self, ttls, max_bytes=32 * 1024 * 1024):
+        self.ttls = ttls
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._by_host = {}
+        self._changed_at = {}
+        self._ttl_lookup = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl_for(self, command):
+        ttl = self._ttl_lookup.get(command)
+        if ttl is None:
+            ttl = 0
+            matched = -1
+            for prefix, seconds in self.ttls.items():
+                if command.startswith(prefix) and len(prefix) > matched:
+                    ttl, matched = seconds, len(prefix)
+            if len(self._ttl_lookup) >= 4096:
+                self._ttl_lookup.clear()
+            self._ttl_lookup[command] = ttl
+        return ttl
+
+    def get(self, host, login, command, count_miss=True):
+        # count_miss=False is for a look before a fetch that checks the cache itself,
+        # so one fetch is not counted as two misses.
+        if not self.ttl_for(command):
+            return None
+        key = (host, login, command)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                if count_miss:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, host, login, command, output):
+        ttl = self.ttl_for(command)
+        if not ttl or len(output) > self.max_bytes:
+            return
+        key = (host, login, command)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, output)
+            self._by_host.setdefault(host, set()).add(key)
+            self._size += len(output)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, host):
+        with self._lock:
+            self._changed_at[host] = time.time()
+            keys = self._by_host.pop(host, ())
+            for key in keys:
+                entry = self._entries.pop(key)
+                self._size -= len(entry[1])
+            if keys:
+                self.invalidations += 1
+
+    def changed_at(self, host):
+        # Unix time of the host's last invalidation in this process, 0.0 if none.
+        return self._changed_at.get(host, 0.0)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._size -= len(entry[1])
+        keys = self._by_host.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_host[key[0]]
@@ -0,0 +1,82 @@
+import gzip
+import io
+import discord
+
+PAGE_SIZE = 1990
+
+
+class OutputPager:
+    """Sends command output as ```-wrapped pages split on line boundaries.
+
+    Pages go out as soon as they fill up, so the first ones arrive while the
+    device is still printing. After ``max_pages`` pages the rest is held back and
+    the complete output is attached as a gzip-compressed text file instead.
+    Nothing is sent until a full page exists, so callers can still inspect
+    short outputs (errors, empty results) themselves when ``finish`` returns False.
+    """
+
+    def __init__(self, ctx, filename, max_pages=4, page_size=PAGE_SIZE):
+        self.ctx = ctx
+        self.filename = filename
+        self.max_pages = max_pages
+        self.page_size = page_size
+        self.lines = []
+        self.pages_sent = 0
+        self.attach = False
+        self._page = []
+        self._page_length = 0
+
+    async def feed(self, line):
+        self.lines.append(line)
+        if self.attach:
+            return
+        for piece in self._pieces(line):
+            if self._page and self._page_length + len(piece) + 1 > self.page_size:
+                await self._flush()
+                if self.attach:
+                    return
+            self._page.append(piece)
+            self._page_length += len(piece) + 1
+
+    async def finish(self):
+        # Returns True when the output has been delivered to Discord.
+        if self.pages_sent == 0:
+            return False
+        if self._page and not self.attach:
+            await self._flush()
+        if self.attach:
+            # Also reached when only the last partial page was over the limit.
+            await self.ctx.send(
+                f'```Output continues ({len(self.text())} characters), full output attached.```',
+                file=compressed_file(self.text(), self.filename))
+        return True
+
+    def text(self):
+        return '\n'.join(self.lines)
+
+    async def _flush(self):
+        if self.pages_sent >= self.max_pages:
+            self.attach = True
+            return
+        await self.ctx.send('```' + '\n'.join(self._page) + '```')
+        self.pages_sent += 1
+        self._page = []
+        self._page_length = 0
+
+    def _pieces(self, line):
+        # Lines longer than a page are hard-split.
+        if len(line) <= self.page_size:
+            return [line]
+        return [line[i:i + self.page_size] for i in range(0, len(line), self.page_size)]
+
+
+def compressed_file(text, filename):
+    return discord.File(io.BytesIO(gzip.compress(text.encode())), filename=filename + '.txt.gz')
+
+
+async def send_output(ctx, output, filename='output'):
+    pager = OutputPager(ctx, filename)
+    for line in output.split('\n'):
+        await pager.feed(line)
+    if not await pager.finish():
+        await ctx.send('```' + output + '```')
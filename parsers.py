@@ -0,0 +1,173 @@
+import re
+from collections import namedtuple
+
+Interface = namedtuple('Interface', 'name ip_address ok method status protocol')
+Vlan = namedtuple('Vlan', 'vlan_id name status ports')
+Route = namedtuple('Route', 'code network prefix_length distance metric next_hop interface')
+MacEntry = namedtuple('MacEntry', 'vlan mac type port')
+OspfNeighbor = namedtuple('OspfNeighbor', 'neighbor_id priority state dead_time address interface')
+EigrpNeighbor = namedtuple('EigrpNeighbor', 'handle address interface hold uptime srtt rto queue seq')
+BgpNeighbor = namedtuple('BgpNeighbor', 'neighbor version remote_as msg_rcvd msg_sent up_down state')
+NetworkStatement = namedtuple('NetworkStatement', 'network mask wildcard area')
+PingResult = namedtuple('PingResult', 'percent received sent round_trip')
+TracerouteHop = namedtuple('TracerouteHop', 'hop address text')
+ConfigError = namedtuple('ConfigError', 'command message')
+
+IP = r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}'
+
+INTERFACE = re.compile(r'^(\S+)\s+(\S+)\s+(YES|NO)\s+(\S+)\s+(up|down|administratively down|deleted)\s+(up|down)\s*$')
+VLAN = re.compile(r'^(\d+)\s+(\S+)\s+(active|suspended|act/lshut|sus/lshut|act/ishut|sus/ishut|act/unsup)\s*(.*)$')
+VLAN_PORTS = re.compile(r'^\s{20,}(\S.*)$')
+ROUTE = re.compile(
+    r'^(?P<code>[A-Za-z][A-Za-z0-9]?(?: [A-Z0-9]{1,2})?\*?)\s+(?P<network>' + IP + r')(?:/(?P<length>\d+))?\s+'
+    r'(?:\[(?P<distance>\d+)/(?P<metric>\d+)\] via (?P<next_hop>' + IP + r')(?:, [^,]+)?(?:, (?P<interface>\S+))?'
+    r'|is directly connected, (?P<connected>\S+))')
+ROUTE_NEXT_PATH = re.compile(
+    r'^\s+\[(?P<distance>\d+)/(?P<metric>\d+)\] via (?P<next_hop>' + IP + r')(?:, [^,]+)?(?:, (?P<interface>\S+))?')
+ROUTE_SUBNETTED = re.compile(r'^\s+(' + IP + r')/(\d+) is (?:variably )?subnetted')
+MAC_ENTRY = re.compile(r'^\s*(\S+)\s+([0-9a-f]{4}\.[0-9a-f]{4}\.[0-9a-f]{4})\s+(\S+)\s+(\S+)', re.IGNORECASE)
+OSPF_NEIGHBOR = re.compile(r'^(' + IP + r')\s+(\d+)\s+(\S+)\s+(\S+)\s+(' + IP + r')\s+(\S+)')
+EIGRP_NEIGHBOR = re.compile(
+    r'^(\d+)\s+(' + IP + r')\s+(\S+)\s+(\d+)\s+(\S+)\s+(\d+)\s+(\d+)\s+(\d+)\s+(\d+)')
+BGP_NEIGHBOR = re.compile(
+    r'^(' + IP + r')\s+(\d)\s+(\d+(?:\.\d+)?)\s+(\d+)\s+(\d+)\s+\d+\s+\d+\s+\d+\s+(\S+)\s+(.+?)\s*$')
+NETWORK = re.compile(r'^\s*network (' + IP + r')(?: mask (' + IP + r')| (' + IP + r'))?(?: area (\S+))?\s*$')
+HOSTNAME = re.compile(r'^hostname (\S+)', re.MULTILINE)
+PING = re.compile(r'Success rate is (\d+) percent \((\d+)/(\d+)\)(?:, round-trip min/avg/max = (\S+) ms)?')
+PING_PROGRESS = re.compile(r'^\s*[!.UQM?&]+\s*$')
+TRACEROUTE_HOP = re.compile(r'^\s*(\d+)\s+(?:\S+ \()?(' + IP + r'|\*)')
+
+
+def _interfaces(output):
+    return tuple(Interface(*match.groups()) for match in map(INTERFACE.match, output.splitlines()) if match)
+
+
+def _vlans(output):
+    vlans = []
+    for line in output.splitlines():
+        match = VLAN.match(line)
+        if match:
+            ports = tuple(port.strip() for port in match.group(4).split(',') if port.strip())
+            vlans.append([int(match.group(1)), match.group(2), match.group(3), ports])
+            continue
+        match = VLAN_PORTS.match(line)
+        if match and vlans:
+            vlans[-1][3] += tuple(port.strip() for port in match.group(1).split(',') if port.strip())
+    return tuple(Vlan(*vlan) for vlan in vlans)
+
+
+def _routes(output):
+    routes = []
+    subnet_length = None
+    for line in output.splitlines():
+        match = ROUTE_SUBNETTED.match(line)
+        if match:
+            subnet_length = int(match.group(2))
+            continue
+        match = ROUTE.match(line)
+        if match:
+            length = match.group('length')
+            length = int(length) if length else subnet_length
+            if match.group('connected'):
+                routes.append(Route(match.group('code'), match.group('network'), length, None, None, None,
+                                    match.group('connected')))
+            else:
+                routes.append(Route(match.group('code'), match.group('network'), length,
+                                    int(match.group('distance')), int(match.group('metric')),
+                                    match.group('next_hop'), match.group('interface')))
+            continue
+        match = ROUTE_NEXT_PATH.match(line)
+        if match and routes:
+            # equal-cost path listed under the previous prefix
+            previous = routes[-1]
+            routes.append(previous._replace(distance=int(match.group('distance')), metric=int(match.group('metric')),
+                                            next_hop=match.group('next_hop'), interface=match.group('interface')))
+    return tuple(routes)
+
+
+def _mac_table(output):
+    return tuple(MacEntry(*match.groups()) for match in map(MAC_ENTRY.match, output.splitlines()) if match)
+
+
+def _ospf_neighbors(output):
+    return tuple(OspfNeighbor(*match.groups()) for match in map(OSPF_NEIGHBOR.match, output.splitlines()) if match)
+
+
+def _eigrp_neighbors(output):
+    return tuple(EigrpNeighbor(*match.groups()) for match in map(EIGRP_NEIGHBOR.match, output.splitlines()) if match)
+
+
+def _bgp_neighbors(output):
+    return tuple(BgpNeighbor(*match.groups()) for match in map(BGP_NEIGHBOR.match, output.splitlines()) if match)
+
+
+def _network_statements(output):
+    return tuple(NetworkStatement(*match.groups()) for match in map(NETWORK.match, output.splitlines()) if match)
+
+
+PARSERS = {
+    'interfaces': _interfaces,
+    'vlans': _vlans,
+    'routes': _routes,
+    'mac_table': _mac_table,
+    'ospf_neighbors': _ospf_neighbors,
+    'eigrp_neighbors': _eigrp_neighbors,
+    'bgp_neighbors': _bgp_neighbors,
+    'network_statements': _network_statements,
+}
+
+
+def parse(kind, output):
+    return PARSERS[kind](output)
+
+
+def parse_interfaces(output):
+    return parse('interfaces', output)
+
+
+def parse_vlans(output):
+    return parse('vlans', output)
+
+
+def parse_routes(output):
+    return parse('routes', output)
+
+
+def parse_mac_table(output):
+    return parse('mac_table', output)
+
+
+def parse_ospf_neighbors(output):
+    return parse('ospf_neighbors', output)
+
+
+def parse_eigrp_neighbors(output):
+    return parse('eigrp_neighbors', output)
+
+
+def parse_bgp_neighbors(output):
+    return parse('bgp_neighbors', output)
+
+
+def parse_network_statements(output):
+    return parse('network_statements', output)
+
+
+def parse_hostname(output):
+    match = HOSTNAME.search(output)
+    return match.group(1) if match else None
+
+
+def parse_ping(output):
+    match = PING.search(output)
+    if match is None:
+        return None
+    percent, received, sent = (int(value) for value in match.group(1, 2, 3))
+    return PingResult(percent, received, sent, match.group(4))
+
+
+def parse_traceroute_hop(line):
+    match = TRACEROUTE_HOP.match(line)
+    if match is None:
+        return None
+    return TracerouteHop(int(match.group(1)), None if match.group(2) == '*' else match.group(2), line.strip())
@@ -0,0 +1,72 @@
+import socket
+from net_cal import MASKS, prefix_length
+
+# "24" -> 24 for the common case; anything else goes through prefix_length for its error message.
+LENGTHS = {str(length): length for length in range(33)}
+
+
+def parse_address(text):
+    # inet_pton only takes four plain decimal octets, unlike inet_aton ("10.1", "0x0a...").
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, text), 'big')
+    except (OSError, TypeError):
+        raise ValueError(f'Invalid IPv4 address {text!r}.') from None
+
+
+def format_address(value):
+    return f'{value >> 24 & 0xff}.{value >> 16 & 0xff}.{value >> 8 & 0xff}.{value & 0xff}'
+
+
+def parse_prefix(text):
+    # "10.1.2.3/24" -> (network as int, 24), host bits cleared.
+    address, slash, length_text = text.partition('/')
+    if not slash:
+        raise ValueError(f'Invalid network {text!r}, expected address/prefix-length.')
+    length = LENGTHS.get(length_text)
+    if length is None:
+        length = prefix_length(length_text)
+    return parse_address(address.strip()) & MASKS[length], length
+
+
+def parse_prefixes(texts):
+    return [parse_prefix(text) for text in texts]
+
+
+def classful_network(text):
+    # RIP network statements are classful: 10.1.0.0 -> 10.0.0.0/8.
+    address = parse_address(text.strip())
+    first = address >> 24
+    length = 8 if first < 128 else 16 if first < 192 else 24
+    return address & MASKS[length], length
+
+
+def dedupe(prefixes):
+    # Keeps the first occurrence of each prefix, in input order.
+    return list(dict.fromkeys(prefixes))
+
+
+def collapse(prefixes, aggregate=False):
+    """Sorted prefixes without duplicates or subnets of other entries.
+
+    With ``aggregate`` contiguous sibling prefixes are also merged (10.0.0.0/25 +
+    10.0.0.128/25 -> 10.0.0.0/24), which gives the fewest prefixes covering exactly
+    the same addresses. Prefixes are packed into one int (network << 6 | length)
+    so a single integer sort orders them by network, shortest prefix first.
+    """
+    keys = sorted({network << 6 | length for network, length in prefixes})
+    result = []
+    end = -1
+    for key in keys:
+        network, length = key >> 6, key & 63
+        if network <= end:
+            continue  # inside the previous kept prefix
+        end = network + (1 << (32 - length)) - 1
+        result.append((network, length))
+        while aggregate and len(result) > 1:
+            (first, first_length), (second, second_length) = result[-2], result[-1]
+            size = 1 << (32 - first_length)
+            if (first_length != second_length or first_length == 0 or first & size
+                    or second != first + size):
+                break
+            result[-2:] = [(first, first_length - 1)]
+    return result
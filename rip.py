@@ -1,19 +1,19 @@
 from discord.ext import commands
 import discord
 from netmiko import ConnectHandler 
+from prefixes import classful_network, format_address, dedupe
 
 def rip(network):
+    # RIP takes classful networks, so 10.1.0.0 and 10.2.0.0 collapse into one "network 10.0.0.0".
     configs = ['router rip', 'version 2', 'no auto-summary']
-    networks = network.split(',')
-    for network in networks:
-        configs.append('network ' + network)
+    for network, _ in dedupe(classful_network(network) for network in network.split(',')):
+        configs.append('network ' + format_address(network))
     return configs
 
 def remove_rip_nw(network):
     configs = ['router rip']
-    networks = network.split(',')
-    for network in networks:
-        configs.append('no network ' + network)
+    for network, _ in dedupe(classful_network(network) for network in network.split(',')):
+        configs.append('no network ' + format_address(network))
     return configs
 
 def disable_rip():
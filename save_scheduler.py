@@ -0,0 +1,105 @@
+import asyncio
+
+
+class PendingSave:
+    __slots__ = ('args', 'futures', 'first', 'timer', 'due')
+
+    def __init__(self, first):
+        self.args = ()
+        self.futures = []
+        self.first = first
+        self.timer = None
+        self.due = False
+
+
+class SaveScheduler:
+    """Write-back scheduler for "write memory": at most one save per device per quiet period.
+
+    ``request`` records that a device needs saving and returns a future for the
+    output of the save that covers it. Requests for the same key are merged until
+    ``quiet`` seconds pass without a new one, but never held back more than
+    ``max_delay`` seconds after the first. A request made while the device is
+    writing goes into the next save, since the running one may miss its changes.
+    ``save(*args)`` is awaited with the arguments of the latest merged request.
+    """
+
+    def __init__(self, save, quiet=5, max_delay=30):
+        self._save = save
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self._pending = {}
+        self._running = {}
+        self.requested = 0
+        self.merged = 0
+        self.writes = 0
+        self.failed = 0
+
+    def request(self, key, *args):
+        loop = asyncio.get_running_loop()
+        self.requested += 1
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = PendingSave(loop.time())
+        else:
+            self.merged += 1
+            pending.timer.cancel()
+        pending.args = args
+        future = loop.create_future()
+        pending.futures.append(future)
+        delay = max(min(self.quiet, pending.first + self.max_delay - loop.time()), 0)
+        pending.timer = loop.call_later(delay, self._start, key)
+        return future
+
+    async def flush(self, key=None):
+        # Starts pending saves now (all of them without a key) and waits for them to finish.
+        keys = list(self._pending) if key is None else [key]
+        waiting = []
+        for key in keys:
+            pending = self._pending.get(key)
+            if pending is not None:
+                waiting += pending.futures
+                self._start(key)
+            if key in self._running:
+                waiting.append(self._running[key])
+        await asyncio.gather(*waiting, return_exceptions=True)
+
+    def stats(self):
+        return {
+            'pending': len(self._pending),
+            'running': len(self._running),
+            'requested': self.requested,
+            'merged': self.merged,
+            'writes': self.writes,
+            'failed': self.failed,
+        }
+
+    def _start(self, key):
+        pending = self._pending.get(key)
+        if pending is None:
+            return
+        pending.timer.cancel()
+        if key in self._running:
+            pending.due = True  # started when the running save finishes
+            return
+        del self._pending[key]
+        self._running[key] = asyncio.ensure_future(self._write(key, pending))
+
+    async def _write(self, key, pending):
+        try:
+            output = await self._save(*pending.args)
+        except Exception as error:
+            self.failed += 1
+            for future in pending.futures:
+                if not future.done():
+                    future.set_exception(error)
+                    future.exception()  # callers that stopped waiting should not log it
+        else:
+            self.writes += 1
+            for future in pending.futures:
+                if not future.done():
+                    future.set_result(output)
+        finally:
+            del self._running[key]
+            following = self._pending.get(key)
+            if following is not None and following.due:
+                self._start(key)
@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import OrderedDict
+from netmiko import ConnectHandler
+
+
+class SessionCheckError(ConnectionError):
+    pass
+
+
+class PooledSession:
+    __slots__ = ('connection', 'device', 'last_used', 'busy')
+
+    def __init__(self, connection, device):
+        self.connection = connection
+        self.device = device
+        self.last_used = time.monotonic()
+        self.busy = 0
+
+
+class SessionPool:
+    """Keeps netmiko sessions warm between commands, keyed by the connections key ("user:index").
+
+    Idle sessions are closed after ``idle_ttl`` seconds and the least recently used
+    idle session is closed when more than ``max_sessions`` are open.
+
+    ``liveness`` is chosen per device when acquiring:
+    - ``prompt``: a new session must show an exec prompt, a reused one is checked
+      unless it was used in the last ``recheck_after`` seconds.
+    - ``always``: like ``prompt`` but reused sessions are checked every time.
+    - ``none``: rely on the SSH handshake; broken sessions surface as command errors.
+    """
+
+    def __init__(self, max_sessions=64, idle_ttl=300, recheck_after=10, connect=ConnectHandler):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.recheck_after = recheck_after
+        self._connect = connect
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+        self.reconnected = 0
+        self.evicted = 0
+        self.checks = 0
+        self.checks_skipped = 0
+        self.check_seconds = 0.0
+
+    def is_warm(self, key):
+        with self._lock:
+            return key in self._sessions
+
+    def acquire(self, key, device, liveness='prompt'):
+        # Returns (connection, reused). A stale or outdated session is replaced by a fresh one.
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None:
+                entry.busy += 1
+                self._sessions.move_to_end(key)
+
+        if entry is not None:
+            if entry.device == device and self._reusable(entry, liveness):
+                entry.last_used = time.monotonic()
+                with self._lock:
+                    self.reused += 1
+                return entry.connection, True
+            with self._lock:
+                entry.busy -= 1
+                if self._sessions.get(key) is entry:
+                    del self._sessions[key]
+                self.reconnected += 1
+            self._close(entry.connection)
+
+        connection = self._connect(**device)
+        if liveness != 'none' and not self._check(self._shows_prompt, connection):
+            self._close(connection)
+            raise SessionCheckError(f"{device['host']} did not return a CLI prompt.")
+        entry = PooledSession(connection, device)
+        entry.busy = 1
+        with self._lock:
+            previous = self._sessions.pop(key, None)
+            self._sessions[key] = entry
+            self.opened += 1
+        if previous is not None and previous.busy == 0:
+            self._close(previous.connection)
+        self._enforce_limit()
+        return connection, False
+
+    def release(self, key, connection):
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None or entry.connection is not connection:
+                return
+            entry.busy = max(entry.busy - 1, 0)
+            entry.last_used = time.monotonic()
+
+    def discard(self, key, connection=None):
+        # Drops a session that is known to be broken (timeouts, socket errors, ...).
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None or (connection is not None and entry.connection is not connection):
+                return
+            del self._sessions[key]
+        self._close(entry.connection)
+
+    def sweep(self):
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, entry in list(self._sessions.items()):
+                if entry.busy == 0 and now - entry.last_used > self.idle_ttl:
+                    expired.append(self._sessions.pop(key))
+            self.evicted += len(expired)
+        for entry in expired:
+            self._close(entry.connection)
+        return len(expired)
+
+    def close_all(self):
+        with self._lock:
+            entries = list(self._sessions.values())
+            self._sessions.clear()
+        for entry in entries:
+            self._close(entry.connection)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'open': len(self._sessions),
+                'busy': sum(1 for entry in self._sessions.values() if entry.busy),
+                'opened': self.opened,
+                'reused': self.reused,
+                'reconnected': self.reconnected,
+                'evicted': self.evicted,
+                'checks': self.checks,
+                'checks_skipped': self.checks_skipped,
+                'check_ms_avg': self.check_seconds / self.checks * 1000 if self.checks else 0.0,
+            }
+
+    def _enforce_limit(self):
+        evicted = []
+        with self._lock:
+            overflow = len(self._sessions) - self.max_sessions
+            if overflow > 0:
+                for key, entry in list(self._sessions.items()):
+                    if overflow <= 0:
+                        break
+                    if entry.busy == 0:
+                        evicted.append(self._sessions.pop(key))
+                        overflow -= 1
+            self.evicted += len(evicted)
+        for entry in evicted:
+            self._close(entry.connection)
+
+    def _reusable(self, entry, liveness):
+        idle = time.monotonic() - entry.last_used
+        if liveness == 'none' or (liveness == 'prompt' and idle < self.recheck_after):
+            with self._lock:
+                self.checks_skipped += 1
+            return True
+        return self._check(self._is_alive, entry.connection)
+
+    def _check(self, probe, connection):
+        started = time.perf_counter()
+        ok = probe(connection)
+        with self._lock:
+            self.checks += 1
+            self.check_seconds += time.perf_counter() - started
+        return ok
+
+    @staticmethod
+    def _shows_prompt(connection):
+        try:
+            return connection.find_prompt().rstrip().endswith(('#', '>'))
+        except Exception:
+            return False
+
+    @staticmethod
+    def _is_alive(connection):
+        try:
+            return connection.is_alive()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.disconnect()
+        except Exception:
+            pass
@@ -0,0 +1,53 @@
+import asyncio
+
+
+class SingleFlight:
+    """Coalesces identical calls that overlap in time.
+
+    The first ``run`` for a key executes ``func``; calls with the same key that
+    arrive before it finishes wait for that execution and get its result (or its
+    exception) instead of running their own. ``run`` returns (result, shared).
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.calls = 0
+        self.saved = 0
+
+    async def run(self, key, func, *args, **kwargs):
+        while True:
+            future = self._flights.get(key)
+            if future is None:
+                break
+            self.saved += 1
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leading call was cancelled, not this one: run it again.
+                self.saved -= 1
+
+        future = self._flights[key] = asyncio.get_running_loop().create_future()
+        self.calls += 1
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            future.exception()  # retrieved here so an unshared failure is not logged twice
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._flights[key]
+
+    def stats(self):
+        return {
+            'in_flight': len(self._flights),
+            'calls': self.calls,
+            'saved': self.saved,
+        }
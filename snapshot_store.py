@@ -0,0 +1,54 @@
+import sqlite3
+import threading
+import time
+
+
+class SnapshotStore:
+    """Latest output of each polled show command per device login, kept in SQLite so it survives restarts.
+
+    One row per (host, login, command) is overwritten on every poll, so the store
+    grows with the inventory, not with time. Output is keyed by login like the
+    show cache, since accounts with different privileges see different output.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('''CREATE TABLE IF NOT EXISTS snapshots (
+                host TEXT NOT NULL,
+                login TEXT NOT NULL,
+                command TEXT NOT NULL,
+                output TEXT NOT NULL,
+                taken_at REAL NOT NULL,
+                PRIMARY KEY (host, login, command)
+            ) WITHOUT ROWID''')
+
+    def get(self, host, login, command):
+        # (output, taken_at as a Unix time) or None
+        with self._lock:
+            return self._db.execute(
+                'SELECT output, taken_at FROM snapshots WHERE host = ? AND login = ? AND command = ?',
+                (host, login, command)).fetchone()
+
+    def put(self, host, login, command, output, taken_at=None):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO snapshots (host, login, command, output, taken_at) VALUES (?, ?, ?, ?, ?)',
+                (host, login, command, output, time.time() if taken_at is None else taken_at))
+
+    def prune(self, logins):
+        # Drops snapshots of (host, login) pairs that are no longer in the inventory.
+        with self._lock:
+            known = self._db.execute('SELECT DISTINCT host, login FROM snapshots').fetchall()
+            removed = [row for row in known if row not in logins]
+            if removed:
+                self._db.executemany('DELETE FROM snapshots WHERE host = ? AND login = ?', removed)
+        return len(removed)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,112 @@
+import difflib
+import random
+
+import pytest
+
+from config_archive import ConfigArchive, normalize, unified_diff
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = ConfigArchive(str(tmp_path / 'archive.db'), max_versions=3)
+    yield archive
+    archive.close()
+
+
+CONFIG = 'Building configuration...\n\nCurrent configuration : 120 bytes\n!\nhostname R1\n!\ninterface Loopback0\n!\nend'
+
+
+def test_normalize_strips_volatile_lines():
+    assert normalize(CONFIG) == '!\nhostname R1\n!\ninterface Loopback0\n!\nend'
+    assert normalize(CONFIG.replace('120 bytes', '999 bytes')) == normalize(CONFIG)
+
+
+def test_unchanged_config_adds_no_version(archive):
+    assert archive.add('r1', 'admin', CONFIG, taken_at=1) == (1, True)
+    assert archive.add('r1', 'admin', CONFIG.replace('120', '121'), taken_at=2) == (1, False)
+    [version] = archive.versions('r1', 'admin')
+    assert (version.taken_at, version.seen_at) == (1, 2)
+    assert archive.get('r1', 'admin', 1) == normalize(CONFIG)
+    assert archive.get('r1', 'admin', 2) is None
+
+
+def test_chains_are_kept_per_login_and_share_blobs(archive):
+    archive.add('r1', 'admin', CONFIG)
+    archive.add('r1', 'guest', CONFIG)
+    archive.add('r2', 'admin', CONFIG)
+    assert archive.versions('r1', 'guest')[0].version == 1
+    assert archive.get('r1', 'guest', 1) == archive.get('r1', 'admin', 1)
+    assert archive.stats()['blobs'] == 1
+    assert (archive.stats()['devices'], archive.stats()['logins']) == (2, 3)
+
+
+def test_old_versions_and_their_blobs_expire(archive):
+    for number in range(5):
+        archive.add('r1', 'admin', f'hostname R{number}')
+    assert [version.version for version in archive.versions('r1', 'admin')] == [3, 4, 5]
+    assert archive.get('r1', 'admin', 2) is None
+    assert archive.stats()['blobs'] == 3
+
+
+def test_stats_totals_match_the_database(archive, tmp_path):
+    for number in range(20):
+        archive.add(f'r{number % 3}', 'admin' if number % 2 else 'guest', f'hostname R{number % 7}\n' + 'x' * number)
+    stats = archive.stats()
+    reopened = ConfigArchive(archive.path, max_versions=3)
+    try:
+        assert reopened.stats() == stats
+    finally:
+        reopened.close()
+    assert stats['versions'] == sum(len(archive.versions(f'r{n}', login)) for n in range(3) for login in ('admin', 'guest'))
+
+
+def test_unified_diff_of_equal_configs_is_empty():
+    assert unified_diff('a\nb', 'a\nb') == ''
+
+
+def test_unified_diff_matches_difflib():
+    old = '\n'.join(f'line {number}' for number in range(40))
+    new = old.replace('line 5\n', 'line 5 changed\n').replace('line 30\n', '')
+    expected = list(difflib.unified_diff(old.splitlines(), new.splitlines(), 'old', 'new', lineterm=''))
+    assert unified_diff(old, new) == '\n'.join(expected)
+
+
+def apply_patch(old, diff):
+    # Minimal unified diff applier: checks every context and removed line against ``old``.
+    lines = diff.split('\n')[2:]
+    result = []
+    position = 0
+    for line in lines:
+        if line.startswith('@@'):
+            start = int(line.split()[1][1:].split(',')[0])
+            length = line.split()[1].split(',')
+            start = start - 1 if len(length) == 1 or int(length[1]) else start
+            result += old[position:start]
+            position = start
+        elif line[0] in ' -':
+            assert old[position] == line[1:]
+            position += 1
+            if line[0] == ' ':
+                result.append(line[1:])
+        else:
+            result.append(line[1:])
+    return result + old[position:]
+
+
+def test_unified_diff_applies_as_a_patch_on_random_edits():
+    generator = random.Random(7)
+    words = ['interface', 'shutdown', 'ip address', 'network', '!', 'description x']
+    for _ in range(500):
+        old = [generator.choice(words) for _ in range(generator.randint(1, 30))]
+        new = list(old)
+        for _ in range(generator.randint(1, 5)):
+            position = generator.randint(0, len(new))
+            if len(new) > 1 and generator.random() < 0.5:
+                del new[min(position, len(new) - 1)]
+            else:
+                new.insert(position, generator.choice(words))
+        diff = unified_diff('\n'.join(old), '\n'.join(new))
+        if old == new:
+            assert diff == ''
+        else:
+            assert apply_patch(old, diff) == new
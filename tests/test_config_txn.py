@@ -0,0 +1,152 @@
+import asyncio
+
+from config_txn import ConfigTransaction, parse_sections, section_delta
+from ios_sim import CLISession, SimulatedDevice
+
+
+class SimulatedHandle:
+    """Answers like DeviceHandle, from a simulated device's CLI without SSH."""
+
+    def __init__(self, device):
+        self.session = CLISession(device)
+        self.batches = []
+
+    async def send_command(self, command):
+        return self._run(command)
+
+    async def send_batch(self, commands):
+        self.batches.append(list(commands))
+        return [self._run(command) for command in commands]
+
+    def _run(self, command):
+        return ''.join(self.session.run(command))
+
+
+def reconcile(device, *sections):
+    handle = SimulatedHandle(device)
+    transaction = ConfigTransaction()
+    for section in sections:
+        transaction.add(section)
+    return asyncio.run(transaction.reconcile(handle)), handle
+
+
+def ospf_body(device):
+    return device.config.get('router ospf 1')
+
+
+def test_section_delta_skips_lines_already_present():
+    sections = {'router ospf 1': ['network 10.0.0.0 0.0.0.255 area 0']}
+    delta = section_delta(['router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0',
+                           'network 10.1.0.0 0.0.0.255 area 0'], sections)
+    assert delta == ['router ospf 1', 'network 10.1.0.0 0.0.0.255 area 0']
+    assert sections['router ospf 1'] == ['network 10.0.0.0 0.0.0.255 area 0', 'network 10.1.0.0 0.0.0.255 area 0']
+
+
+def test_section_delta_drops_negations_of_missing_statements():
+    sections = {'router ospf 1': ['network 10.0.0.0 0.0.0.255 area 0']}
+    delta = section_delta(['router ospf 1', 'no network 10.0.0.0 0.0.0.255 area 0',
+                           'no network 10.9.0.0 0.0.0.255 area 0'], sections)
+    assert delta == ['router ospf 1', 'no network 10.0.0.0 0.0.0.255 area 0']
+    assert sections['router ospf 1'] == []
+
+
+def test_section_delta_does_not_create_a_section_only_to_negate():
+    sections = {}
+    assert section_delta(['router ospf 1', 'no network 10.0.0.0 0.0.0.255 area 0'], sections) == []
+    assert sections == {}
+
+
+def test_section_delta_creates_missing_section_without_statement_negations():
+    sections = {}
+    delta = section_delta(['router rip', 'version 2', 'no auto-summary', 'no network 10.0.0.0',
+                           'network 192.168.1.0'], sections)
+    assert delta == ['router rip', 'version 2', 'no auto-summary', 'network 192.168.1.0']
+    assert sections == {'router rip': ['version 2', 'network 192.168.1.0']}
+
+
+def test_section_delta_removes_a_mode_only_when_present():
+    assert section_delta(['no router ospf 1'], {}) == []
+    sections = {'router ospf 1': []}
+    assert section_delta(['no router ospf 1'], sections) == ['no router ospf 1']
+    assert sections == {}
+
+
+def test_section_delta_matches_abbreviated_interfaces():
+    sections = {'interface GigabitEthernet0/1': ['ip address 10.1.0.1 255.255.255.0']}
+    assert section_delta(['int g0/1', 'ip address 10.1.0.1 255.255.255.0'], sections) == []
+
+
+def test_section_delta_matches_classful_networks_shown_without_mask():
+    sections = {'router bgp 65000': ['network 10.0.0.0']}
+    assert section_delta(['router bgp 65000', 'network 10.0.0.0 mask 255.0.0.0'], sections) == []
+    delta = section_delta(['router bgp 65000', 'no network 10.0.0.0 mask 255.0.0.0'], sections)
+    assert delta == ['router bgp 65000', 'no network 10.0.0.0 mask 255.0.0.0']
+    assert sections == {'router bgp 65000': []}
+
+
+def test_parse_sections():
+    readback = 'router ospf 1\n network 10.0.0.0 0.0.0.255 area 0\n!\ninterface Loopback0\n'
+    assert parse_sections(readback) == {'router ospf 1': ['network 10.0.0.0 0.0.0.255 area 0'],
+                                        'interface Loopback0': []}
+
+
+def test_reconcile_pushes_only_the_delta():
+    device = SimulatedDevice()
+    result, _ = reconcile(device, ['router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0'])
+    assert result.applied == ['router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0']
+    assert ospf_body(device) == ['network 10.0.0.0 0.0.0.255 area 0']
+
+    result, handle = reconcile(device, ['router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0',
+                                        'network 10.1.0.0 0.0.0.255 area 0'])
+    assert result.applied == ['router ospf 1', 'network 10.1.0.0 0.0.0.255 area 0']
+    assert handle.batches == [['configure terminal', 'router ospf 1', 'network 10.1.0.0 0.0.0.255 area 0', 'end']]
+    assert ospf_body(device) == ['network 10.0.0.0 0.0.0.255 area 0', 'network 10.1.0.0 0.0.0.255 area 0']
+
+
+def test_reconcile_unchanged_config_sends_nothing():
+    device = SimulatedDevice()
+    section = ['router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0']
+    reconcile(device, section)
+    result, handle = reconcile(device, section)
+    assert result.applied == []
+    assert handle.batches == []
+
+
+def test_reconcile_removal_of_unknown_network_sends_nothing():
+    device = SimulatedDevice()
+    result, handle = reconcile(device, ['router ospf 1', 'no network 10.0.0.0 0.0.0.255 area 0'])
+    assert result.applied == []
+    assert handle.batches == []
+    assert ospf_body(device) is None
+
+
+def test_reconcile_removes_existing_network():
+    device = SimulatedDevice()
+    reconcile(device, ['router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0', 'network 10.1.0.0 0.0.0.255 area 0'])
+    result, _ = reconcile(device, ['router ospf 1', 'no network 10.0.0.0 0.0.0.255 area 0'])
+    assert result.applied == ['router ospf 1', 'no network 10.0.0.0 0.0.0.255 area 0']
+    assert ospf_body(device) == ['network 10.1.0.0 0.0.0.255 area 0']
+
+
+def test_reconcile_reports_device_errors():
+    device = SimulatedDevice()
+    result, _ = reconcile(device, ['router ospf 1', 'network 10.0.0.300 0.0.0.255 area 0'])
+    assert [error.command for error in result.errors] == ['network 10.0.0.300 0.0.0.255 area 0']
+
+
+def test_reconcile_classful_eigrp_network_is_idempotent():
+    device = SimulatedDevice()
+    section = ['router eigrp 10', 'network 10.0.0.0 0.255.255.255']
+    reconcile(device, section)
+    assert device.config['router eigrp 10'] == ['network 10.0.0.0']
+    result, handle = reconcile(device, section)
+    assert result.applied == []
+    assert handle.batches == []
+
+
+def test_reconcile_removes_classful_bgp_network():
+    device = SimulatedDevice()
+    reconcile(device, ['router bgp 65000', 'network 172.16.0.0 mask 255.255.0.0', 'network 10.1.0.0 mask 255.255.0.0'])
+    result, _ = reconcile(device, ['router bgp 65000', 'no network 172.16.0.0 mask 255.255.0.0'])
+    assert result.applied == ['router bgp 65000', 'no network 172.16.0.0 mask 255.255.0.0']
+    assert device.config['router bgp 65000'] == ['network 10.1.0.0 mask 255.255.0.0']
@@ -0,0 +1,80 @@
+import pickle
+
+from connection_store import ConnectionStore
+
+
+def test_changes_persist_across_reopen(tmp_path):
+    path = str(tmp_path / 'connections.db')
+    store = ConnectionStore(path)
+    first = store.add('alice', '10.0.0.1', 'admin', 'secret')
+    second = store.add('alice', '10.0.0.2', 'admin', 'secret')
+    assert store.update('alice', first, '10.0.0.9', 'ops', 'other')
+    assert store.set_liveness('alice', first, 'tcp')
+    assert store.delete('alice', second)
+    store.save_group('alice', 'core', [first, second])
+    store.close()
+
+    store = ConnectionStore(path)
+    assert store.list_user('alice') == [(first, ('10.0.0.9', 'ops', 'other', 'tcp'))]
+    assert store.get_groups('alice') == {'core': [first, second]}
+    store.close()
+
+
+def test_unknown_devices_and_bad_indexes(tmp_path):
+    store = ConnectionStore(str(tmp_path / 'connections.db'))
+    index = store.add('alice', '10.0.0.1', 'admin', 'secret')
+    assert store.get('alice', str(index)) == ('10.0.0.1', 'admin', 'secret', 'prompt')
+    assert store.get('bob', index) is None
+    assert store.get('alice', 'x') is None
+    assert not store.update('alice', 99, '10.0.0.2', 'admin', 'secret')
+    assert not store.delete('bob', index)
+    store.close()
+
+
+def test_devices_lists_each_login_once(tmp_path):
+    store = ConnectionStore(str(tmp_path / 'connections.db'))
+    store.add('alice', '10.0.0.1', 'admin', 'secret')
+    store.add('bob', '10.0.0.1', 'admin', 'secret')
+    store.add('bob', '10.0.0.1', 'readonly', 'secret')
+    assert sorted(store.devices()) == [('10.0.0.1', 'admin'), ('10.0.0.1', 'readonly')]
+    store.close()
+
+
+def test_migrate_pickle_runs_once(tmp_path):
+    connections = tmp_path / 'user-connections.pkl'
+    groups = tmp_path / 'user-groups.pkl'
+    connections.write_bytes(pickle.dumps({'alice#1234:1': ('10.0.0.1', 'admin', 'secret'),
+                                          'alice#1234:3': ('10.0.0.3', 'admin', 'secret')}))
+    groups.write_bytes(pickle.dumps({'alice#1234:core': [1, 3]}))
+    store = ConnectionStore(str(tmp_path / 'connections.db'))
+    assert store.migrate_pickle(str(connections), str(groups)) == 2
+    assert [index for index, _ in store.list_user('alice#1234')] == [1, 3]
+    assert store.get_groups('alice#1234') == {'core': [1, 3]}
+    assert store.migrate_pickle(str(connections), str(groups)) == 0
+    store.close()
+
+
+def test_indexes_are_never_reused(tmp_path):
+    path = str(tmp_path / 'connections.db')
+    store = ConnectionStore(path)
+    assert [store.add('alice', f'10.0.0.{n}', 'admin', 'secret') for n in (1, 2, 3)] == [1, 2, 3]
+    assert store.delete('alice', 3)
+    assert store.add('alice', '10.0.0.4', 'admin', 'secret') == 4
+    assert store.add('bob', '10.0.0.1', 'admin', 'secret') == 1
+    store.delete('alice', 4)
+    store.close()
+
+    store = ConnectionStore(path)
+    assert store.add('alice', '10.0.0.5', 'admin', 'secret') == 5
+    store.close()
+
+
+def test_users_evicted_from_memory_are_reloaded(tmp_path):
+    store = ConnectionStore(str(tmp_path / 'connections.db'), cached_users=2)
+    for user in ('alice', 'bob', 'carol'):
+        store.add(user, '10.0.0.1', user, 'secret')
+    assert list(store._users) == ['bob', 'carol']
+    assert store.list_user('alice') == [(1, ('10.0.0.1', 'alice', 'secret', 'prompt'))]
+    assert store.add('alice', '10.0.0.2', 'alice', 'secret') == 2
+    assert list(store._users) == ['carol', 'alice']
+    store.close()
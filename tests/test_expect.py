@@ -0,0 +1,99 @@
+import pytest
+
+import re
+
+from expect import read_batch, read_until_prompt, split_batch
+from ios_sim import CLISession, SimulatedDevice
+
+
+class ShellConnection:
+    """The netmiko channel calls expect.py uses, answered like the simulator's SSH shell.
+
+    Output is handed out ``chunk_size`` characters per read, so prompts and echoes
+    arrive split across reads as they do over SSH.
+    """
+
+    RETURN = '\n'
+
+    def __init__(self, device, chunk_size=7):
+        self.session = CLISession(device)
+        self.base_prompt = device.hostname
+        self.chunk_size = chunk_size
+        self.buffer = '\r\n' + self.session.prompt()
+
+    def write_channel(self, data):
+        for line in data.split(self.RETURN)[:-1]:
+            self.buffer += line + '\r\n'
+            for chunk in self.session.run(line):
+                self.buffer += chunk.replace('\r\n', '\n').replace('\n', '\r\n')
+                if not chunk.endswith('\n') and len(chunk) > 1:
+                    self.buffer += '\r\n'
+            self.buffer += self.session.prompt()
+
+    def read_channel(self):
+        chunk, self.buffer = self.buffer[:self.chunk_size], self.buffer[self.chunk_size:]
+        return chunk
+
+
+class SilentConnection(ShellConnection):
+    def write_channel(self, data):
+        pass
+
+
+def test_read_until_prompt_returns_output_up_to_the_prompt():
+    connection = ShellConnection(SimulatedDevice(hostname='R1'))
+    chunks = []
+    output = read_until_prompt(connection, 'show ip int brief', chunks.append, poll_interval=0)
+    assert output == ''.join(chunks)
+    assert 'GigabitEthernet0/0' in output
+    assert output.endswith('\r\nR1#')
+    assert connection.buffer == ''
+
+
+def test_read_until_prompt_ignores_a_prompt_left_before_the_echo():
+    # The first read ends right after the login prompt, which must not end the command.
+    connection = ShellConnection(SimulatedDevice(hostname='R1'), chunk_size=5)
+    output = read_until_prompt(connection, 'show run | include hostname', poll_interval=0)
+    assert output.startswith('\r\nR1#show run | include hostname')
+    assert 'hostname R1' in output
+
+
+def test_read_until_prompt_times_out_without_a_prompt():
+    connection = SilentConnection(SimulatedDevice(hostname='R1'))
+    connection.buffer = ''
+    with pytest.raises(TimeoutError):
+        read_until_prompt(connection, 'show version', read_timeout=0.05, poll_interval=0.01)
+
+
+def test_read_batch_returns_one_output_per_command():
+    connection = ShellConnection(SimulatedDevice(hostname='R1'))
+    outputs = read_batch(connection, ['show run | include hostname', 'show ip int brief', 'show vlan brief'],
+                         poll_interval=0)
+    assert len(outputs) == 3
+    assert outputs[0] == 'hostname R1'
+    assert 'GigabitEthernet0/0' in outputs[1] and 'hostname' not in outputs[1]
+    assert 'default' in outputs[2] and 'R1#' not in outputs[2]
+    assert connection.buffer == ''
+
+
+def test_read_batch_follows_config_mode_prompts():
+    connection = ShellConnection(SimulatedDevice(hostname='R1'), chunk_size=4)
+    outputs = read_batch(connection, ['configure terminal', 'router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0',
+                                      'end', 'show run | section router ospf'], poll_interval=0)
+    assert len(outputs) == 5
+    assert outputs[0].startswith('Enter configuration commands')
+    assert outputs[1:4] == ['', '', '']
+    assert outputs[4] == 'router ospf 1\n network 10.0.0.0 0.0.0.255 area 0'
+
+
+def test_split_batch_waits_for_every_boundary():
+    boundaries = [re.compile(r'R1[^\n]{0,32}?[>#]show vlan brief\s*$')]
+    partial = 'R1#show ip int brief\r\nInterface  IP-Address\r\nR1#'
+    assert split_batch(partial, 'show ip int brief', boundaries) is None
+    done = partial + 'show vlan brief\r\nVLAN Name\r\nR1#'
+    assert split_batch(done, 'show ip int brief', boundaries) == ['Interface  IP-Address', 'VLAN Name']
+
+
+def test_split_batch_skips_output_left_before_the_first_echo():
+    leftover = 'old output\r\nR1#\r\nR1#show ip int brief\r\nInterface  IP-Address\r\nR1#'
+    assert split_batch(leftover, 'show ip int brief', []) == ['Interface  IP-Address']
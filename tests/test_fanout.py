@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from fanout import FanoutSummary, fan_out, parse_targets, percentile
+
+
+def test_parse_targets_lists_and_ranges():
+    assert parse_targets('3') == [3]
+    assert parse_targets('1,4,7-9') == [1, 4, 7, 8, 9]
+    assert parse_targets('5-3,4') == [3, 4, 5]
+
+
+def test_parse_targets_uses_groups():
+    assert parse_targets('core', {'core': [2, 5]}) == [2, 5]
+
+
+@pytest.mark.parametrize('spec', ['0', '1,x', ',', '1-a'])
+def test_parse_targets_rejects_bad_specs(spec):
+    with pytest.raises(ValueError):
+        parse_targets(spec)
+
+
+def test_huge_ranges_are_rejected_before_they_are_expanded():
+    started = time.perf_counter()
+    with pytest.raises(ValueError, match='At most 1000'):
+        parse_targets('1-1000000000')
+    assert time.perf_counter() - started < 0.1
+
+
+def test_many_small_parts_are_capped_too():
+    with pytest.raises(ValueError):
+        parse_targets(','.join(f'{start}-{start + 9}' for start in range(1, 2000, 10)), max_targets=100)
+    assert len(parse_targets('1-100', max_targets=100)) == 100
+
+
+def test_fan_out_limits_concurrency_and_reports_failures():
+    running = []
+    peak = []
+
+    async def run_one(index):
+        running.append(index)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(index)
+        if index == 3:
+            raise LookupError('no device')
+        return index * 10
+
+    async def main():
+        return [result async for result in fan_out(range(1, 7), run_one, concurrency=2)]
+
+    results = asyncio.run(main())
+    assert max(peak) == 2
+    assert sorted((index, ok) for index, ok, _, _ in results) == [(1, True), (2, True), (3, False), (4, True),
+                                                                 (5, True), (6, True)]
+    assert isinstance(next(result for index, ok, result, _ in results if index == 3), LookupError)
+
+
+def test_summary_percentiles():
+    summary = FanoutSummary()
+    for seconds in (0.3, 0.1, 0.2):
+        summary.add(True, seconds)
+    summary.add(False, 0.4)
+    assert (summary.succeeded, summary.failed) == (3, 1)
+    assert summary.latency_ms(50) == pytest.approx(200)
+    assert percentile([], 50) == 0.0
@@ -0,0 +1,118 @@
+import asyncio
+
+from fleet_poller import FleetPoller
+from snapshot_store import SnapshotStore
+
+
+class InlineExecutor:
+    async def run(self, key, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def run_poller(poller, seconds):
+    async def main():
+        poller.start()
+        await asyncio.sleep(seconds)
+        poller.stop()
+    asyncio.run(main())
+
+
+def test_snapshot_store_keeps_the_latest_output_per_login(tmp_path):
+    path = str(tmp_path / 'snapshots.db')
+    store = SnapshotStore(path)
+    store.put('10.0.0.1', 'admin', 'show ip int brief', 'old', 100.0)
+    store.put('10.0.0.1', 'admin', 'show ip int brief', 'new', 200.0)
+    store.put('10.0.0.1', 'readonly', 'show ip int brief', 'limited', 150.0)
+    store.close()
+
+    store = SnapshotStore(path)
+    assert store.get('10.0.0.1', 'admin', 'show ip int brief') == ('new', 200.0)
+    assert store.get('10.0.0.1', 'readonly', 'show ip int brief') == ('limited', 150.0)
+    assert store.get('10.0.0.2', 'admin', 'show ip int brief') is None
+    assert store.prune({('10.0.0.1', 'admin'): None}) == 1
+    assert store.get('10.0.0.1', 'readonly', 'show ip int brief') is None
+    store.close()
+
+
+def test_every_login_is_polled_and_saved(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots.db'))
+    devices = {('10.0.0.1', 'admin'): 'record-a', ('10.0.0.1', 'readonly'): 'record-b'}
+    calls = []
+
+    async def poll(host, login, device, commands):
+        calls.append((host, login, device))
+        return [f'{command} as {login}' for command in commands]
+
+    poller = FleetPoller(lambda: devices, poll, store, {'show ip int brief': 0.05}, InlineExecutor(), tick=0.01)
+    run_poller(poller, 0.3)
+    assert set(calls) == {('10.0.0.1', 'admin', 'record-a'), ('10.0.0.1', 'readonly', 'record-b')}
+    assert store.get('10.0.0.1', 'readonly', 'show ip int brief')[0] == 'show ip int brief as readonly'
+    assert poller.stats()['polls'] == len(calls) >= 4
+    store.close()
+
+
+def test_concurrency_is_limited(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots.db'))
+    devices = {(f'10.0.0.{n}', 'admin'): None for n in range(6)}
+    running = []
+    peak = []
+
+    async def poll(host, login, device, commands):
+        running.append(host)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.remove(host)
+        return ['output' for _ in commands]
+
+    poller = FleetPoller(lambda: devices, poll, store, {'show ip int brief': 0.01}, InlineExecutor(),
+                         concurrency=2, tick=0.005)
+    run_poller(poller, 0.2)
+    assert peak and max(peak) == 2
+    store.close()
+
+
+def test_a_failing_login_backs_off(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots.db'))
+    devices = {('10.0.0.1', 'admin'): None, ('10.0.0.2', 'admin'): None}
+    calls = []
+
+    async def poll(host, login, device, commands):
+        calls.append(host)
+        if host == '10.0.0.2':
+            raise TimeoutError('no answer')
+        return ['output' for _ in commands]
+
+    poller = FleetPoller(lambda: devices, poll, store, {'show ip int brief': 0.02}, InlineExecutor(),
+                         backoff=30, tick=0.005)
+    run_poller(poller, 0.2)
+    assert calls.count('10.0.0.2') == 1
+    assert calls.count('10.0.0.1') > 1
+    stats = poller.stats()
+    assert stats['failures'] == 1 and stats['backing_off'] == 1
+    assert store.get('10.0.0.2', 'admin', 'show ip int brief') is None
+    store.close()
+
+
+def test_removed_logins_are_dropped_on_refresh(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots.db'))
+    store.put('10.0.0.9', 'admin', 'show ip int brief', 'gone', 100.0)
+    devices = {('10.0.0.1', 'admin'): None, ('10.0.0.2', 'admin'): None}
+
+    async def poll(host, login, device, commands):
+        return ['output' for _ in commands]
+
+    async def main():
+        poller = FleetPoller(lambda: dict(devices), poll, store, {'show ip int brief': 0.02}, InlineExecutor(),
+                             refresh=0.05, tick=0.005)
+        poller.start()
+        await asyncio.sleep(0.1)
+        del devices['10.0.0.2', 'admin']
+        await asyncio.sleep(0.1)
+        poller.stop()
+        return poller.stats()
+
+    assert asyncio.run(main())['devices'] == 1
+    assert store.get('10.0.0.9', 'admin', 'show ip int brief') is None
+    assert store.get('10.0.0.2', 'admin', 'show ip int brief') is None
+    assert store.get('10.0.0.1', 'admin', 'show ip int brief') is not None
+    store.close()
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+import outbox as outbox_module
+from outbox import HIGH, LOW, MESSAGE_LIMIT, Outbox, TokenBucket
+
+
+class FakeChannel:
+    def __init__(self, id, log=None, gate=None):
+        self.id = id
+        self.sent = []
+        self.log = log if log is not None else []
+        self.gate = gate
+
+    async def send(self, content=None, **kwargs):
+        if self.gate is not None:
+            await self.gate.wait()
+        self.sent.append((content, kwargs))
+        self.log.append(self.id)
+        return len(self.sent)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_at_its_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(outbox_module.time, 'monotonic', clock)
+    bucket = TokenBucket(5, 5.0)
+    for _ in range(5):
+        assert bucket.wait_time() == 0
+        bucket.take()
+    assert bucket.wait_time() == pytest.approx(1.0)
+    clock.now += 0.5
+    assert bucket.wait_time() == pytest.approx(0.5)
+    clock.now += 60
+    bucket.wait_time()
+    assert bucket.tokens == 5
+
+
+def test_queued_text_is_merged_into_one_message():
+    async def main():
+        gate = asyncio.Event()
+        channel = FakeChannel(1, gate=gate)
+        box = Outbox()
+        first = asyncio.ensure_future(box.send(channel, 'one'))
+        await asyncio.sleep(0)
+        rest = [asyncio.ensure_future(box.send(channel, text)) for text in ('two', 'three')]
+        embed = asyncio.ensure_future(box.send(channel, embed='card'))
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(first, *rest, embed)
+        box.close()
+        return channel.sent, results, box.stats()
+
+    sent, results, stats = asyncio.run(main())
+    assert sent == [('one', {}), ('two\nthree', {}), (None, {'embed': 'card'})]
+    assert results == [1, 2, 2, 3]
+    assert stats['sent'] == 3 and stats['merged'] == 1
+
+
+def test_merge_stops_at_the_message_limit_and_for_merge_false():
+    async def main():
+        gate = asyncio.Event()
+        channel = FakeChannel(1, gate=gate)
+        box = Outbox()
+        sends = [box.send(channel, 'first'), box.send(channel, 'x' * (MESSAGE_LIMIT - 1)),
+                 box.send(channel, 'y'), box.send(channel, 'edit me', merge=False), box.send(channel, 'z')]
+        tasks = [asyncio.ensure_future(send) for send in sends]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*tasks)
+        box.close()
+        return [content for content, _ in channel.sent]
+
+    assert asyncio.run(main()) == ['first', 'x' * (MESSAGE_LIMIT - 1), 'y', 'edit me', 'z']
+
+
+def test_most_urgent_channel_goes_first():
+    async def main():
+        log = []
+        box = Outbox()
+        low = asyncio.ensure_future(box.send(FakeChannel(1, log), 'later', priority=LOW))
+        high = asyncio.ensure_future(box.send(FakeChannel(2, log), 'now', priority=HIGH))
+        await asyncio.gather(low, high)
+        box.close()
+        return log
+
+    assert asyncio.run(main()) == [2, 1]
+
+
+def test_channel_rate_paces_sends():
+    async def main():
+        channel = FakeChannel(1)
+        box = Outbox(channel_rate=2, channel_per=0.2)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(*(box.send(channel, str(n), merge=False) for n in range(3)))
+        elapsed = loop.time() - started
+        box.close()
+        return elapsed
+
+    assert asyncio.run(main()) >= 0.09
+
+
+def test_a_failed_send_fails_every_merged_message():
+    class Broken(FakeChannel):
+        async def send(self, content=None, **kwargs):
+            await self.gate.wait()
+            raise RuntimeError('discord is down')
+
+    async def main():
+        channel = Broken(1, gate=asyncio.Event())
+        box = Outbox()
+        tasks = [asyncio.ensure_future(box.send(channel, text)) for text in ('one', 'two', 'three')]
+        await asyncio.sleep(0)
+        channel.gate.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        box.close()
+        return results, box.stats()
+
+    results, stats = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert stats['failed'] == 1 and stats['merged'] == 2 and stats['queued'] == 0
@@ -0,0 +1,98 @@
+import output_cache
+from output_cache import OutputCache
+
+
+def make_cache(max_bytes=1000):
+    return OutputCache({'show run': 30, 'show run int': 5, 'show ip int brief': 10}, max_bytes=max_bytes)
+
+
+def test_ttl_uses_the_longest_matching_prefix():
+    cache = make_cache()
+    assert cache.ttl_for('show run') == 30
+    assert cache.ttl_for('show run int g0/0') == 5
+    assert cache.ttl_for('show clock') == 0
+
+
+def test_uncached_commands_are_never_stored():
+    cache = make_cache()
+    cache.put('r1', 'admin', 'show clock', 'now')
+    assert cache.get('r1', 'admin', 'show clock') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_hit_and_miss_per_login():
+    cache = make_cache()
+    cache.put('r1', 'admin', 'show run', 'config')
+    assert cache.get('r1', 'admin', 'show run') == 'config'
+    assert cache.get('r1', 'guest', 'show run') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+def test_entries_expire(monkeypatch):
+    cache = make_cache()
+    now = [1000.0]
+    monkeypatch.setattr(output_cache.time, 'monotonic', lambda: now[0])
+    cache.put('r1', 'admin', 'show run int g0/0', 'interface')
+    now[0] += 4
+    assert cache.get('r1', 'admin', 'show run int g0/0') == 'interface'
+    now[0] += 2
+    assert cache.get('r1', 'admin', 'show run int g0/0') is None
+    assert cache.stats()['bytes'] == 0
+
+
+def test_invalidate_drops_every_login_of_the_host_only():
+    cache = make_cache()
+    cache.put('r1', 'admin', 'show run', 'a')
+    cache.put('r1', 'guest', 'show ip int brief', 'b')
+    cache.put('r2', 'admin', 'show run', 'c')
+    cache.invalidate('r1')
+    assert cache.get('r1', 'admin', 'show run') is None
+    assert cache.get('r1', 'guest', 'show ip int brief') is None
+    assert cache.get('r2', 'admin', 'show run') == 'c'
+    assert cache.stats()['bytes'] == 1
+
+
+def test_oldest_entries_are_evicted_past_max_bytes():
+    cache = make_cache(max_bytes=10)
+    cache.put('r1', 'admin', 'show run', 'aaaa')
+    cache.put('r2', 'admin', 'show run', 'bbbb')
+    cache.get('r1', 'admin', 'show run')  # r1 is now the most recently used
+    cache.put('r3', 'admin', 'show run', 'cccc')
+    assert cache.get('r2', 'admin', 'show run') is None
+    assert cache.get('r1', 'admin', 'show run') == 'aaaa'
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] == 8
+
+
+def test_output_larger_than_the_cache_is_not_stored():
+    cache = make_cache(max_bytes=10)
+    cache.put('r1', 'admin', 'show run', 'x' * 11)
+    assert cache.stats()['entries'] == 0
+
+
+def test_replacing_an_entry_keeps_the_size_right():
+    cache = make_cache()
+    cache.put('r1', 'admin', 'show run', 'old output')
+    cache.put('r1', 'admin', 'show run', 'new')
+    assert cache.get('r1', 'admin', 'show run') == 'new'
+    assert cache.stats()['bytes'] == 3
+
+
+def test_uncounted_miss_before_a_counted_lookup():
+    cache = make_cache()
+    assert cache.get('r1', 'admin', 'show run', count_miss=False) is None
+    assert cache.get('r1', 'admin', 'show run') is None
+    cache.put('r1', 'admin', 'show run', 'config')
+    assert cache.get('r1', 'admin', 'show run', count_miss=False) == 'config'
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+
+
+def test_invalidate_records_when_the_host_changed(monkeypatch):
+    cache = make_cache()
+    assert cache.changed_at('r1') == 0.0
+    monkeypatch.setattr(output_cache.time, 'time', lambda: 1234.0)
+    cache.invalidate('r1')
+    assert cache.changed_at('r1') == 1234.0
+    assert cache.changed_at('r2') == 0.0
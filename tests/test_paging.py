@@ -0,0 +1,76 @@
+import asyncio
+import gzip
+
+from paging import OutputPager, send_output
+
+
+class Recorder:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs.get('file')))
+
+
+def deliver(lines, max_pages=4, page_size=100):
+    ctx = Recorder()
+
+    async def run():
+        pager = OutputPager(ctx, 'out', max_pages=max_pages, page_size=page_size)
+        for line in lines:
+            await pager.feed(line)
+        return await pager.finish()
+
+    return asyncio.run(run()), ctx.sent
+
+
+def attached_text(file):
+    return gzip.decompress(file.fp.read()).decode()
+
+
+def test_short_output_is_left_to_the_caller():
+    delivered, sent = deliver(['one line'])
+    assert not delivered
+    assert sent == []
+
+
+def test_pages_split_on_line_boundaries():
+    lines = [f'line {i:02}' + 'x' * 20 for i in range(10)]
+    delivered, sent = deliver(lines)
+    assert delivered
+    assert all(file is None for _, file in sent)
+    pages = [content.strip('`').split('\n') for content, _ in sent]
+    assert [line for page in pages for line in page] == lines
+    assert all(len(content) <= 100 + 6 for content, _ in sent)
+
+
+def test_output_just_past_the_page_limit_is_attached():
+    # Four full pages plus a partial fifth one.
+    lines = ['y' * 49 for _ in range(9)]
+    delivered, sent = deliver(lines, max_pages=4, page_size=100)
+    assert delivered
+    assert len(sent) == 5
+    assert all(file is None for _, file in sent[:4])
+    content, file = sent[4]
+    assert 'full output attached' in content
+    assert attached_text(file) == '\n'.join(lines)
+
+
+def test_output_far_past_the_page_limit_is_attached_once():
+    lines = ['z' * 49 for _ in range(50)]
+    delivered, sent = deliver(lines, max_pages=2, page_size=100)
+    assert delivered
+    assert len(sent) == 3
+    assert attached_text(sent[2][1]) == '\n'.join(lines)
+
+
+def test_long_lines_are_hard_split():
+    delivered, sent = deliver(['a' * 250], page_size=100)
+    assert delivered
+    assert ''.join(content.strip('`') for content, _ in sent) == 'a' * 250
+
+
+def test_send_output_sends_short_output_as_one_message():
+    ctx = Recorder()
+    asyncio.run(send_output(ctx, 'short\noutput'))
+    assert ctx.sent == [('```short\noutput```', None)]
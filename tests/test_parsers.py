@@ -0,0 +1,72 @@
+from parsers import (Interface, MacEntry, NetworkStatement, Route, Vlan, parse_bgp_neighbors,
+                     parse_eigrp_neighbors, parse_interfaces, parse_mac_table, parse_network_statements,
+                     parse_ospf_neighbors, parse_routes, parse_vlans)
+
+
+def test_parse_interfaces():
+    output = '''Interface              IP-Address      OK? Method Status                Protocol
+GigabitEthernet0/0     10.0.0.1        YES manual up                    up
+GigabitEthernet0/1     unassigned      YES unset  administratively down down
+'''
+    assert parse_interfaces(output) == (
+        Interface('GigabitEthernet0/0', '10.0.0.1', 'YES', 'manual', 'up', 'up'),
+        Interface('GigabitEthernet0/1', 'unassigned', 'YES', 'unset', 'administratively down', 'down'),
+    )
+
+
+def test_parse_vlans_joins_wrapped_ports():
+    output = '''VLAN Name                             Status    Ports
+---- -------------------------------- --------- -------------------------------
+1    default                          active    Gi0/1, Gi0/2
+                                                Gi0/3
+10   users                            active    
+'''
+    assert parse_vlans(output) == (
+        Vlan(1, 'default', 'active', ('Gi0/1', 'Gi0/2', 'Gi0/3')),
+        Vlan(10, 'users', 'active', ()),
+    )
+
+
+def test_parse_routes_with_subnetted_header_and_equal_cost_paths():
+    output = '''Gateway of last resort is not set
+
+      10.0.0.0/8 is variably subnetted, 2 subnets, 2 masks
+C        10.0.0.0/24 is directly connected, GigabitEthernet0/0
+O        10.1.0.0 [110/2] via 10.0.0.2, 00:01:02, GigabitEthernet0/0
+                  [110/2] via 10.0.0.3, 00:01:02, GigabitEthernet0/1
+'''
+    assert parse_routes(output) == (
+        Route('C', '10.0.0.0', 24, None, None, None, 'GigabitEthernet0/0'),
+        Route('O', '10.1.0.0', 8, 110, 2, '10.0.0.2', 'GigabitEthernet0/0'),
+        Route('O', '10.1.0.0', 8, 110, 2, '10.0.0.3', 'GigabitEthernet0/1'),
+    )
+
+
+def test_parse_mac_table_skips_headers():
+    output = '''          Mac Address Table
+-------------------------------------------
+
+Vlan    Mac Address       Type        Ports
+----    -----------       --------    -----
+   1    0000.0000.00aa    DYNAMIC     Gi0/0
+Total Mac Addresses for this criterion: 1
+'''
+    assert parse_mac_table(output) == (MacEntry('1', '0000.0000.00aa', 'DYNAMIC', 'Gi0/0'),)
+
+
+def test_parse_neighbors():
+    ospf = '10.0.0.2          1   FULL/DR         00:00:33    10.0.0.2        GigabitEthernet0/0\n'
+    assert [neighbor.state for neighbor in parse_ospf_neighbors(ospf)] == ['FULL/DR']
+    eigrp = '0   10.0.0.2                Gi0/0                    13 00:01:02   10   100  0  5\n'
+    assert [neighbor.address for neighbor in parse_eigrp_neighbors(eigrp)] == ['10.0.0.2']
+    bgp = '10.0.0.2        4        65001      12      14        3    0    0 00:05:00        4\n'
+    assert [(neighbor.remote_as, neighbor.state) for neighbor in parse_bgp_neighbors(bgp)] == [('65001', '4')]
+
+
+def test_parse_network_statements_keeps_mask_and_wildcard_apart():
+    output = ' network 10.0.0.0\n network 10.1.0.0 mask 255.255.0.0\n network 10.2.0.0 0.0.0.255 area 0\n'
+    assert parse_network_statements(output) == (
+        NetworkStatement('10.0.0.0', None, None, None),
+        NetworkStatement('10.1.0.0', '255.255.0.0', None, None),
+        NetworkStatement('10.2.0.0', None, '0.0.0.255', '0'),
+    )
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from eigrp import eigrp
+from ospf import ospf
+from prefixes import collapse, dedupe, format_address, parse_prefix, parse_prefixes
+
+
+def prefixes(*texts):
+    return parse_prefixes(texts)
+
+
+def formatted(result):
+    return [f'{format_address(network)}/{length}' for network, length in result]
+
+
+def test_parse_prefix_clears_host_bits():
+    assert formatted([parse_prefix('10.1.2.3/24')]) == ['10.1.2.0/24']
+
+
+@pytest.mark.parametrize('text', ['10.1.2.3', '10.1/8', '10.0.0.0/33', '10.0.0.0/x', '256.0.0.0/8'])
+def test_parse_prefix_rejects_bad_input(text):
+    with pytest.raises(ValueError):
+        parse_prefix(text)
+
+
+def test_collapse_drops_duplicates_and_covered_prefixes():
+    result = collapse(prefixes('10.0.1.0/24', '10.0.0.0/16', '10.0.1.0/24', '192.168.0.0/24'))
+    assert formatted(result) == ['10.0.0.0/16', '192.168.0.0/24']
+
+
+def test_collapse_keeps_siblings_apart_without_aggregate():
+    result = collapse(prefixes('10.0.0.128/25', '10.0.0.0/25'))
+    assert formatted(result) == ['10.0.0.0/25', '10.0.0.128/25']
+
+
+def test_collapse_aggregates_siblings_repeatedly():
+    result = collapse(prefixes('10.0.0.0/26', '10.0.0.64/26', '10.0.0.128/25', '10.0.1.0/24'), aggregate=True)
+    assert formatted(result) == ['10.0.0.0/23']
+
+
+def test_collapse_does_not_merge_unaligned_neighbours():
+    # 10.0.1.0/24 and 10.0.2.0/24 are adjacent but not halves of one /23.
+    result = collapse(prefixes('10.0.1.0/24', '10.0.2.0/24'), aggregate=True)
+    assert formatted(result) == ['10.0.1.0/24', '10.0.2.0/24']
+
+
+def test_collapse_covers_the_same_addresses():
+    given = prefixes('10.0.0.0/25', '10.0.0.128/26', '10.0.0.192/26', '10.0.3.0/24', '10.0.3.7/32')
+
+    def addresses(items):
+        return {address for network, length in items for address in range(network, network + (1 << (32 - length)))}
+
+    assert addresses(collapse(given, aggregate=True)) == addresses(given)
+
+
+def test_dedupe_keeps_input_order():
+    assert formatted(dedupe(prefixes('10.0.1.0/24', '10.0.0.0/24', '10.0.1.0/24'))) == ['10.0.1.0/24', '10.0.0.0/24']
+
+
+def test_ospf_summarizes_only_when_asked():
+    networks = '10.0.0.0/25/0,10.0.0.128/25/0'
+    assert ospf(networks) == ['router ospf 1', 'network 10.0.0.0 0.0.0.127 area 0',
+                              'network 10.0.0.128 0.0.0.127 area 0']
+    assert ospf(networks, summarize=True) == ['router ospf 1', 'network 10.0.0.0 0.0.0.255 area 0']
+
+
+def test_eigrp_summarizes_only_when_asked():
+    assert asyncio.run(eigrp('10.0.0.0/25,10.0.0.128/25', '10')) == [
+        'router eigrp 10', 'network 10.0.0.0 0.0.0.127', 'network 10.0.0.128 0.0.0.127']
+    assert asyncio.run(eigrp('10.0.0.0/25,10.0.0.128/25', '10', summarize=True)) == [
+        'router eigrp 10', 'network 10.0.0.0 0.0.0.255']
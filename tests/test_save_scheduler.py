@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from save_scheduler import SaveScheduler
+
+
+class Saves:
+    def __init__(self, duration=0.0, fail=False):
+        self.calls = []
+        self.duration = duration
+        self.fail = fail
+
+    async def __call__(self, *args):
+        self.calls.append(args)
+        await asyncio.sleep(self.duration)
+        if self.fail:
+            raise RuntimeError('write failed')
+        return f'saved {args}'
+
+
+def test_requests_within_the_quiet_period_are_merged():
+    saves = Saves()
+
+    async def main():
+        scheduler = SaveScheduler(saves, quiet=0.05, max_delay=1)
+        first = scheduler.request('r1', 'a')
+        await asyncio.sleep(0.02)
+        second = scheduler.request('r1', 'b')
+        return await asyncio.gather(first, second), scheduler.stats()
+
+    outputs, stats = asyncio.run(main())
+    assert saves.calls == [('b',)]
+    assert outputs == ["saved ('b',)"] * 2
+    assert (stats['requested'], stats['merged'], stats['writes']) == (2, 1, 1)
+
+
+def test_devices_are_saved_separately():
+    saves = Saves()
+
+    async def main():
+        scheduler = SaveScheduler(saves, quiet=0.01, max_delay=1)
+        await asyncio.gather(scheduler.request('r1', 1), scheduler.request('r2', 2))
+
+    asyncio.run(main())
+    assert sorted(saves.calls) == [(1,), (2,)]
+
+
+def test_max_delay_bounds_a_stream_of_requests():
+    saves = Saves()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        scheduler = SaveScheduler(saves, quiet=0.05, max_delay=0.1)
+        started = loop.time()
+        first = scheduler.request('r1')
+        while not first.done():
+            scheduler.request('r1')
+            await asyncio.sleep(0.02)
+        return loop.time() - started
+
+    elapsed = asyncio.run(main())
+    assert elapsed < 0.2
+    assert len(saves.calls) >= 1
+
+
+def test_request_during_a_write_gets_its_own_save():
+    saves = Saves(duration=0.05)
+
+    async def main():
+        scheduler = SaveScheduler(saves, quiet=0.0, max_delay=1)
+        first = scheduler.request('r1', 'first')
+        await asyncio.sleep(0.02)  # the first save is running now
+        second = scheduler.request('r1', 'second')
+        await asyncio.gather(first, second)
+        return first.result(), second.result()
+
+    assert asyncio.run(main()) == ("saved ('first',)", "saved ('second',)")
+    assert saves.calls == [('first',), ('second',)]
+
+
+def test_flush_starts_pending_saves_now():
+    saves = Saves()
+
+    async def main():
+        scheduler = SaveScheduler(saves, quiet=60, max_delay=60)
+        future = scheduler.request('r1')
+        scheduler.request('r2')
+        await asyncio.wait_for(scheduler.flush(), 1)
+        return future.done(), scheduler.stats()
+
+    done, stats = asyncio.run(main())
+    assert done
+    assert len(saves.calls) == 2
+    assert stats['pending'] == stats['running'] == 0
+
+
+def test_failures_reach_every_merged_request():
+    saves = Saves(fail=True)
+
+    async def main():
+        scheduler = SaveScheduler(saves, quiet=0.01, max_delay=1)
+        futures = [scheduler.request('r1'), scheduler.request('r1')]
+        await asyncio.gather(*futures, return_exceptions=True)
+        return futures, scheduler.stats()
+
+    futures, stats = asyncio.run(main())
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result()
+    assert stats['failed'] == 1
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_overlapping_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def main():
+        return await asyncio.gather(*(flight.run('key', fetch, 21) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert calls == [21]
+    assert [result for result, _ in results] == [42] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flight.stats() == {'in_flight': 0, 'calls': 1, 'saved': 4}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+
+    async def fetch(value):
+        await asyncio.sleep(0)
+        return value
+
+    async def main():
+        return await asyncio.gather(flight.run('a', fetch, 1), flight.run('b', fetch, 2))
+
+    assert asyncio.run(main()) == [(1, False), (2, False)]
+    assert flight.stats()['calls'] == 2
+
+
+def test_calls_after_completion_run_again():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        return [await flight.run('key', fetch), await flight.run('key', fetch)]
+
+    assert asyncio.run(main()) == [(1, False), (2, False)]
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('device gone')
+
+    async def main():
+        return await asyncio.gather(*(flight.run('key', fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats()['calls'] == 1
+
+
+def test_follower_runs_again_when_the_leader_is_cancelled():
+    flight = SingleFlight()
+    started = []
+
+    async def fetch():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return 'output'
+
+    async def main():
+        leader = asyncio.ensure_future(flight.run('key', fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.run('key', fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == ('output', False)
+    assert len(started) == 2
+    assert flight.stats() == {'in_flight': 0, 'calls': 2, 'saved': 0}
+
+
+def test_cancelling_a_follower_leaves_the_leader_running():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return 'output'
+
+    async def main():
+        leader = asyncio.ensure_future(flight.run('key', fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.run('key', fetch))
+        await asyncio.sleep(0.005)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == ('output', False)